@@ -0,0 +1 @@
+"""Speed benchmarks of the lcdct toolbox, see `benchmarks/run.py`."""
@@ -0,0 +1,158 @@
+"""
+Runs the benchmark suite and compares it against a JSON baseline.
+
+Usage (from the repository root)::
+
+    python -m benchmarks.run                          # run everything, print timings
+    python -m benchmarks.run -k observer=LG_CHO       # cases whose name matches a regex
+    python -m benchmarks.run --quick                  # smallest parameters only (smoke test)
+    python -m benchmarks.run -o results.json          # save timings
+    python -m benchmarks.run --compare baseline.json  # e.g. saved with -o on the base commit
+
+Every case is timed with `timeit`: the number of calls per measurement is chosen so a
+measurement takes at least `--min-time` seconds, and the best and median of `--repeat`
+measurements are reported per call. A case regresses when its best time exceeds the baseline's
+by more than `--threshold` (a ratio); the exit code is 1 if any case regressed.
+"""
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+import argparse
+import json
+import os
+import platform
+import re
+import subprocess
+import sys
+import timeit
+
+import numpy as np
+
+from .suite import cases
+
+
+def machine_info() -> Dict[str, Any]:
+    """Describes the environment the timings were taken in."""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=Path(__file__).parent).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {'platform': platform.platform(), 'machine': platform.machine(), 'processor': platform.processor(),
+            'cpu_count': os.cpu_count(), 'python': platform.python_version(), 'numpy': np.__version__,
+            'commit': commit, 'date': datetime.now(timezone.utc).isoformat(timespec='seconds')}
+
+
+def time_case(func, repeat: int = 5, min_time: float = 0.2) -> Dict[str, float]:
+    """Times a zero-argument callable.
+
+    Args:
+        func: Callable to time.
+        repeat: Number of measurements.
+        min_time: Minimum duration of one measurement in seconds.
+
+    Returns:
+        Dict[str, float]: Best and median seconds per call, and calls per measurement.
+    """
+    func()  # warm up caches and lazy imports
+    timer = timeit.Timer(func)
+    number = 1
+    while True:
+        elapsed = timer.timeit(number)
+        if elapsed >= min_time or number >= 1 << 20:
+            break
+        number = max(number * 2, int(number * min_time / max(elapsed, 1e-9)))
+    times = [elapsed / number] + [t / number for t in timer.repeat(repeat=repeat - 1, number=number)]
+    return {'min': min(times), 'median': float(np.median(times)), 'number': number, 'repeat': repeat}
+
+
+def run(pattern: Optional[str] = None, quick: bool = False, repeat: int = 5, min_time: float = 0.2,
+        verbose: bool = True) -> Dict[str, Any]:
+    """Runs the benchmark cases whose name matches `pattern`.
+
+    Args:
+        pattern: Regular expression searched in the case names, e.g. 'calculate_metrics.*NPWE'.
+        quick: Only run the reduced parameter grids.
+        repeat: Number of measurements per case.
+        min_time: Minimum duration of one measurement in seconds.
+        verbose: Print every timing as it completes.
+
+    Returns:
+        Dict[str, Any]: {'machine': ..., 'results': {case name: timings}}.
+    """
+    results = {}
+    for name, bench, kwargs in cases(quick):
+        if pattern and not re.search(pattern, name):
+            continue
+        func = bench.func(**kwargs)
+        if func is None:
+            continue  # combination not supported
+        results[name] = time_case(func, repeat=repeat, min_time=min_time)
+        if verbose:
+            print(f"{name:<70} {_format(results[name]['min']):>10} {_format(results[name]['median']):>10}", flush=True)
+    return {'machine': machine_info(), 'results': results}
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], threshold: float = 1.25) -> List[str]:
+    """Prints the change of every case present in both runs and returns the regressed ones.
+
+    Args:
+        results: Output of `run`.
+        baseline: Output of an earlier `run`, e.g. loaded from a JSON baseline.
+        threshold: Ratio of best times above which a case counts as a regression.
+
+    Returns:
+        List[str]: Names of the regressed cases.
+    """
+    regressions = []
+    print(f"\n{'case':<70} {'baseline':>10} {'current':>10} {'ratio':>7}")
+    for name, timing in results['results'].items():
+        base = baseline['results'].get(name)
+        if base is None:
+            continue
+        ratio = timing['min'] / base['min']
+        flag = ''
+        if ratio > threshold:
+            flag = '  REGRESSION'
+            regressions.append(name)
+        elif ratio < 1 / threshold:
+            flag = '  improved'
+        print(f"{name:<70} {_format(base['min']):>10} {_format(timing['min']):>10} {ratio:>7.2f}{flag}")
+    return regressions
+
+
+def _format(seconds: float) -> str:
+    for unit, scale in (('s', 1), ('ms', 1e-3), ('us', 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.3g} {unit}"
+    return f"{seconds / 1e-9:.3g} ns"
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Run the lcdct benchmark suite.")
+    parser.add_argument('-k', '--filter', default=None, help="Regular expression selecting case names")
+    parser.add_argument('--quick', action='store_true', help="Only run the smallest parameters")
+    parser.add_argument('--repeat', type=int, default=5, help="Measurements per case")
+    parser.add_argument('--min-time', type=float, default=0.2, help="Minimum seconds per measurement")
+    parser.add_argument('-o', '--output', default=None, help="Write the timings to this JSON file")
+    parser.add_argument('--compare', default=None, help="JSON baseline to compare against")
+    parser.add_argument('--threshold', type=float, default=1.25, help="Slowdown ratio counted as a regression")
+    args = parser.parse_args(argv)
+
+    print(f"{'case':<70} {'best':>10} {'median':>10}")
+    results = run(args.filter, quick=args.quick, repeat=args.repeat, min_time=args.min_time)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=1)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, threshold=args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) above {args.threshold}x")
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
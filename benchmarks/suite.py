@@ -0,0 +1,210 @@
+"""
+Benchmark cases.
+
+Each case is a function decorated with `benchmark`. It is called once per combination of its
+parameters, does its (untimed) setup and returns the zero-argument callable that is timed.
+`quick` parameters are used by `run.py --quick` to smoke test the suite.
+"""
+from itertools import product
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from lcdct.LCD import analytic_LCD, measure_LCD
+from lcdct.Observers import LG_CHO, DOG_CHO, Gabor_CHO, NPWE, LG_CHO_3D, LG_CHO_MS
+from lcdct.channels import clear_channel_cache
+from lcdct.functions import laguerre
+from lcdct.layout import PhantomLayout
+from lcdct.search import search_LCD
+from lcdct.utils import find_insert_centers, get_demo_truth_masks, get_roi_from_truth_mask, load_dataset, read_mhd
+
+from . import synthetic
+
+DATA_DIR = Path(__file__).resolve().parent.parent / 'data' / 'small_dataset' / 'fbp'
+
+
+class Benchmark(NamedTuple):
+    name: str
+    func: Callable[..., Callable[[], Any]]
+    params: Dict[str, List[Any]]
+    quick: Dict[str, List[Any]]
+
+
+BENCHMARKS: List[Benchmark] = []
+
+
+def benchmark(params: Optional[Dict[str, List[Any]]] = None, quick: Optional[Dict[str, List[Any]]] = None):
+    """Registers a benchmark case.
+
+    Args:
+        params: Parameter grid, e.g. {'size': [21, 41], 'n': [50, 200]}.
+        quick: Smaller grid for smoke runs. Default: the first value of every parameter.
+    """
+    params = params or {}
+    if quick is None:
+        quick = {k: v[:1] for k, v in params.items()}
+
+    def register(func):
+        BENCHMARKS.append(Benchmark(func.__name__, func, params, quick))
+        return func
+    return register
+
+
+def cases(quick: bool = False) -> Iterator[Tuple[str, Benchmark, Dict[str, Any]]]:
+    """Yields (case name, benchmark, parameters) for every parameter combination."""
+    for bench in BENCHMARKS:
+        grid = bench.quick if quick else bench.params
+        for values in product(*grid.values()):
+            kwargs = dict(zip(grid, values))
+            label = ','.join(f"{k}={v}" for k, v in kwargs.items())
+            yield (f"{bench.name}[{label}]" if label else bench.name), bench, kwargs
+
+
+OBSERVERS = {
+    'LG_CHO': lambda sp, sa: LG_CHO(sp, sa, channel_width=sp.shape[-1] / 3),
+    'DOG_CHO': lambda sp, sa: DOG_CHO(sp, sa),
+    'GABOR_CHO': lambda sp, sa: Gabor_CHO(sp, sa),
+    'NPWE': lambda sp, sa: NPWE(sp, sa),
+}
+
+
+# --- channels ---
+
+@benchmark({'n_pixels': [64 ** 2, 128 ** 2, 256 ** 2], 'J': [5, 10]})
+def laguerre_polynomials(n_pixels, J):
+    x = np.linspace(0, 20, n_pixels)
+    out = np.empty((n_pixels, J + 1))
+    return lambda: laguerre(x, J, out=out)
+
+
+@benchmark({'observer': ['LG_CHO', 'DOG_CHO', 'GABOR_CHO'], 'size': [21, 41, 61]})
+def channel_bank(observer, size):
+    """Uncached channel construction."""
+    obs = OBSERVERS[observer](*synthetic.rois(size, 2))
+
+    def run():
+        clear_channel_cache()
+        obs.get_channels(size, size)
+    return run
+
+
+# --- observers ---
+
+@benchmark({'observer': list(OBSERVERS), 'size': [21, 41, 61], 'n': [50, 200]})
+def calculate_metrics(observer, size, n):
+    obs = OBSERVERS[observer](*synthetic.rois(size, n))
+    half = n // 2
+    sa, sp = obs.signal_absent, obs.signal_present
+    return lambda: obs.calculate_metrics(sa[:half], sp[:half], sa[half:], sp[half:])
+
+
+@benchmark({'observer': list(OBSERVERS), 'size': [21, 41, 61], 'n': [50, 200], 'resampling': ['split', 'bootstrap']},
+           quick={'observer': ['LG_CHO', 'NPWE'], 'size': [21], 'n': [50], 'resampling': ['split']})
+def run_study(observer, size, n, resampling):
+    obs = OBSERVERS[observer](*synthetic.rois(size, n))
+    if resampling == 'bootstrap' and observer == 'NPWE':
+        return None  # not supported
+    return lambda: obs.run_study(n_readers=10, seed=list(range(10)), resampling=resampling)
+
+
+@benchmark({'observer': ['LG_CHO_SS', 'LG_CHO_MS', 'LG_CHO_3D'], 'nz': [5, 15]})
+def channelize_volume(observer, nz):
+    """200 volume ROIs (nz, 41, 41) onto cached channels."""
+    volumes = np.random.default_rng(0).standard_normal((200, nz, 41, 41))
+    if observer == 'LG_CHO_3D':
+        obs = LG_CHO_3D(volumes, volumes, channel_width=8, remove_dc=False)
+    else:
+        obs = LG_CHO_MS(volumes, volumes, channel_width=8, remove_dc=False,
+                        z_channels='center' if observer == 'LG_CHO_SS' else 'slices')
+    return lambda: obs.channelize(volumes)
+
+
+# --- masks and ROIs ---
+
+@benchmark({'size': [256, 512, 1024], 'slices': [1, 40]}, quick={'size': [256], 'slices': [1, 40]})
+def demo_truth_masks(size, slices):
+    """Single ground truth images and (slices, size, size) ground truth volumes."""
+    gt = synthetic.ground_truth(size)
+    if slices > 1:
+        gt = np.repeat(gt[None], slices, axis=0)
+    return lambda: get_demo_truth_masks(gt)
+
+
+@benchmark({'size': [256, 512], 'n': [50, 200]}, quick={'size': [256], 'n': [10]})
+def roi_from_truth_mask(size, n):
+    """Per-insert crops as in the original measure_LCD loop."""
+    gt = synthetic.ground_truth(size)
+    masks = get_demo_truth_masks(gt)
+    _, sa = synthetic.realizations(gt, n, correlation=0)
+    nx = 2 * round(max(synthetic.INSERT_DIAMETERS) * size / 256)
+
+    def run():
+        for i in range(masks.shape[2]):
+            get_roi_from_truth_mask(masks[:, :, i], sa, nx=nx)
+    return run
+
+
+@benchmark({'size': [256, 512], 'n': [50, 200]}, quick={'size': [256], 'n': [10]})
+def extract_rois(size, n):
+    """All insert crops in one pass, with DC removal."""
+    gt = synthetic.ground_truth(size)
+    layout = PhantomLayout.from_ground_truth(gt)
+    _, sa = synthetic.realizations(gt, n, correlation=0)
+    return lambda: layout.extract_rois(sa)
+
+
+@benchmark({'size': [256, 512]})
+def phantom_layout(size):
+    gt = synthetic.ground_truth(size)
+    return lambda: PhantomLayout.from_ground_truth(gt)
+
+
+@benchmark({'size': [512, 1024]})
+def insert_centers(size):
+    """Insert detection on a 20-repeat mean difference image."""
+    gt = synthetic.ground_truth(size)
+    sp, sa = synthetic.realizations(gt, 20, noise_std=5)
+    image = sp.mean(0) - sa.mean(0)
+    scale = size // 256
+    return lambda: find_insert_centers(image, smoothing_window_size=5, search_range=(2 * scale, 8 * scale))
+
+
+# --- I/O ---
+
+@benchmark({'lazy': [False, True]})
+def load_small_dataset(lazy):
+    return lambda: load_dataset(DATA_DIR / 'dose_100', offset=1000, lazy=lazy)
+
+
+# --- end to end ---
+
+@benchmark({'observers': ['LG_CHO_2D', 'all']})
+def measure_lcd_small_dataset(observers):
+    observers = ['LG_CHO_2D', 'DOG_CHO_2D', 'GABOR_CHO_2D', 'NPWE_2D'] if observers == 'all' else [observers]
+    gt = read_mhd(DATA_DIR / 'ground_truth.mhd').astype(np.float32) - 1000
+    sp, sa = load_dataset(DATA_DIR / 'dose_100', offset=1000)
+    return lambda: measure_LCD(sp, sa, gt, observers=observers, n_reader=10, seed_split=list(range(10)))
+
+
+@benchmark({'size': [256, 512], 'n': [50, 200]}, quick={'size': [256], 'n': [20]})
+def measure_lcd_synthetic(size, n):
+    gt = synthetic.ground_truth(size)
+    sp, sa = synthetic.realizations(gt, n)
+    return lambda: measure_LCD(sp, sa, gt, observers=['LG_CHO_2D', 'NPWE_2D'], n_reader=10,
+                               seed_split=list(range(10)))
+
+
+@benchmark({'size': [256, 512], 'n': [5, 20]}, quick={'size': [256], 'n': [5]})
+def analytic_lcd_synthetic(size, n):
+    gt = synthetic.ground_truth(size)
+    _, sa = synthetic.realizations(gt, n)
+    return lambda: analytic_LCD(sa, gt, observers=['LG_CHO_2D', 'NPWE_2D'])
+
+
+@benchmark({'search_radius': [8, 24]}, quick={'search_radius': [8]})
+def search_lcd_synthetic(search_radius):
+    gt = synthetic.ground_truth(256)
+    sp, sa = synthetic.realizations(gt, 50)
+    return lambda: search_LCD(sp, sa, gt, observers=['LG_CHO_2D', 'NPWE_2D'], search_radius=search_radius,
+                              n_reader=10, seed_split=list(range(10)))
@@ -0,0 +1,83 @@
+"""
+Synthetic data for the benchmarks.
+
+The generated phantoms follow the layout of the bundled small dataset (four inserts of 14, 7, 5
+and 3 HU with increasing diameters on a square around the center), so every size can be fed to
+`get_demo_truth_masks` and `measure_LCD` unchanged.
+"""
+from typing import Tuple
+import numpy as np
+from scipy.ndimage import gaussian_filter
+from skimage.draw import disk
+
+INSERT_HUS = (14, 7, 5, 3)
+# insert diameters of the 256² small dataset, in pixels
+INSERT_DIAMETERS = (4, 7, 10, 14)
+
+
+def ground_truth(size: int = 256) -> np.ndarray:
+    """Returns a (size, size) ground truth with the four MITA-style inserts.
+
+    Insert positions and diameters scale with `size` relative to the 256² small dataset.
+
+    Args:
+        size: Image width in pixels.
+
+    Returns:
+        np.ndarray: Ground truth in HU (background 0).
+    """
+    scale = size / 256
+    gt = np.zeros((size, size))
+    offsets = [(-33, 33), (-33, -33), (33, -33), (33, 33)]
+    for hu, d, (dy, dx) in zip(INSERT_HUS, INSERT_DIAMETERS, offsets):
+        center = (size / 2 + dy * scale, size / 2 + dx * scale)
+        rr, cc = disk(center, max(d * scale / 2, 1), shape=gt.shape)
+        gt[rr, cc] = hu
+    return gt
+
+
+def realizations(gt: np.ndarray, n: int, noise_std: float = 10, correlation: float = 1.0,
+                 seed: int = 0, dtype: type = np.float32) -> Tuple[np.ndarray, np.ndarray]:
+    """Generates signal-present and signal-absent noise realizations of a ground truth.
+
+    Args:
+        gt: Ground truth (Y, X).
+        n: Number of realizations of each class.
+        noise_std: Standard deviation of the noise in HU.
+        correlation: Width (pixels) of the Gaussian kernel correlating the noise, a crude
+            stand-in for a CT noise power spectrum. 0 gives white noise.
+        seed: Random seed.
+        dtype: Floating point type of the images.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: Signal-present and signal-absent stacks (n, Y, X).
+    """
+    rng = np.random.default_rng(seed)
+    stacks = []
+    for _ in range(2):
+        noise = rng.standard_normal((n,) + gt.shape)
+        if correlation > 0:
+            noise = gaussian_filter(noise, sigma=(0, correlation, correlation))
+        noise *= noise_std / noise.std()
+        stacks.append(noise.astype(dtype))
+    sp, sa = stacks
+    sp += gt.astype(dtype)
+    return sp, sa
+
+
+def rois(size: int, n: int, contrast: float = 5, seed: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+    """Generates signal-present and signal-absent ROIs (n, size, size) with a centered disk.
+
+    Args:
+        size: ROI width in pixels.
+        n: Number of ROIs of each class.
+        contrast: Insert contrast in HU.
+        seed: Random seed.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: Signal-present and signal-absent ROIs.
+    """
+    signal = np.zeros((size, size))
+    rr, cc = disk((size // 2, size // 2), size / 6, shape=signal.shape)
+    signal[rr, cc] = contrast
+    return realizations(signal, n, seed=seed, dtype=np.float64)
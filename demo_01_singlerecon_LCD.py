@@ -34,7 +34,7 @@ def main():
     
     print(f"Analyzing {dose_dir}...")
     try:
-        sp, sa = load_dataset(dose_dir, offset=offset)
+        sp, sa = load_dataset(dose_dir, offset=offset, lazy=True)
     except Exception as e:
         print(f"Failed to load dataset: {e}")
         return
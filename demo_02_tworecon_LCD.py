@@ -39,7 +39,7 @@ def main():
         print(f"Analyzing {recon_dir}...")
         
         try:
-            sp, sa = load_dataset(recon_dir, offset=offset)
+            sp, sa = load_dataset(recon_dir, offset=offset, lazy=True)
         except Exception as e:
             print(f"Failed to load dataset: {e}")
             continue
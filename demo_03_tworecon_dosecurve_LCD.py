@@ -4,8 +4,9 @@ Demo 03: Two Recon Dose Curve LCD Analysis
 from pathlib import Path
 import numpy as np
 import pandas as pd
-from lcdct.LCD import measure_LCD, plot_results
-from lcdct.utils import load_dataset, read_mhd
+from lcdct.LCD import plot_results
+from lcdct.sweep import run_sweep
+from lcdct.utils import read_mhd
 
 def main():
     base_dir = Path('data')
@@ -27,43 +28,29 @@ def main():
         
     ground_truth = read_mhd(str(ground_truth_fname)).astype(np.float32) - offset
     
-    results_list = []
     observers = ['LG_CHO_2D']
 
-    # Find common dose levels
-    # Scan fbp dir for dose_*
-    fbp_dir = base_directory / 'fbp'
-    dose_dirs = sorted(list(fbp_dir.glob('dose_*')))
-    
-    for d_path in dose_dirs:
-        try:
-            dose_val = int(d_path.name.split('_')[1])
-        except Exception:
+    # Every dose_* level of each recon, results are streamed as each (recon, dose) job finishes
+    results_list = []
+    for res in run_sweep(base_directory, ground_truth=ground_truth, recon_names=recon_names,
+                         observers=observers, offset=offset):
+        if res.empty:
+            print("Skipping a dataset without results: none of its inserts matched the ground truth")
             continue
-            
-        print(f"Processing Dose {dose_val}...")
-        
-        for recon in recon_names:
-            recon_dir = base_directory / recon / d_path.name
-            
-            try:
-                sp, sa = load_dataset(recon_dir, offset=offset)
-            except Exception as e:
-                # print(f"Skipping {recon_dir}: {e}")
-                continue
-            
-            res = measure_LCD(sp, sa, ground_truth, observers=observers)
-            res['recon'] = recon
-            res['dose_level'] = dose_val
-            results_list.append(res)
+        print(f"Processed {res['recon'].iloc[0]} dose {res['dose_level'].iloc[0]}")
+        results_list.append(res)
 
-    if results_list:
-        final_df = pd.concat(results_list, ignore_index=True)
-        print("Results Head:")
-        print(final_df.head())
-        
-        final_df.to_csv('results_demo_03.csv', index=False)
-        plot_results(final_df, ylim=[0.5, 1.0])
+    if not results_list:
+        print(f"No results: found no dose_*/signal_present and signal_absent series of {recon_names} "
+              f"under {base_directory}, the dataset may be incomplete")
+        return
+
+    final_df = pd.concat(results_list, ignore_index=True)
+    print("Results Head:")
+    print(final_df.head())
+
+    final_df.to_csv('results_demo_03.csv', index=False)
+    plot_results(final_df, ylim=[0.5, 1.0])
     
 if __name__ == '__main__':
     main()
@@ -1,158 +1,381 @@
 """
 Low Contrast Detectability (LCD)
 """
+from concurrent.futures import Executor, ProcessPoolExecutor
+from contextlib import nullcontext
 from pathlib import Path
+import copy
 import numpy as np
 import pandas as pd
-from scipy.stats import mode
-from typing import Union, List, Optional, Any, Tuple
-
-from .utils import (
-    get_demo_truth_masks, 
-    get_insert_radius, 
-    get_roi_from_truth_mask,
-    read_mhd
-)
-from .Observers import LG_CHO, DOG_CHO, Gabor_CHO, NPWE
-
-def measure_LCD(signal_present: np.ndarray, signal_absent: np.ndarray, ground_truth: Union[np.ndarray, str, Path], 
-                observers: Optional[List[Union[str, Any]]] = None, n_reader: int = 10, pct_split: float = 0.5, seed_split: Optional[Union[List[int], np.ndarray]] = None) -> pd.DataFrame:
+from typing import Union, List, Optional, Any, Tuple, Callable
+
+from .utils import read_mhd
+from .layout import PhantomLayout
+from .Observers import CHO, RESAMPLING_MODES
+from .registry import ObserverFactory, get_observer_factory
+from .cache import ResultCache, as_result_cache, fingerprint
+from .parallel import SharedArray, as_array, check_executor, get_executor, resolve_n_jobs
+from .nps import blur, estimate_nps, radial_nps
+from .profiling import Profiler, StageRecord, active_profiler, stage
+from .streaming import stream_channel_outputs, stream_run_study
+
+# built-in observers, see `lcdct.registry.available_observers` for all registered ones
+OBSERVER_NAMES = ['LG_CHO_2D', 'DOG_CHO_2D', 'GABOR_CHO_2D', 'NPWE_2D']
+
+def _make_observer(obs_item: Union[str, ObserverFactory, Any], sp_rois: np.ndarray, sa_rois: np.ndarray, insert_r: float,
+                   dtype: Optional[Union[str, np.dtype]] = None) -> Any:
+    """Builds the observer for one insert from a registered name, a factory or a template observer instance.
+
+    The ROIs are expected to be DC-removed already (see `PhantomLayout.extract_rois`) and are
+    used without copies.
+    """
+    if isinstance(obs_item, str):
+        obs_item = get_observer_factory(obs_item)
+    if isinstance(obs_item, ObserverFactory):
+        return obs_item(sp_rois, sa_rois, insert_r, dtype)
+
+    # Observer instance: work on a copy so the caller's object is not modified
+    current_obs = copy.copy(obs_item)
+    # If LG_CHO, update channel width to the insert size
+    if hasattr(current_obs, 'channel_width'):
+        current_obs.channel_width = 2/3 * insert_r
+    if dtype is not None:
+        current_obs.dtype = np.dtype(dtype).name
+    # Update signals
+    current_obs.signal_present = sp_rois
+    current_obs.signal_absent = sa_rois
+    return current_obs
+
+def _study_task(obs_item: Union[str, ObserverFactory, Any], sp_rois: Union[np.ndarray, SharedArray], sa_rois: Union[np.ndarray, SharedArray],
+                index: int, insert_r: float, n_reader: int, pct_split: float, seed_split: Optional[Union[List[int], np.ndarray]],
+                cache: Optional[ResultCache] = None, resampling: str = 'split',
+                dtype: Optional[Union[str, np.dtype]] = None,
+                profile: Optional[Tuple[bool, dict]] = None) -> Union[pd.DataFrame, Tuple[pd.DataFrame, List[StageRecord]]]:
+    """Runs the reader study of insert `index` of the (n_inserts, N, h, w) ROI blocks for one observer.
+
+    The ROI blocks may be shared memory handles. With `profile` = (memory, labels) the stages are
+    recorded by a task-local `Profiler` and returned with the results.
+    """
+    if profile is not None:
+        profiler = Profiler(memory=profile[0])
+        with profiler.activate(**profile[1]):
+            res = _study_task(obs_item, sp_rois, sa_rois, index, insert_r, n_reader, pct_split, seed_split,
+                              cache, resampling, dtype)
+        return res, profiler.records
+
+    shared = [r for r in (sp_rois, sa_rois) if isinstance(r, SharedArray)]
+    try:
+        if isinstance(sp_rois, SharedArray):
+            sp_rois = sp_rois.array()
+        if isinstance(sa_rois, SharedArray):
+            sa_rois = sa_rois.array()
+        current_obs = _make_observer(obs_item, sp_rois[index], sa_rois[index], insert_r, dtype)
+        return current_obs.run_study(n_readers=n_reader, pct_split=pct_split, seed=seed_split, cache=cache,
+                                     resampling=resampling)
+    finally:
+        for r in shared:
+            r.close()
+
+def _observer_label(obs_item: Union[ObserverFactory, Any]) -> str:
+    """Observer name of the results ('observer' column), used to label profiles."""
+    if isinstance(obs_item, ObserverFactory):
+        return obs_item.observer_cls.__name__
+    return type(obs_item).__name__
+
+def _streamed_LCD(signal_present: np.ndarray, signal_absent: np.ndarray, layout: PhantomLayout,
+                  factories: List[Union[ObserverFactory, Any]], n_reader: int, pct_split: float,
+                  seed_split: Optional[Union[List[int], np.ndarray]], resampling: str,
+                  dtype: Optional[Union[str, np.dtype]], chunk_size: int) -> pd.DataFrame:
+    """`measure_LCD` from channel outputs accumulated `chunk_size` images at a time."""
+    nx = 2 * layout.max_diameter
+    # observers are built on empty ROI stacks: they only contribute their channels
+    empty = layout.extract_rois(np.asarray(signal_present[:0]), nx=nx, dtype=dtype)
+    grid = [[_make_observer(obs_item, empty[i], empty[i], info.diameter, dtype) for obs_item in factories]
+            for i, info in enumerate(layout.inserts)]
+    for obs in grid[0]:
+        if not isinstance(obs, CHO):
+            raise ValueError(f"Streaming (chunk_size) needs channelized observers, got {type(obs).__name__}")
+    v_sp = stream_channel_outputs(signal_present, layout, grid, chunk_size, nx=nx, dtype=dtype)
+    v_sa = stream_channel_outputs(signal_absent, layout, grid, chunk_size, nx=nx, dtype=dtype)
+
+    profiler = active_profiler()
+    results_list = []
+    for j, obs_item in enumerate(factories):
+        for i, info in enumerate(layout.inserts):
+            with (profiler.activate(observer=_observer_label(obs_item), insert_HU=info.hu)
+                  if profiler is not None else nullcontext()), stage('run_study'):
+                df_res = stream_run_study(grid[i][j], v_sa[i][j], v_sp[i][j], n_reader, pct_split, seed_split,
+                                          resampling)
+            df_res['insert_HU'] = info.hu
+            df_res['insert_diameter_pix'] = 2 * info.diameter
+            results_list.append(df_res)
+    return pd.concat(results_list, ignore_index=True)
+
+def measure_LCD(signal_present: np.ndarray, signal_absent: np.ndarray, ground_truth: Union[np.ndarray, str, Path, PhantomLayout], 
+                observers: Optional[List[Union[str, Any]]] = None, n_reader: int = 10, pct_split: float = 0.5, seed_split: Optional[Union[List[int], np.ndarray]] = None,
+                n_jobs: Optional[int] = 1, executor: Union[str, Executor] = 'process',
+                cache: Optional[Union[str, Path, ResultCache]] = None, resampling: str = 'split',
+                dtype: Optional[Union[str, np.dtype]] = None, profiler: Optional[Profiler] = None,
+                chunk_size: Optional[int] = None) -> pd.DataFrame:
     """Calculates Low Contrast Detectability (LCD) metrics (AUC, SNR).
 
     Args:
-        signal_present: np.ndarray (N, Y, X) of signal present images.
-        signal_absent: np.ndarray (N, Y, X) of signal absent images.
-        ground_truth: np.ndarray (Y, X) ground truth image or Path to mhd file.
-        observers: List of strings (e.g., 'LG_CHO_2D') or Observer instances. Default: ['LG_CHO_2D'].
+        signal_present: np.ndarray (N, Y, X) of signal present images, or (N, Z, Y, X) slabs of
+            Z contiguous slices for volumetric observers (e.g. 'LG_CHO_MS', 'LG_CHO_3D'). The
+            ground truth applies to every slice. A `SharedArray` (e.g. `DatasetHandle.signal_present`
+            from `lcdct.dataserver`) is mapped without copying.
+        signal_absent: np.ndarray (N, Y, X) of signal absent images, or (N, Z, Y, X) slabs.
+        ground_truth: np.ndarray (Y, X) ground truth image, Path to mhd file, or a `PhantomLayout`
+            built from it (reused across calls sharing a ground truth).
+        observers: List of registered observer names (e.g., 'LG_CHO_2D', see `lcdct.registry`),
+            `ObserverFactory` objects or Observer instances. Default: ['LG_CHO_2D'].
         n_reader: Number of readers (bootstraps/splits).
         pct_split: Train/test split ratio (0.0 to 1.0).
         seed_split: List/array of seeds or None.
+        n_jobs: Number of workers running the (observer, insert) studies in parallel; -1 uses all cores.
+            Results are identical to the serial path (`n_jobs=1`) for a given seed.
+        executor: 'process' (ROIs are shared with workers through shared memory), 'thread', or an
+            existing `concurrent.futures.Executor`.
+        cache: Optional `ResultCache` or cache directory. Results are keyed by a hash of the image
+            stacks (file paths, sizes and mtimes for lazily loaded MHD series), ground truth,
+            observers, `n_reader`, `pct_split` and `seed_split`; each (observer, insert) study is
+            cached as well. Calls without `seed_split` are random and never cached.
+        resampling: 'split' (random train/test splits) or 'bootstrap' (train on resamples with
+            replacement, test out of bag), see `Observer.run_study`.
+        dtype: Compute precision of ROIs, channels and projections. 'float32' halves memory and
+            doubles matmul/FFT throughput; channel covariances and their inversion stay in float64.
+            Tolerance (checked in the test suite): AUCs agree with float64 to 1e-3 and SNRs to 0.5 %
+            relative when there are more training images than channels. Rank-deficient channel
+            covariances (e.g. 16 Gabor channels trained on 5 images) amplify any input rounding,
+            float32 images included, and can differ by more.
+            Default (None): ROIs keep the image type and projections use float64.
+        profiler: Optional `lcdct.profiling.Profiler` recording wall time, calls and (optionally)
+            peak allocations of every stage, labeled by observer and insert; see
+            `Profiler.report`. Stages are also recorded when a profiler is activated around the call.
+        chunk_size: Stream the images `chunk_size` at a time instead of extracting all ROIs:
+            only the channel outputs of every ROI are kept (see `lcdct.streaming`), so lazily
+            loaded `MHDStack`s larger than memory can be evaluated. The results are the same.
+            Supports channelized observers (CHOs) only; the studies run serially.
 
     Returns:
         pd.DataFrame: DataFrame containing detailed results for each insert and observer.
+
+    Raises:
+        ValueError: If the inputs, resampling mode or executor are invalid, or `chunk_size` is
+            given with an observer that is not a CHO.
     """
+    if profiler is not None:
+        with profiler.activate():
+            return measure_LCD(signal_present, signal_absent, ground_truth, observers=observers, n_reader=n_reader,
+                               pct_split=pct_split, seed_split=seed_split, n_jobs=n_jobs, executor=executor,
+                               cache=cache, resampling=resampling, dtype=dtype, chunk_size=chunk_size)
+
     if observers is None:
         observers = ['LG_CHO_2D']
+    # shared memory stacks, e.g. from a `lcdct.dataserver.DatasetHandle`, are used in place
+    signal_present, signal_absent = as_array(signal_present), as_array(signal_absent)
 
     # Handle ground truth if it is a path (string/Path)
     if isinstance(ground_truth, (str, Path)):
-        ground_truth = read_mhd(str(ground_truth))
+        with stage('read_ground_truth'):
+            ground_truth = read_mhd(str(ground_truth))
+
+    # Observers depend on channel width which depends on insert radius (MATLAB measure_LCD
+    # updates the properties per insert), so they are instantiated per (observer, insert) task
+    # from their registered factory.
+    factories = [get_observer_factory(o) if isinstance(o, str) else o for o in observers]
+    if resampling not in RESAMPLING_MODES:
+        raise ValueError(f"Unknown resampling mode: {resampling}")
+    check_executor(executor)
 
-    # Instantiate observers if they are strings
-    # But wait, observers depend on channel width which depends on insert radius.
-    # MATLAB measure_LCD logic:
-    # loops observers, loops inserts.
-    # If LG_CHO, updates channel width based on insert radius.
-    # So we probably want to instantiate INSIDE the loop or update existing instances.
-    # The MATLAB code re-instantiates or updates properties.
-    # We will instantiate inside the loop or create a factory.
-    
     # Process inputs
-    # Ensure (N, Y, X)
-    if signal_present.ndim != 3:
-        raise ValueError("signal_present must be 3D (N, Y, X)")
-    if signal_absent.ndim != 3:
-        raise ValueError("signal_absent must be 3D (N, Y, X)")
-        
-    # Get truth masks
-    # truth_masks: (Y, X, N_inserts)
-    truth_masks = get_demo_truth_masks(ground_truth)
-    n_inserts = truth_masks.shape[2]
-    
-    # Determine crop sizes
-    insert_rs = []
-    valid_indices = []
-    for i in range(n_inserts):
-        mask = truth_masks[:, :, i]
-        if np.sum(mask) < 1:
-            continue
-        valid_indices.append(i)
-        # get_insert_radius in utils returns diameter/size?
-        # In utils: returns max bbox dimension (Diameter).
-        r = get_insert_radius(mask)
-        insert_rs.append(r)
-    
-    if not valid_indices:
+    # Ensure (N, Y, X), or (N, Z, Y, X) slabs for volumetric observers
+    if signal_present.ndim not in (3, 4):
+        raise ValueError("signal_present must be 3D (N, Y, X) or 4D (N, Z, Y, X)")
+    if signal_absent.ndim != signal_present.ndim:
+        raise ValueError(f"signal_absent must be {signal_present.ndim}D like signal_present")
+    for obs_item in factories:
+        observer_cls = obs_item.observer_cls if isinstance(obs_item, ObserverFactory) else type(obs_item)
+        roi_ndim = getattr(observer_cls, 'roi_ndim', 2)
+        if roi_ndim != signal_present.ndim - 1:
+            raise ValueError(f"{observer_cls.__name__} expects {'(N, Y, X)' if roi_ndim == 2 else '(N, Z, Y, X)'} "
+                             f"stacks, got {signal_present.ndim}D images")
+
+    # Truth masks, insert sizes and HU values, labeled once per ground truth
+    if isinstance(ground_truth, PhantomLayout):
+        layout = ground_truth
+    else:
+        with stage('layout'):
+            layout = PhantomLayout.from_ground_truth(ground_truth)
+
+    cache = as_result_cache(cache) if seed_split is not None else None
+    if cache is not None:
+        with stage('cache_lookup'):
+            cache_key = fingerprint('measure_LCD', signal_present, signal_absent, layout.to_dict(),
+                                    list(observers), n_reader, pct_split, seed_split, resampling,
+                                    None if dtype is None else np.dtype(dtype).name)
+            cached = cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+    if not layout.inserts:
         print("No valid inserts found in ground truth.")
         return pd.DataFrame()
-        
-    crop_r = max(insert_rs) # max diameter
-    
+
+    crop_r = layout.max_diameter # max diameter
+
+    if chunk_size is not None:
+        results = _streamed_LCD(signal_present, signal_absent, layout, factories, n_reader, pct_split, seed_split,
+                                resampling, dtype, chunk_size)
+        if cache is not None:
+            cache.put(cache_key, results)
+        return results
+
+    # ROIs only depend on the insert: extract every insert once for all observers, as
+    # zero-mean (n_inserts, N, h, w) blocks. Windows reaching past the border are edge-padded.
+    with stage('extract_rois'):
+        sp_rois = layout.extract_rois(signal_present, nx=2*crop_r, dtype=dtype)
+        sa_rois = layout.extract_rois(signal_absent, nx=2*crop_r, dtype=dtype)
+
+    # Channel banks only depend on the ROI shape and the (insert-scaled) observer parameters:
+    # build them once, before the studies (forked worker processes inherit the cache)
+    profiler = active_profiler()
+    for factory in factories:
+        if isinstance(factory, ObserverFactory):
+            for info in layout.inserts:
+                with (profiler.activate(observer=_observer_label(factory), insert_HU=info.hu)
+                      if profiler is not None else nullcontext()), stage('channels'):
+                    factory.channels(sp_rois.shape[2:], info.diameter, dtype)
+
+    # One study per (observer, insert)
+    tasks = [(obs_item, i) for obs_item in factories for i in range(len(layout.inserts))]
+    study_args = (n_reader, pct_split, seed_split, cache, resampling, dtype)
+    # stages of the studies are recorded by task-local profilers (workers may be other processes)
+    profiles = [None if profiler is None else (profiler.memory, {'observer': _observer_label(obs_item),
+                                                                 'insert_HU': layout.inserts[i].hu})
+                for obs_item, i in tasks]
+
+    if resolve_n_jobs(n_jobs) == 1 and not isinstance(executor, Executor):
+        studies = [_study_task(obs_item, sp_rois, sa_rois, i, layout.inserts[i].diameter, *study_args, profile)
+                   for (obs_item, i), profile in zip(tasks, profiles)]
+    else:
+        shared = []
+        try:
+            with get_executor(n_jobs, executor) as pool:
+                if isinstance(pool, ProcessPoolExecutor):
+                    sp_rois, sa_rois = SharedArray.create(sp_rois), SharedArray.create(sa_rois)
+                    shared.extend([sp_rois, sa_rois])
+                futures = [pool.submit(_study_task, obs_item, sp_rois, sa_rois, i, layout.inserts[i].diameter,
+                                       *study_args, profile)
+                           for (obs_item, i), profile in zip(tasks, profiles)]
+                # collect in submission order so results match the serial path
+                studies = [f.result() for f in futures]
+        finally:
+            for handle in shared:
+                handle.unlink()
+
+    if profiler is not None:
+        for _, records in studies:
+            profiler.extend(records)
+        studies = [df_res for df_res, _ in studies]
+
     results_list = []
-    
-    # Loop observers
-    for obs_item in observers:
-        # Loop inserts
-        for idx in valid_indices:
-            truth_mask = truth_masks[:, :, idx]
-            insert_r = get_insert_radius(truth_mask) # Diameter
-            
-            # Create/Configure Observer
-            obs_name = obs_item if isinstance(obs_item, str) else obs_item.type
-            
-            # ROI extraction
-            sp_rois = get_roi_from_truth_mask(truth_mask, signal_present, nx=2*crop_r)
-            sa_rois = get_roi_from_truth_mask(truth_mask, signal_absent, nx=2*crop_r)
-            
-            # Check ROI validity
-            if sp_rois is None or sa_rois is None:
-                continue
-                
-            # Instantiate observer
-            current_obs = None
-            if isinstance(obs_item, str):
-                name = obs_item.upper()
-                if name == 'LG_CHO_2D':
-                    current_obs = LG_CHO(sp_rois, sa_rois, channel_width=2/3 * insert_r)
-                elif name == 'DOG_CHO_2D':
-                    current_obs = DOG_CHO(sp_rois, sa_rois)
-                elif name == 'GABOR_CHO_2D':
-                    current_obs = Gabor_CHO(sp_rois, sa_rois)
-                elif name == 'NPWE_2D':
-                    current_obs = NPWE(sp_rois, sa_rois)
-                else:
-                    raise ValueError(f"Unknown observer: {name}")
-            else:
-                # Assuming object
-                # If LG_CHO, we need to update channel_width?
-                # But we can't easily re-init.
-                # Use as is or warn?
-                current_obs = obs_item
-                # If LG_CHO, manually update if possible
-                if hasattr(current_obs, 'channel_width'):
-                     current_obs.channel_width = 2/3 * insert_r
-                # Update signals
-                current_obs.signal_present = sp_rois - sp_rois.mean(axis=(1, 2), keepdims=True)
-                current_obs.signal_absent = sa_rois - sa_rois.mean(axis=(1, 2), keepdims=True)
-
-            # Determine Insert HU
-            # mode of ground_truth(mask)
-            # mask is boolean. ground_truth is image.
-            # In Python: ground_truth[mask] values.
-            vals = ground_truth[mask > 0]
-            if len(vals) > 0:
-                insert_hu_val = mode(vals, axis=None).mode # scalar
-                if isinstance(insert_hu_val, np.ndarray): # Scipy mode returns array sometimes
-                     insert_hu_val = insert_hu_val[0]
-            else:
-                insert_hu_val = 0
-            
-            # Run Study
-            df_res = current_obs.run_study(n_readers=n_reader, pct_split=pct_split, seed=seed_split)
-            
-            # Append metadata
-            df_res['insert_HU'] = insert_hu_val
-            df_res['insert_diameter_pix'] = 2 * insert_r
-            
-            # Add to list
-            results_list.append(df_res)
+    for (obs_item, i), df_res in zip(tasks, studies):
+        # Append metadata
+        df_res['insert_HU'] = layout.inserts[i].hu
+        df_res['insert_diameter_pix'] = 2 * layout.inserts[i].diameter
+        results_list.append(df_res)
             
     if not results_list:
         return pd.DataFrame()
         
     final_df = pd.concat(results_list, ignore_index=True)
+    if cache is not None:
+        cache.put(cache_key, final_df)
     return final_df
 
+
+def analytic_LCD(signal_absent: Optional[np.ndarray], ground_truth: Union[np.ndarray, str, Path, PhantomLayout],
+                 observers: Optional[List[Union[str, Any]]] = None,
+                 nps: Optional[Union[np.ndarray, Callable[[np.ndarray], np.ndarray]]] = None,
+                 mtf: Optional[Union[np.ndarray, Callable[[np.ndarray], np.ndarray]]] = None) -> pd.DataFrame:
+    """Calculates LCD metrics in closed form from a noise power spectrum instead of realizations.
+
+    The expected signal of every insert is its truth mask scaled by the insert HU, optionally
+    blurred by an MTF; the noise is described by its NPS. Each observer's SNR then follows from
+    `Observer.analytic_metrics` without training: a handful of signal-absent images is enough
+    to estimate the NPS, where `measure_LCD` needs hundreds of realizations to estimate channel
+    covariances. The model assumes stationary noise within the ROI and a signal equal to the
+    (blurred) ground truth contrast.
+
+    Args:
+        signal_absent: Signal-absent images (N, Y, X), or (N, Z, Y, X) slabs for volumetric
+            observers, from which the NPS around every insert is estimated (see
+            `lcdct.nps.estimate_nps`; N >= 2 lets the ensemble mean remove the background).
+            May be None if `nps` is given.
+        ground_truth: Ground truth image (Y, X) (contrast in HU, offset removed), path to an
+            MHD file, or a `PhantomLayout`.
+        observers: Registered names of linear observers (e.g. 'LG_CHO_2D', 'NPWE_2D'),
+            `ObserverFactory` objects or Observer instances. Default: ['LG_CHO_2D'].
+        nps: NPS shared by all inserts, in FFT layout on the ROI grid of `measure_LCD`
+            ((2 * max_diameter + 1) pixels wide) or, better, a larger one (see
+            `lcdct.nps.projection_covariance`), or an isotropic model of radial frequency in
+            cycles/pixel (see `lcdct.nps.radial_nps`), sampled on twice the ROI width.
+        mtf: Optional MTF of the system, applied to the signals (see `lcdct.nps.blur`).
+
+    Returns:
+        pd.DataFrame: One row per (observer, insert) with 'auc', 'snr', 'observer', 'reader' (0),
+            'insert_HU' and 'insert_diameter_pix', as from `measure_LCD`.
+
+    Raises:
+        ValueError: If neither images nor an NPS are given, or the stacks do not suit an observer.
+    """
+    if observers is None:
+        observers = ['LG_CHO_2D']
+    if signal_absent is None and nps is None:
+        raise ValueError("analytic_LCD needs signal_absent images or an nps")
+    if isinstance(ground_truth, (str, Path)):
+        ground_truth = read_mhd(str(ground_truth))
+    layout = ground_truth if isinstance(ground_truth, PhantomLayout) else PhantomLayout.from_ground_truth(ground_truth)
+    factories = [get_observer_factory(o) if isinstance(o, str) else o for o in observers]
+    if not layout.inserts:
+        return pd.DataFrame()
+
+    nx = 2 * layout.max_diameter
+    if signal_absent is not None:
+        signal_absent = as_array(signal_absent)
+        # the NPS is estimated on twice the ROI width, which keeps the periodic noise model of
+        # the DFT from wrapping correlations around the ROI
+        with stage('extract_rois'):
+            noise_rois = layout.extract_rois(signal_absent, nx=2 * nx, remove_dc=False, dtype=np.float64)
+        roi_shape = noise_rois.shape[2:-2] + (nx + 1, nx + 1)
+    else:
+        roi_shape = (nx + 1, nx + 1)
+    for obs_item in factories:
+        observer_cls = obs_item.observer_cls if isinstance(obs_item, ObserverFactory) else type(obs_item)
+        if getattr(observer_cls, 'roi_ndim', 2) != len(roi_shape):
+            raise ValueError(f"{observer_cls.__name__} does not take {len(roi_shape)}D ROIs")
+    if callable(nps):
+        nps = radial_nps(tuple(2 * n - 1 for n in roi_shape), nps)
+
+    results_list = []
+    for i, info in enumerate(layout.inserts):
+        rows, cols = layout.window_indices(info, nx)
+        # the ground truth applies to every slice of a slab
+        signal = np.broadcast_to(info.hu * layout.truth_masks[rows[:, None], cols[None, :], info.index], roi_shape)
+        if mtf is not None:
+            signal = blur(signal, mtf)
+        with stage('nps'):
+            insert_nps = estimate_nps(noise_rois[i]) if nps is None else nps
+        no_images = np.empty((0,) + roi_shape)
+        for obs_item in factories:
+            obs = _make_observer(obs_item, no_images, no_images, info.diameter)
+            with stage('analytic_metrics'):
+                metrics = obs.analytic_metrics(signal, insert_nps)
+            results_list.append({'auc': metrics['auc'], 'snr': metrics['snr'], 'observer': type(obs).__name__,
+                                 'reader': 0, 'insert_HU': info.hu, 'insert_diameter_pix': 2 * info.diameter})
+    return pd.DataFrame(results_list)
+
 import matplotlib.pyplot as plt
 
 def plot_results(results: pd.DataFrame, ylim: Optional[Tuple[float, float]] = None) -> None:
@@ -1,27 +1,266 @@
+from contextlib import nullcontext
 from pathlib import Path
+from math import floor
 import numpy as np
 from sklearn.model_selection import train_test_split
-from sklearn.metrics import roc_auc_score
-from scipy.linalg import pinv
 import pandas as pd
 from typing import Union, List, Optional, Tuple, Dict, Any
-from .functions import laguerre_gaussian_2d
+from .cache import ResultCache, as_result_cache, fingerprint
+from .channels import get_channel_bank
+from .metrics import auc_from_snr, auc_snr
+from .nps import projection_covariance
+from .profiling import Profiler, stage
+
+
+def split_indices(n_samples: int, pct_split: float, seeds: Union[List[int], np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+    """Builds the train/test index arrays of every reader at once.
+
+    The permutations reproduce ``sklearn.model_selection.train_test_split(..., shuffle=True,
+    random_state=seed)`` exactly, so a batched study selects the same images as the
+    per-reader ``get_splits`` path.
+
+    Args:
+        n_samples: Number of images in the stack being split.
+        pct_split: Fraction (float) or number (int) of images used for training.
+        seeds: One integer seed per reader.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: (train_idx, test_idx) of shapes (n_readers, n_train)
+            and (n_readers, n_test).
+
+    Raises:
+        ValueError: If the split leaves the training or testing set empty.
+    """
+    if isinstance(pct_split, (int, np.integer)) and not isinstance(pct_split, bool):
+        n_train = int(pct_split)
+    else:
+        n_train = int(floor(pct_split * n_samples))
+    n_test = n_samples - n_train
+    if n_train < 1 or n_test < 1:
+        raise ValueError(f"pct_split={pct_split} leaves an empty train or test set for {n_samples} images")
+
+    perms = np.array([np.random.RandomState(s).permutation(n_samples) for s in seeds],
+                     dtype=np.intp).reshape(len(seeds), n_samples)
+    return perms[:, n_test:], perms[:, :n_test]
+
+
+def bootstrap_counts(n_samples: int, seeds: Union[List[int], np.ndarray], min_out_of_bag: int = 2,
+                     max_draws: int = 1000) -> np.ndarray:
+    """Draws one bootstrap resample (n_samples draws with replacement) per reader.
+
+    Readers are trained on the images their resample draws and tested on the others, and a
+    variance needs two of each: a resample drawing fewer than two distinct images, or leaving
+    fewer than `min_out_of_bag` undrawn, is redrawn from the reader's random stream.
+
+    Args:
+        n_samples: Number of images in the stack being resampled.
+        seeds: One integer seed per reader.
+        min_out_of_bag: Minimum number of undrawn images per reader.
+        max_draws: Number of resamples drawn per reader before giving up.
+
+    Returns:
+        np.ndarray: Number of times each image is drawn, (n_readers, n_samples).
+
+    Raises:
+        ValueError: If `n_samples` is too small to split that way.
+    """
+    if n_samples < min_out_of_bag + 2:
+        raise ValueError(f"Bootstrap resampling needs at least {min_out_of_bag + 2} images, got {n_samples}")
+    counts = np.empty((len(seeds), n_samples), dtype=np.intp)
+    for r, s in enumerate(seeds):
+        rng = np.random.RandomState(s)
+        for _ in range(max_draws):
+            counts[r] = np.bincount(rng.randint(0, n_samples, n_samples), minlength=n_samples)
+            out_of_bag = np.count_nonzero(counts[r] == 0)
+            if out_of_bag >= min_out_of_bag and n_samples - out_of_bag >= 2:
+                break
+        else:
+            raise ValueError(f"No bootstrap resample of {n_samples} images left {min_out_of_bag} out of bag "
+                             f"in {max_draws} draws (seed {s})")
+    return counts
+
+
+def hotelling_template(mean_sa: np.ndarray, mean_sp: np.ndarray, cov_sa: np.ndarray, cov_sp: np.ndarray,
+                       solver: str = 'pinv') -> np.ndarray:
+    """Computes Hotelling templates in channel space from class means and covariances.
+
+    Args:
+        mean_sa: Signal-absent channel means (R, nch).
+        mean_sp: Signal-present channel means (R, nch).
+        cov_sa: Signal-absent channel covariances (R, nch, nch).
+        cov_sp: Signal-present channel covariances (R, nch, nch).
+        solver: 'pinv' (pseudo-inverse, as MATLAB) or 'solve' (batched linear solves; readers
+            whose covariance is singular to the 'pinv' cutoff use 'pinv', so both agree).
+
+    Returns:
+        np.ndarray: Templates (R, nch).
+    """
+    nch = mean_sa.shape[-1]
+    s_ch = mean_sp - mean_sa  # (R, nch)
+    k = (cov_sa + cov_sp) / 2  # (R, nch, nch)
+    # same cutoff as scipy.linalg.pinv
+    rcond = nch * np.finfo(k.dtype).eps
+
+    def pinv_template(k, s_ch):
+        # Hotelling template in channel space
+        return np.matmul(s_ch[:, None, :], np.linalg.pinv(k, rcond=rcond))[:, 0, :]
+
+    if solver != 'solve':
+        return pinv_template(k, s_ch)
+    # a nearly singular k does not make solve fail, it returns a meaningless template
+    sv = np.linalg.svd(k, compute_uv=False)
+    singular = sv[:, -1] <= rcond * sv[:, 0]
+    w_ch = np.empty_like(s_ch)
+    if (~singular).any():
+        # k is symmetric, so s k^-1 = (k^-1 s)^T
+        w_ch[~singular] = np.linalg.solve(k[~singular], s_ch[~singular, :, None])[:, :, 0]
+    if singular.any():
+        w_ch[singular] = pinv_template(k[singular], s_ch[singular])
+    return w_ch
+
+
+def _stacked_cov(v: np.ndarray) -> np.ndarray:
+    """Sample covariances (R, nch, nch) of stacked channel outputs (R, n, nch)."""
+    c = v - v.mean(axis=1, keepdims=True)
+    return np.matmul(c.transpose(0, 2, 1), c) / (v.shape[1] - 1)
+
+
+def _mean_weights(train_idx: np.ndarray, n: int) -> np.ndarray:
+    """Averaging weights (R, n) selecting each reader's training images (R, n_train)."""
+    weights = np.zeros((len(train_idx), n))
+    np.put_along_axis(weights, train_idx, 1.0 / train_idx.shape[1], axis=1)
+    return weights
+
+
+def hotelling_metrics(tr_sa_ch: np.ndarray, tr_sp_ch: np.ndarray,
+                      te_sa_ch: np.ndarray, te_sp_ch: np.ndarray) -> Dict[str, np.ndarray]:
+    """Trains and tests a stack of Hotelling observers in channel space.
+
+    Every argument holds one set of channel outputs per reader, (R, n, nch). Channel means,
+    covariances, Hotelling templates and decision variables of all readers are computed as
+    stacked array operations.
+
+    Args:
+        tr_sa_ch: Training signal-absent channel outputs (R, n, nch).
+        tr_sp_ch: Training signal-present channel outputs (R, n, nch).
+        te_sa_ch: Testing signal-absent channel outputs (R, n, nch).
+        te_sp_ch: Testing signal-present channel outputs (R, n, nch).
+
+    Returns:
+        Dict[str, np.ndarray]: 'auc' and 'snr' arrays of shape (R,).
+    """
+    # channel statistics and the template are computed in float64 whatever the image precision
+    tr_sa_ch, tr_sp_ch, te_sa_ch, te_sp_ch = (np.asarray(v, dtype=np.float64) for v in (tr_sa_ch, tr_sp_ch, te_sa_ch, te_sp_ch))
+
+    with stage('template'):
+        w_ch = hotelling_template(tr_sa_ch.mean(axis=1), tr_sp_ch.mean(axis=1), _stacked_cov(tr_sa_ch), _stacked_cov(tr_sp_ch))
+
+    with stage('decision_variables'):
+        t_sa = np.matmul(te_sa_ch, w_ch[:, :, None])[..., 0]
+        t_sp = np.matmul(te_sp_ch, w_ch[:, :, None])[..., 0]
+    return auc_snr(t_sa, t_sp)
+
+
+def bootstrap_hotelling_metrics(v_sa: np.ndarray, v_sp: np.ndarray,
+                                counts_sa: np.ndarray, counts_sp: np.ndarray) -> Dict[str, np.ndarray]:
+    """Trains Hotelling observers on bootstrap resamples and tests them out of bag.
+
+    Each reader's training moments are weighted sums over the channel outputs, so all readers
+    are trained with a few matrix products and batched (nch, nch) solves; each reader is tested
+    on the images its resample did not draw.
+
+    Args:
+        v_sa: Signal-absent channel outputs (n_sa, nch).
+        v_sp: Signal-present channel outputs (n_sp, nch).
+        counts_sa: Draw counts of the signal-absent images per reader (R, n_sa), see `bootstrap_counts`.
+        counts_sp: Draw counts of the signal-present images per reader (R, n_sp).
+
+    Returns:
+        Dict[str, np.ndarray]: 'auc' and 'snr' arrays of shape (R,).
+    """
+    def moments(v, counts):
+        n = counts.sum(axis=1)[:, None]
+        mean = counts @ v / n  # (R, nch)
+        # covariance of centered data for numerical stability
+        c = v - v.mean(axis=0)
+        c_mean = counts @ c / n
+        second = np.matmul((counts[:, :, None] * c).transpose(0, 2, 1), c)  # (R, nch, nch)
+        cov = (second - n[:, :, None] * c_mean[:, :, None] * c_mean[:, None, :]) / (n[:, :, None] - 1)
+        return mean, cov
+
+    v_sa, v_sp = np.asarray(v_sa, dtype=np.float64), np.asarray(v_sp, dtype=np.float64)
+    with stage('template'):
+        mean_sa, cov_sa = moments(v_sa, counts_sa)
+        mean_sp, cov_sp = moments(v_sp, counts_sp)
+        w_ch = hotelling_template(mean_sa, mean_sp, cov_sa, cov_sp, solver='solve')
+
+    with stage('decision_variables'):
+        t_sa, t_sp = (v_sa @ w_ch.T).T, (v_sp @ w_ch.T).T
+    return auc_snr(t_sa, t_sp, counts_sa == 0, counts_sp == 0)
+
+
+def channel_reader_metrics(v_sa: np.ndarray, v_sp: np.ndarray, pct_split: float, seeds: Union[List[int], np.ndarray],
+                           resampling: str = 'split') -> Dict[str, np.ndarray]:
+    """Evaluates the Hotelling observer of every reader from the channel outputs of all images.
+
+    Each reader's split (or bootstrap resample) is a set of index arrays (or draw counts) into
+    the channel outputs, see `split_indices` and `bootstrap_counts`.
+
+    Args:
+        v_sa: Signal-absent channel outputs (n_sa, nch).
+        v_sp: Signal-present channel outputs (n_sp, nch).
+        pct_split: Percentage of data used for training.
+        seeds: Split seed of each reader.
+        resampling: 'split' or 'bootstrap', see `Observer.run_study`.
+
+    Returns:
+        Dict[str, np.ndarray]: 'auc' and 'snr' arrays with one entry per reader.
+    """
+    if resampling == 'bootstrap':
+        with stage('splits'):
+            counts_sa, counts_sp = bootstrap_counts(len(v_sa), seeds), bootstrap_counts(len(v_sp), seeds)
+        return bootstrap_hotelling_metrics(v_sa, v_sp, counts_sa, counts_sp)
+    with stage('splits'):
+        tr_sa, te_sa = split_indices(len(v_sa), pct_split, seeds)
+        tr_sp, te_sp = split_indices(len(v_sp), pct_split, seeds)
+    return hotelling_metrics(v_sa[tr_sa], v_sp[tr_sp], v_sa[te_sa], v_sp[te_sp])
+
+
+RESAMPLING_MODES = ['split', 'bootstrap']
+
 
 class Observer:
     """Base class for Model Observers."""
-    
-    def __init__(self, signal_present: np.ndarray, signal_absent: np.ndarray):
+
+    # dimensionality of one ROI: 2 for (N, Y, X) stacks, 3 for volumetric (N, Z, Y, X) stacks
+    roi_ndim = 2
+
+    def __init__(self, signal_present: np.ndarray, signal_absent: np.ndarray, remove_dc: bool = True,
+                 dtype: Optional[Union[str, np.dtype]] = None):
         """Initialize the observer with signal-present and signal-absent images.
 
         Args:
-            signal_present: Array of signal-present images (N, Y, X) or (N,).
-            signal_absent: Array of signal-absent images (N, Y, X) or (N,).
+            signal_present: Array of signal-present images (N, Y, X), volumes (N, Z, Y, X) or (N,).
+            signal_absent: Array of signal-absent images (N, Y, X), volumes (N, Z, Y, X) or (N,).
+            remove_dc: Subtract the mean of every image. Pass False for images that are already
+                zero-mean (e.g. from `PhantomLayout.extract_rois`); they are then used without a copy.
+            dtype: Compute precision of images, channels and projections, e.g. 'float32'.
+                Channel covariances and their inversion always use float64. Default (None): the
+                images keep their type and projections are computed in float64.
         """
+        self.dtype = None if dtype is None else np.dtype(dtype).name
+        if self.dtype is not None and signal_present is not None:
+            signal_present = signal_present.astype(self.dtype, copy=False)
+            signal_absent = signal_absent.astype(self.dtype, copy=False)
+        if not remove_dc:
+            self.signal_present = signal_present
+            self.signal_absent = signal_absent
         # subtract DC component
-        if signal_present.ndim == 3:
-            # (N, Y, X)
-             self.signal_present = signal_present - signal_present.mean(axis=(1, 2), keepdims=True)
-             self.signal_absent = signal_absent - signal_absent.mean(axis=(1, 2), keepdims=True)
+        elif signal_present.ndim >= 3:
+            # (N, Y, X) or (N, Z, Y, X)
+             axes = tuple(range(1, signal_present.ndim))
+             self.signal_present = signal_present - signal_present.mean(axis=axes, keepdims=True)
+             self.signal_absent = signal_absent - signal_absent.mean(axis=axes, keepdims=True)
         else:
             self.signal_present = signal_present - signal_present.mean()
             self.signal_absent = signal_absent - signal_absent.mean()
@@ -56,37 +295,150 @@ signal absent array shape [n, y, x]:  {self.signal_absent.shape}'''
             seed: Random seed for splitting.
 
         Returns:
-            Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]: 
+            Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
                 (sa_train, sa_test, sp_train, sp_test).
         """
         sp_train, sp_test = train_test_split(self.signal_present, train_size=pct_split, shuffle=True, random_state=seed)
         sa_train, sa_test = train_test_split(self.signal_absent, train_size=pct_split, shuffle=True, random_state=seed)
         return sa_train, sa_test, sp_train, sp_test
 
-    def run_study(self, n_readers: int = 10, pct_split: float = 0.5, seed: list = None) -> pd.DataFrame:
+    def cache_params(self) -> Dict[str, Any]:
+        """Returns the observer parameters (all non-image attributes) identifying its results."""
+        return {k: v for k, v in vars(self).items() if k not in ('signal_present', 'signal_absent')}
+
+    @property
+    def channel_dtype(self) -> np.dtype:
+        """Type of channel matrices and templates: `dtype`, or float64 by default."""
+        return np.dtype(self.dtype or np.float64)
+
+    def run_study(self, n_readers: int = 10, pct_split: float = 0.5, seed: list = None,
+                  cache: Optional[Union[str, Path, ResultCache]] = None, resampling: str = 'split',
+                  profiler: Optional[Profiler] = None) -> pd.DataFrame:
         """Runs multiple bootstraps/splits of the study.
 
         Args:
             n_readers: Number of random splits (readers).
             pct_split: Percentage of data used for training.
             seed: List of seeds for each reader, or None.
+            cache: Optional `ResultCache` or cache directory. Results are looked up by a hash of
+                the images, observer parameters, `n_readers`, `pct_split`, `seed` and
+                `resampling`. Studies without a seed are random and never cached.
+            resampling: 'split' (each reader trains on a random `pct_split` fraction and tests on
+                the rest) or 'bootstrap' (each reader trains on a resample with replacement of all
+                images and tests on the images not drawn; `pct_split` is ignored). Bootstrap
+                readers are evaluated in closed form from the channel outputs, so thousands of
+                readers cost little more than one.
+            profiler: Optional `lcdct.profiling.Profiler` recording the stages of the study
+                (channelization, templates, decision variables, AUC/SNR), labeled with the
+                observer class.
 
         Returns:
             pd.DataFrame: Results dataframe with cols 'auc', 'snr', 'observer', 'reader'.
+
+        Raises:
+            ValueError: If the resampling mode is unknown or not supported by the observer.
+        """
+        if resampling not in RESAMPLING_MODES:
+            raise ValueError(f"Unknown resampling mode: {resampling}")
+        with (profiler.activate(observer=self.__class__.__name__) if profiler is not None else nullcontext()), \
+                stage('run_study'):
+            cache = as_result_cache(cache) if seed is not None else None
+            if cache is not None:
+                with stage('cache_lookup'):
+                    key = fingerprint('run_study', self, self.signal_present, self.signal_absent, n_readers, pct_split,
+                                      seed, resampling)
+                    cached = cache.get(key)
+                if cached is not None:
+                    return cached
+
+            rng = np.random.default_rng(seed=seed)
+            # Seeds for each reader
+            seed_split = rng.integers(0, 100000, size=n_readers)
+
+            metrics = self.reader_metrics(pct_split=pct_split, seeds=seed_split, resampling=resampling)
+            results = pd.DataFrame({'auc': metrics['auc'],
+                                    'snr': metrics['snr'],
+                                    'observer': self.__class__.__name__,
+                                    'reader': np.arange(n_readers)})
+            if cache is not None:
+                cache.put(key, results)
+            return results
+
+    def reader_metrics(self, pct_split: float, seeds: Union[List[int], np.ndarray],
+                       resampling: str = 'split') -> Dict[str, np.ndarray]:
+        """Calculates the metrics of every reader, one train/test split per seed.
+
+        Subclasses that can evaluate all readers as stacked array operations override this;
+        the default performs one study per reader.
+
+        Args:
+            pct_split: Percentage of data used for training.
+            seeds: Split seed of each reader.
+            resampling: 'split' or 'bootstrap', see `run_study`.
+
+        Returns:
+            Dict[str, np.ndarray]: 'auc' and 'snr' arrays with one entry per reader.
+
+        Raises:
+            ValueError: If the observer does not support the resampling mode.
+        """
+        if resampling != 'split':
+            raise ValueError(f"{self.__class__.__name__} does not support resampling='{resampling}'")
+        results = [self.perform_study(*self._reader_split(pct_split, s)) for s in seeds]
+        return {'auc': np.array([r['auc'] for r in results], dtype=float),
+                'snr': np.array([r['snr'] for r in results], dtype=float)}
+
+    def _reader_split(self, pct_split: float, seed: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        sa_train, sa_test, sp_train, sp_test = self.get_splits(pct_split=pct_split, seed=seed)
+        return sa_train, sp_train, sa_test, sp_test
+
+    def spatial_template(self, sa_train: np.ndarray, sp_train: np.ndarray) -> np.ndarray:
+        """Trains the observer and returns its template in image space.
+
+        The decision variable of an ROI g is sum(template * g), so the template can be scanned
+        over larger images (see `lcdct.search`). Implemented by linear observers.
+
+        Args:
+            sa_train: Training signal-absent ROIs (N, Y, X).
+            sp_train: Training signal-present ROIs (N, Y, X).
+
+        Returns:
+            np.ndarray: Template with the shape of one ROI.
+        """
+        raise NotImplementedError(f"{self.__class__.__name__} has no spatial template")
+
+    def spatial_templates(self, sa_rois: np.ndarray, sp_rois: np.ndarray,
+                          train_sa: np.ndarray, train_sp: np.ndarray) -> np.ndarray:
+        """Trains one observer per reader and returns their templates in image space.
+
+        Args:
+            sa_rois: Signal-absent ROIs (N, Y, X).
+            sp_rois: Signal-present ROIs (N, Y, X).
+            train_sa: Training signal-absent indices of every reader (R, n_train), see `split_indices`.
+            train_sp: Training signal-present indices of every reader (R, n_train).
+
+        Returns:
+            np.ndarray: Templates (R, Y, X), see `spatial_template`.
+        """
+        return np.stack([self.spatial_template(sa_rois[tr_sa], sp_rois[tr_sp]) for tr_sa, tr_sp in zip(train_sa, train_sp)])
+
+    def analytic_metrics(self, signal: np.ndarray, nps: np.ndarray, remove_dc: bool = True) -> Dict[str, float]:
+        """Calculates the metrics of the fully trained observer in closed form.
+
+        The signal is known exactly and the noise is modelled by its NPS (see `lcdct.nps`), so
+        no image realizations are needed. Implemented by linear observers.
+
+        Args:
+            signal: Expected signal, i.e. mean signal-present minus mean signal-absent ROI (Y, X).
+            nps: Noise power spectrum in FFT layout on the ROI grid or a larger one, see
+                `lcdct.nps.projection_covariance`.
+            remove_dc: Model the DC removal of the ROIs (as in `measure_LCD`) by projecting the
+                ROI mean out of the observer's templates.
+
+        Returns:
+            Dict[str, float]: AUC = Phi(SNR / sqrt(2)) and SNR.
         """
-        rng = np.random.default_rng(seed=seed)
-        # Seeds for each reader
-        seed_split = rng.integers(0, 100000, size=n_readers)
-        
-        results = []
-        for reader in range(n_readers):
-            sa_train, sa_test, sp_train, sp_test = self.get_splits(pct_split=pct_split, seed=seed_split[reader])
-            res = self.perform_study(sa_train, sp_train, sa_test, sp_test)
-            res['observer'] = self.__class__.__name__
-            res['reader'] = reader
-            results.append(res)
-            
-        return pd.DataFrame(results)
+        raise NotImplementedError(f"{self.__class__.__name__} has no closed-form metrics")
 
     def calculate_metrics(self, sa_train: np.ndarray, sp_train: np.ndarray, sa_test: np.ndarray, sp_test: np.ndarray) -> Dict[str, float]:
         """Calculates AUC and SNR metrics. Must be implemented by subclasses.
@@ -103,10 +455,136 @@ signal absent array shape [n, y, x]:  {self.signal_absent.shape}'''
         raise NotImplementedError
 
 
-class LG_CHO(Observer):
+class CHO(Observer):
+    """Base class for Channelized Hotelling Observers.
+
+    Subclasses only define their channels in :meth:`get_channels`; training, testing and the
+    batched multi-reader engine are shared.
+    """
+
+    def get_channels(self, ny: int, nx: int) -> np.ndarray:
+        """Builds the channel matrix for (ny, nx) ROIs.
+
+        Args:
+            ny: ROI height.
+            nx: ROI width.
+
+        Returns:
+            np.ndarray: Channel matrix of shape (ny * nx, nch).
+        """
+        raise NotImplementedError
+
+    def channelize(self, images: np.ndarray) -> np.ndarray:
+        """Projects images onto the observer channels.
+
+        Args:
+            images: Image stack (N, Y, X), or (N, Z, Y, X) for volumetric observers.
+
+        Returns:
+            np.ndarray: Channel outputs (N, nch).
+        """
+        with stage('channelize'):
+            ch = self.get_channels(*images.shape[1:])
+            return images.reshape(images.shape[0], -1) @ ch
+
+    def spatial_template(self, sa_train: np.ndarray, sp_train: np.ndarray) -> np.ndarray:
+        """Trains the Hotelling template in channel space and maps it back through the channels.
+
+        Args:
+            sa_train: Training signal-absent ROIs (N, Y, X), or (N, Z, Y, X) for volumetric observers.
+            sp_train: Training signal-present ROIs.
+
+        Returns:
+            np.ndarray: Template U w with the shape of one ROI.
+        """
+        v_sa, v_sp = (np.asarray(self.channelize(x), dtype=np.float64) for x in (sa_train, sp_train))
+        w_ch = hotelling_template(v_sa.mean(axis=0)[None], v_sp.mean(axis=0)[None],
+                                  np.cov(v_sa, rowvar=False)[None], np.cov(v_sp, rowvar=False)[None])[0]
+        return (self.get_channels(*sa_train.shape[1:]) @ w_ch.astype(self.channel_dtype)).reshape(sa_train.shape[1:])
+
+    def spatial_templates(self, sa_rois: np.ndarray, sp_rois: np.ndarray,
+                          train_sa: np.ndarray, train_sp: np.ndarray) -> np.ndarray:
+        """Trains the templates of all readers from one channelization, as `hotelling_metrics`.
+
+        Args:
+            sa_rois: Signal-absent ROIs (N, Y, X), or (N, Z, Y, X) for volumetric observers.
+            sp_rois: Signal-present ROIs.
+            train_sa: Training signal-absent indices of every reader (R, n_train).
+            train_sp: Training signal-present indices of every reader (R, n_train).
+
+        Returns:
+            np.ndarray: Templates (R, ...) with the shape of one ROI each.
+        """
+        v_sa, v_sp = (np.asarray(self.channelize(x), dtype=np.float64)[idx]
+                      for x, idx in ((sa_rois, train_sa), (sp_rois, train_sp)))
+        w_ch = hotelling_template(v_sa.mean(axis=1), v_sp.mean(axis=1), _stacked_cov(v_sa), _stacked_cov(v_sp))
+        channels = self.get_channels(*sa_rois.shape[1:])
+        return (channels @ w_ch.T.astype(self.channel_dtype)).T.reshape((len(w_ch),) + sa_rois.shape[1:])
+
+    def analytic_metrics(self, signal: np.ndarray, nps: np.ndarray, remove_dc: bool = True) -> Dict[str, float]:
+        """Calculates the channelized Hotelling SNR from the signal and the NPS.
+
+        The channel response to the signal is U^T s and the channel covariance
+        K = (1 / P) sum_f conj(U(f)) NPS(f) U(f)^T, so SNR^2 = s^T U K^-1 U^T s: the limit of
+        `calculate_metrics` for infinitely many training and test images of stationary noise.
+
+        Args:
+            signal: Expected signal (Y, X), or (Z, Y, X) for volumetric observers.
+            nps: Noise power spectrum in FFT layout, see `Observer.analytic_metrics`.
+            remove_dc: Project the ROI mean out of the channels.
+
+        Returns:
+            Dict[str, float]: AUC and SNR.
+        """
+        signal = np.asarray(signal, dtype=np.float64)
+        channels = np.asarray(self.get_channels(*signal.shape), dtype=np.float64).T
+        if remove_dc:
+            channels = channels - channels.mean(axis=1, keepdims=True)
+        v_s = channels @ signal.ravel()
+        k = projection_covariance(channels.reshape((-1,) + signal.shape), nps)
+        w_ch = hotelling_template(np.zeros_like(v_s)[None], v_s[None], k[None], k[None])[0]
+        snr = float(np.sqrt(max(w_ch @ v_s, 0.0)))
+        return {'auc': auc_from_snr(snr), 'snr': snr}
+
+    def calculate_metrics(self, trimg_sa: np.ndarray, trimg_sp: np.ndarray, testimg_sa: np.ndarray, testimg_sp: np.ndarray) -> Dict[str, float]:
+        """Calculates CHO metrics for a single train/test split.
+
+        Args:
+           trimg_sa: Training signal-absent images (N, Y, X).
+           trimg_sp: Training signal-present images (N, Y, X).
+           testimg_sa: Testing signal-absent images (N, Y, X).
+           testimg_sp: Testing signal-present images (N, Y, X).
+
+        Returns:
+            Dict[str, float]: AUC and SNR.
+        """
+        res = hotelling_metrics(*(self.channelize(x)[None] for x in (trimg_sa, trimg_sp, testimg_sa, testimg_sp)))
+        return {'auc': float(res['auc'][0]), 'snr': float(res['snr'][0])}
+
+    def reader_metrics(self, pct_split: float, seeds: Union[List[int], np.ndarray],
+                       resampling: str = 'split') -> Dict[str, np.ndarray]:
+        """Calculates the metrics of every reader in one batched pass.
+
+        All images are projected onto the channels once; each reader's split (or bootstrap
+        resample) is then a set of index arrays (or draw counts) into the channel outputs.
+
+        Args:
+            pct_split: Percentage of data used for training.
+            seeds: Split seed of each reader.
+            resampling: 'split' or 'bootstrap', see `run_study`.
+
+        Returns:
+            Dict[str, np.ndarray]: 'auc' and 'snr' arrays with one entry per reader.
+        """
+        return channel_reader_metrics(self.channelize(self.signal_absent), self.channelize(self.signal_present),
+                                      pct_split, seeds, resampling)
+
+
+class LG_CHO(CHO):
     """Laguerre-Gaussian Channelized Hotelling Observer."""
-    
-    def __init__(self, signal_present: np.ndarray, signal_absent: np.ndarray, channel_width: float, n_channels: int = 5):
+
+    def __init__(self, signal_present: np.ndarray, signal_absent: np.ndarray, channel_width: float, n_channels: int = 5, remove_dc: bool = True,
+                 dtype: Optional[Union[str, np.dtype]] = None):
         """Initializes the LG_CHO observer.
 
         Args:
@@ -114,174 +592,66 @@ class LG_CHO(Observer):
             signal_absent: Training signal-absent images.
             channel_width: Gaussian width parameter for Laguerre-Gaussian channels.
             n_channels: Number of channels.
+            remove_dc: Subtract the mean of every image (see `Observer`).
+            dtype: Compute precision (see `Observer`).
         """
-        super().__init__(signal_present, signal_absent)
+        super().__init__(signal_present, signal_absent, remove_dc, dtype)
         self.channel_width = channel_width
         self.n_channels = n_channels
         self.type = 'LG_CHO_2D'
 
-    def calculate_metrics(self, trimg_sa: np.ndarray, trimg_sp: np.ndarray, testimg_sa: np.ndarray, testimg_sp: np.ndarray) -> Dict[str, float]:
-        """Calculates CHO metrics using Laguerre-Gaussian channels.
+    def get_channels(self, ny: int, nx: int) -> np.ndarray:
+        """Returns the cached Laguerre-Gaussian channels for (ny, nx) ROIs.
 
         Args:
-           trimg_sa: Training signal-absent images (N, Y, X).
-           trimg_sp: Training signal-present images (N, Y, X).
-           testimg_sa: Testing signal-absent images (N, Y, X).
-           testimg_sp: Testing signal-present images (N, Y, X).
+            ny: ROI height.
+            nx: ROI width.
 
         Returns:
-            Dict[str, float]: AUC and SNR.
+            np.ndarray: Channel matrix of shape (ny * nx, n_channels).
         """
-        n_sa, ny, nx = trimg_sa.shape
-        # Assuming images are (N, Y, X)
-        
-        # LG channels
-        # Coordinate system centered
-        xi = np.arange(nx) - (nx - 1) / 2
-        yi = np.arange(ny) - (ny - 1) / 2
-        xxi, yyi = np.meshgrid(xi, yi) # Note: meshgrid default is 'xy' -> xxi corresponds to columns (x), yyi to rows (y)
-        r = np.sqrt(xxi**2 + yyi**2)
-        
-        u = laguerre_gaussian_2d(r, self.n_channels - 1, self.channel_width)
-        # u shape: (ny, nx, nch)
-        
-        ch = u.reshape(nx * ny, self.n_channels)
-        
-        # Training
-        # Flatten images: (N, Y*X)
-        tr_sa_flat = trimg_sa.reshape(trimg_sa.shape[0], -1)
-        tr_sp_flat = trimg_sp.reshape(trimg_sp.shape[0], -1)
-        
-        # Project onto channels: (N, nch)
-        tr_sa_ch = tr_sa_flat @ ch
-        tr_sp_ch = tr_sp_flat @ ch
-        
-        # Mean stats
-        s_ch = np.mean(tr_sp_ch, axis=0) - np.mean(tr_sa_ch, axis=0) # (nch,)
-        
-        k_sa = np.cov(tr_sa_ch, rowvar=False)
-        k_sp = np.cov(tr_sp_ch, rowvar=False)
-        k = (k_sa + k_sp) / 2
-        
-        # Hotelling template in Channel Space
-        # w_ch = inv(K) * s_ch
-        w_ch = s_ch @ pinv(k) # (nch,)
-        
-        # Testing
-        te_sa_flat = testimg_sa.reshape(testimg_sa.shape[0], -1)
-        te_sp_flat = testimg_sp.reshape(testimg_sp.shape[0], -1)
-        
-        te_sa_ch = te_sa_flat @ ch
-        te_sp_ch = te_sp_flat @ ch
-        
-        # Decision variables
-        t_sa = te_sa_ch @ w_ch
-        t_sp = te_sp_ch @ w_ch
-        
-        # Metrics
-        snr = (np.mean(t_sp) - np.mean(t_sa)) / np.sqrt((np.std(t_sp, ddof=1)**2 + np.std(t_sa, ddof=1)**2) / 2)
-        
-        # ROC AUC
-        y_true = np.concatenate([np.zeros(len(t_sa)), np.ones(len(t_sp))])
-        y_scores = np.concatenate([t_sa, t_sp])
-        auc = roc_auc_score(y_true, y_scores)
-        
-        return {'auc': auc, 'snr': snr}
-
-
-class DOG_CHO(Observer):
+        return get_channel_bank('LG', (ny, nx), dtype=self.channel_dtype, n_channels=self.n_channels, channel_width=self.channel_width)
+
+
+class DOG_CHO(CHO):
     """Difference of Gaussian Channelized Hotelling Observer."""
-    
-    def __init__(self, signal_present: np.ndarray, signal_absent: np.ndarray, type: str = 'dense'):
+
+    def __init__(self, signal_present: np.ndarray, signal_absent: np.ndarray, type: str = 'dense', remove_dc: bool = True,
+                 dtype: Optional[Union[str, np.dtype]] = None):
         """Initializes the DOG_CHO observer.
 
         Args:
            signal_present: Training signal-present images.
            signal_absent: Training signal-absent images.
            type: 'dense' or 'sparse'.
+           remove_dc: Subtract the mean of every image (see `Observer`).
+           dtype: Compute precision (see `Observer`).
         """
-        super().__init__(signal_present, signal_absent)
+        super().__init__(signal_present, signal_absent, remove_dc, dtype)
         self.dog_type = type
         self.type = 'DOG_CHO_2D'
 
-    def calculate_metrics(self, trimg_sa: np.ndarray, trimg_sp: np.ndarray, testimg_sa: np.ndarray, testimg_sp: np.ndarray) -> Dict[str, float]:
-        """Calculates CHO metrics using Difference-of-Gaussian channels.
+    def get_channels(self, ny: int, nx: int) -> np.ndarray:
+        """Returns the cached Difference-of-Gaussian channels for (ny, nx) ROIs.
 
         Args:
-           trimg_sa: Training signal-absent images (N, Y, X).
-           trimg_sp: Training signal-present images (N, Y, X).
-           testimg_sa: Testing signal-absent images (N, Y, X).
-           testimg_sp: Testing signal-present images (N, Y, X).
+            ny: ROI height.
+            nx: ROI width.
 
         Returns:
-            Dict[str, float]: AUC and SNR.
+            np.ndarray: Channel matrix of shape (ny * nx, nch).
 
         Raises:
             ValueError: If an unknown DOG type is specified.
         """
-        n_sa, ny, nx = trimg_sa.shape
-        
-        # Build DOG channels
-        fi = (np.arange(nx) - (nx - 1) / 2) / nx
-        fx, fy = np.meshgrid(fi, fi)
-        fxy = fx**2 + fy**2
-        
-        if self.dog_type == 'dense':
-            a0, a, Q, nch = 0.005, 1.4, 1.67, 10
-        elif self.dog_type == 'sparse':
-            a0, a, Q, nch = 0.015, 2.0, 2.0, 3
-        else:
-            raise ValueError(f"Unknown DOG type: {self.dog_type}")
-            
-        sdog_list = []
-        for i in range(1, nch + 1): # 1 to nch
-            aj = a0 * (a**(i - 1))
-            # aj1 = a0 * (a**i) # Unused in MATLAB code loop? actually used for next band implicitly but equation uses `aj`
-            
-            exp1 = np.exp(-fxy / (Q * aj)**2 / 2) # Note: MATLAB (Q*aj)^2/2
-            exp2 = np.exp(-fxy / aj**2 / 2)
-            sdogfreq = exp1 - exp2
-            
-            # ifftshift, ifft2, fftshift
-            sdog_spatial = np.fft.fftshift(np.fft.ifft2(np.fft.ifftshift(sdogfreq)))
-            sdog_list.append(sdog_spatial.real) # Should be real
-            
-        ch = np.stack(sdog_list, axis=-1).reshape(nx * ny, nch)
-        
-        # Training
-        tr_sa_flat = trimg_sa.reshape(trimg_sa.shape[0], -1)
-        tr_sp_flat = trimg_sp.reshape(trimg_sp.shape[0], -1)
-        
-        tr_sa_ch = tr_sa_flat @ ch
-        tr_sp_ch = tr_sp_flat @ ch
-        
-        s_ch = np.mean(tr_sp_ch, axis=0) - np.mean(tr_sa_ch, axis=0)
-        k = (np.cov(tr_sa_ch, rowvar=False) + np.cov(tr_sp_ch, rowvar=False)) / 2
-        w_ch = s_ch @ pinv(k)
-        
-        # Testing
-        te_sa_flat = testimg_sa.reshape(testimg_sa.shape[0], -1)
-        te_sp_flat = testimg_sp.reshape(testimg_sp.shape[0], -1)
-        
-        te_sa_ch = te_sa_flat @ ch
-        te_sp_ch = te_sp_flat @ ch
-        
-        t_sa = te_sa_ch @ w_ch
-        t_sp = te_sp_ch @ w_ch
-        
-        snr = (np.mean(t_sp) - np.mean(t_sa)) / np.sqrt((np.std(t_sp, ddof=1)**2 + np.std(t_sa, ddof=1)**2) / 2)
-        
-        y_true = np.concatenate([np.zeros(len(t_sa)), np.ones(len(t_sp))])
-        y_scores = np.concatenate([t_sa, t_sp])
-        auc = roc_auc_score(y_true, y_scores)
-        
-        return {'auc': auc, 'snr': snr}
-
-
-class Gabor_CHO(Observer):
+        return get_channel_bank('DOG', (ny, nx), dtype=self.channel_dtype, dog_type=self.dog_type)
+
+
+class Gabor_CHO(CHO):
     """Gabor Channelized Hotelling Observer."""
-    
-    def __init__(self, signal_present: np.ndarray, signal_absent: np.ndarray, nband: int = 4, ntheta: int = 4, phase: Union[int, List[int]] = 0):
+
+    def __init__(self, signal_present: np.ndarray, signal_absent: np.ndarray, nband: int = 4, ntheta: int = 4, phase: Union[int, List[int]] = 0, remove_dc: bool = True,
+                 dtype: Optional[Union[str, np.dtype]] = None):
         """Initializes the Gabor_CHO observer.
 
         Args:
@@ -290,103 +660,277 @@ class Gabor_CHO(Observer):
             nband: Number of frequency bands.
             ntheta: Number of orientations.
             phase: Phase value or list of phases.
+            remove_dc: Subtract the mean of every image (see `Observer`).
+            dtype: Compute precision (see `Observer`).
         """
-        super().__init__(signal_present, signal_absent)
+        super().__init__(signal_present, signal_absent, remove_dc, dtype)
         self.nband = nband
         self.ntheta = ntheta
         self.phase = [phase] if np.isscalar(phase) else phase
         self.type = 'GABOR_CHO_2D'
 
-    def calculate_metrics(self, trimg_sa: np.ndarray, trimg_sp: np.ndarray, testimg_sa: np.ndarray, testimg_sp: np.ndarray) -> Dict[str, float]:
-        """Calculates CHO metrics using Gabor channels.
+    def get_channels(self, ny: int, nx: int) -> np.ndarray:
+        """Returns the cached Gabor channels for (ny, nx) ROIs.
 
         Args:
-           trimg_sa: Training signal-absent images (N, Y, X).
-           trimg_sp: Training signal-present images (N, Y, X).
-           testimg_sa: Testing signal-absent images (N, Y, X).
-           testimg_sp: Testing signal-present images (N, Y, X).
+            ny: ROI height.
+            nx: ROI width.
 
         Returns:
-            Dict[str, float]: AUC and SNR.
+            np.ndarray: Channel matrix of shape (ny * nx, nband * ntheta * len(phase)).
+        """
+        return get_channel_bank('GABOR', (ny, nx), dtype=self.channel_dtype, nband=self.nband, ntheta=self.ntheta, phase=self.phase)
+
+
+class LG_CHO_3D(CHO):
+    """Volumetric Laguerre-Gaussian Channelized Hotelling Observer with radially symmetric 3-D channels."""
+
+    roi_ndim = 3
+
+    def __init__(self, signal_present: np.ndarray, signal_absent: np.ndarray, channel_width: float, n_channels: int = 5,
+                 z_scale: float = 1.0, remove_dc: bool = True, dtype: Optional[Union[str, np.dtype]] = None):
+        """Initializes the LG_CHO_3D observer.
+
+        Args:
+            signal_present: Training signal-present volumes (N, Z, Y, X).
+            signal_absent: Training signal-absent volumes (N, Z, Y, X).
+            channel_width: Gaussian width parameter (pixels) of the Laguerre-Gaussian channels.
+            n_channels: Number of channels.
+            z_scale: Slice spacing in pixels, so channels stay spherical in physical space.
+            remove_dc: Subtract the mean of every volume (see `Observer`).
+            dtype: Compute precision (see `Observer`).
+        """
+        super().__init__(signal_present, signal_absent, remove_dc, dtype)
+        self.channel_width = channel_width
+        self.n_channels = n_channels
+        self.z_scale = z_scale
+        self.type = 'LG_CHO_3D'
+
+    def get_channels(self, nz: int, ny: int, nx: int) -> np.ndarray:
+        """Returns the cached 3-D Laguerre-Gaussian channels for (nz, ny, nx) ROIs.
+
+        The channels are not separable, but a dense projection costs no more than separable
+        passes would for as many channels: one multiply-add per voxel and channel.
+
+        Returns:
+            np.ndarray: Channel matrix of shape (nz * ny * nx, n_channels).
+        """
+        return get_channel_bank('LG3D', (nz, ny, nx), dtype=self.channel_dtype, n_channels=self.n_channels,
+                                channel_width=self.channel_width, z_scale=self.z_scale)
+
+
+class MultiSliceCHO(CHO):
+    """Base class for CHOs of volumetric ROIs (N, Z, Y, X) with separable channels.
+
+    Every channel is the product u_c(y, x) v_k(z) of a 2-D in-plane channel and a profile along z
+    (see `channels.z_channels`). Volumes are projected onto the in-plane channels slice by slice
+    and the result onto the z profiles, so the cost grows with nch + n_z_channels instead of
+    their product, and slices outside every profile (single-slice CHO) are never read.
+    Subclasses define the in-plane channels in :meth:`in_plane_channels`.
+    """
+
+    roi_ndim = 3
+
+    def __init__(self, signal_present: np.ndarray, signal_absent: np.ndarray, z_channels: str = 'slices',
+                 n_z_channels: int = 3, z_width: Optional[float] = None, remove_dc: bool = True,
+                 dtype: Optional[Union[str, np.dtype]] = None):
+        """Initializes the z profiles of the observer.
+
+        Args:
+            signal_present: Training signal-present volumes (N, Z, Y, X).
+            signal_absent: Training signal-absent volumes (N, Z, Y, X).
+            z_channels: 'center' (single-slice CHO), 'slices' (multi-slice CHO: the in-plane
+                channels of every slice) or 'lg' (Laguerre-Gauss profiles along z).
+            n_z_channels: Number of 'lg' profiles.
+            z_width: Width of the 'lg' profiles in slices. Default: Z / 2.
+            remove_dc: Subtract the mean of every volume (see `Observer`).
+            dtype: Compute precision (see `Observer`).
+        """
+        super().__init__(signal_present, signal_absent, remove_dc, dtype)
+        self.z_channels = z_channels
+        self.n_z_channels = n_z_channels
+        self.z_width = z_width
+
+    def in_plane_channels(self, ny: int, nx: int) -> np.ndarray:
+        """Builds the 2-D channel matrix (ny * nx, nch) applied to every slice."""
+        raise NotImplementedError
+
+    def z_profiles(self, nz: int) -> np.ndarray:
+        """Returns the cached channel profiles along z, of shape (nz, n_z)."""
+        return get_channel_bank('Z', (nz,), dtype=self.channel_dtype, mode=self.z_channels,
+                                n_channels=self.n_z_channels, width=self.z_width)
+
+    def get_channels(self, nz: int, ny: int, nx: int) -> np.ndarray:
+        """Builds the equivalent dense channel matrix, for code that needs it explicitly.
+
+        `channelize` applies the separable factors instead.
+
+        Returns:
+            np.ndarray: Channel matrix of shape (nz * ny * nx, nch * n_z), channel c * n_z + k
+                being in-plane channel c times z profile k.
+        """
+        in_plane, profiles = self.in_plane_channels(ny, nx), self.z_profiles(nz)
+        return np.einsum('zk,pc->zpck', profiles, in_plane).reshape(nz * ny * nx, -1)
+
+    def channelize(self, images: np.ndarray) -> np.ndarray:
+        """Projects volumes onto the observer channels.
+
+        Args:
+            images: Volume stack (N, Z, Y, X).
+
+        Returns:
+            np.ndarray: Channel outputs (N, nch * n_z), ordered as in `get_channels`.
         """
-        n_sa, ny, nx = trimg_sa.shape
-        
-        xi = np.arange(nx) - (nx - 1) / 2
-        yi = np.arange(ny) - (ny - 1) / 2
-        xxi, yyi = np.meshgrid(xi, yi)
-        r2 = xxi**2 + yyi**2
-        
-        theta_list = np.arange(0, np.pi, np.pi / self.ntheta)
-        f0 = 1/8.0
-        
-        gb_channels = []
-        
-        for i in range(self.nband):
-            f1 = f0 / 2
-            fc = (f0 + f1) / 2
-            wf = f0 - f1
-            ws = 4 * np.log(2) / (np.pi * wf)
-            amp = np.exp(-4 * np.log(2) * r2 / ws**2)
-            
-            for theta_val in theta_list:
-                for ph in self.phase:
-                    # cos(2*pi*fc*(x*cos + y*sin) + ph)
-                    # MATLAB: xxi*cos + yyi*sin
-                    fcos = np.cos(2 * np.pi * fc * (xxi * np.cos(theta_val) + yyi * np.sin(theta_val)) + ph)
-                    u = amp * fcos
-                    gb_channels.append(u)
-            
-            f0 = f1
-            
-        # Stack channels
-        ch_stack = np.stack(gb_channels, axis=-1)
-        nch = ch_stack.shape[-1]
-        ch = ch_stack.reshape(nx * ny, nch)
-        
-        # Training and Testing same as generic CHO
-        tr_sa_flat = trimg_sa.reshape(trimg_sa.shape[0], -1)
-        tr_sp_flat = trimg_sp.reshape(trimg_sp.shape[0], -1)
-        
-        tr_sa_ch = tr_sa_flat @ ch
-        tr_sp_ch = tr_sp_flat @ ch
-        
-        s_ch = np.mean(tr_sp_ch, axis=0) - np.mean(tr_sa_ch, axis=0)
-        k = (np.cov(tr_sa_ch, rowvar=False) + np.cov(tr_sp_ch, rowvar=False)) / 2
-        w_ch = s_ch @ pinv(k)
-        
-        te_sa_flat = testimg_sa.reshape(testimg_sa.shape[0], -1)
-        te_sp_flat = testimg_sp.reshape(testimg_sp.shape[0], -1)
-        
-        te_sa_ch = te_sa_flat @ ch
-        te_sp_ch = te_sp_flat @ ch
-        
-        t_sa = te_sa_ch @ w_ch
-        t_sp = te_sp_ch @ w_ch
-        
-        snr = (np.mean(t_sp) - np.mean(t_sa)) / np.sqrt((np.std(t_sp, ddof=1)**2 + np.std(t_sa, ddof=1)**2) / 2)
-        
-        y_true = np.concatenate([np.zeros(len(t_sa)), np.ones(len(t_sp))])
-        y_scores = np.concatenate([t_sa, t_sp])
-        auc = roc_auc_score(y_true, y_scores)
-        
-        return {'auc': auc, 'snr': snr}
+        with stage('channelize'):
+            n, nz, ny, nx = images.shape
+            in_plane, profiles = self.in_plane_channels(ny, nx), self.z_profiles(nz)
+            used = np.flatnonzero(np.any(profiles != 0, axis=1))
+            if len(used) < nz:
+                images, profiles = images[:, used], profiles[used]
+            v = images.reshape(n * len(used), ny * nx) @ in_plane
+            return (v.reshape(n, len(used), -1).transpose(0, 2, 1) @ profiles).reshape(n, -1)
+
+
+class LG_CHO_MS(MultiSliceCHO):
+    """Multi-slice Laguerre-Gaussian Channelized Hotelling Observer."""
+
+    def __init__(self, signal_present: np.ndarray, signal_absent: np.ndarray, channel_width: float, n_channels: int = 5,
+                 z_channels: str = 'slices', n_z_channels: int = 3, z_width: Optional[float] = None,
+                 remove_dc: bool = True, dtype: Optional[Union[str, np.dtype]] = None):
+        """Initializes the LG_CHO_MS observer.
+
+        Args:
+            signal_present: Training signal-present volumes (N, Z, Y, X).
+            signal_absent: Training signal-absent volumes (N, Z, Y, X).
+            channel_width: Gaussian width parameter for Laguerre-Gaussian channels.
+            n_channels: Number of in-plane channels.
+            z_channels: Profiles along z, see `MultiSliceCHO`.
+            n_z_channels: Number of 'lg' profiles.
+            z_width: Width of the 'lg' profiles in slices.
+            remove_dc: Subtract the mean of every volume (see `Observer`).
+            dtype: Compute precision (see `Observer`).
+        """
+        super().__init__(signal_present, signal_absent, z_channels, n_z_channels, z_width, remove_dc, dtype)
+        self.channel_width = channel_width
+        self.n_channels = n_channels
+        self.type = 'LG_CHO_MS'
+
+    def in_plane_channels(self, ny: int, nx: int) -> np.ndarray:
+        """Returns the cached Laguerre-Gaussian channels of one slice, see `LG_CHO.get_channels`."""
+        return get_channel_bank('LG', (ny, nx), dtype=self.channel_dtype, n_channels=self.n_channels, channel_width=self.channel_width)
+
+
+class LG_CHO_SS(LG_CHO_MS):
+    """Single-slice Laguerre-Gaussian Channelized Hotelling Observer: the central slice of each volume."""
+
+    def __init__(self, signal_present: np.ndarray, signal_absent: np.ndarray, channel_width: float, n_channels: int = 5,
+                 remove_dc: bool = True, dtype: Optional[Union[str, np.dtype]] = None):
+        """Initializes the LG_CHO_SS observer, see `LG_CHO_MS`."""
+        super().__init__(signal_present, signal_absent, channel_width, n_channels, z_channels='center',
+                         remove_dc=remove_dc, dtype=dtype)
+        self.type = 'LG_CHO_SS'
+
+
+class Gabor_CHO_MS(MultiSliceCHO):
+    """Multi-slice Gabor Channelized Hotelling Observer."""
+
+    def __init__(self, signal_present: np.ndarray, signal_absent: np.ndarray, nband: int = 4, ntheta: int = 4,
+                 phase: Union[int, List[int]] = 0, z_channels: str = 'slices', n_z_channels: int = 3,
+                 z_width: Optional[float] = None, remove_dc: bool = True, dtype: Optional[Union[str, np.dtype]] = None):
+        """Initializes the Gabor_CHO_MS observer.
+
+        Args:
+            signal_present: Training signal-present volumes (N, Z, Y, X).
+            signal_absent: Training signal-absent volumes (N, Z, Y, X).
+            nband: Number of frequency bands.
+            ntheta: Number of orientations.
+            phase: Phase value or list of phases.
+            z_channels: Profiles along z, see `MultiSliceCHO`.
+            n_z_channels: Number of 'lg' profiles.
+            z_width: Width of the 'lg' profiles in slices.
+            remove_dc: Subtract the mean of every volume (see `Observer`).
+            dtype: Compute precision (see `Observer`).
+        """
+        super().__init__(signal_present, signal_absent, z_channels, n_z_channels, z_width, remove_dc, dtype)
+        self.nband = nband
+        self.ntheta = ntheta
+        self.phase = [phase] if np.isscalar(phase) else phase
+        self.type = 'GABOR_CHO_MS'
+
+    def in_plane_channels(self, ny: int, nx: int) -> np.ndarray:
+        """Returns the cached Gabor channels of one slice, see `Gabor_CHO.get_channels`."""
+        return get_channel_bank('GABOR', (ny, nx), dtype=self.channel_dtype, nband=self.nband, ntheta=self.ntheta, phase=self.phase)
 
 
 class NPWE(Observer):
     """Non-Prewhitening Eye Model Observer."""
     
-    def __init__(self, signal_present: np.ndarray, signal_absent: np.ndarray, eye: bool = False):
+    def __init__(self, signal_present: np.ndarray, signal_absent: np.ndarray, eye: bool = False, remove_dc: bool = True,
+                 dtype: Optional[Union[str, np.dtype]] = None):
         """Initializes the NPWE observer.
 
         Args:
             signal_present: Training signal-present images.
             signal_absent: Training signal-absent images.
             eye: Boolean, whether to use the eye filter.
+            remove_dc: Subtract the mean of every image (see `Observer`).
+            dtype: Compute precision (see `Observer`).
         """
-        super().__init__(signal_present, signal_absent)
+        super().__init__(signal_present, signal_absent, remove_dc, dtype)
         self.eye = eye
         self.type = 'NPWE_2D'
 
+    def template(self, signal: np.ndarray) -> np.ndarray:
+        """Folds the eye-filtered frequency-domain inner product into a spatial template.
+
+        The MATLAB observer scores an image g as real(s_eye(:)' * g_eye(:)) with
+        s_eye = fftshift(fft2(s)) .* eyeflt. Because the filter is fixed this equals the spatial
+        inner product of g with w = N * real(ifft2(fft2(s) .* ifftshift(eyeflt).^2)), N = ny * nx,
+        so test images are scored with a single matrix-vector product and no per-image FFTs.
+
+        Args:
+            signal: Mean signal image(s) (..., Y, X).
+
+        Returns:
+            np.ndarray: Spatial template(s) with the same shape as `signal`.
+        """
+        ny, nx = signal.shape[-2:]
+        weight = get_channel_bank('NPWE', (ny, nx), dtype=self.channel_dtype, eye=self.eye)
+        return (ny * nx * np.fft.ifft2(np.fft.fft2(signal) * weight).real).astype(self.channel_dtype, copy=False)
+
+    def spatial_template(self, sa_train: np.ndarray, sp_train: np.ndarray) -> np.ndarray:
+        """Returns the template of the mean training signal, see `template`."""
+        return self.template(np.mean(sp_train, axis=0) - np.mean(sa_train, axis=0))
+
+    def spatial_templates(self, sa_rois: np.ndarray, sp_rois: np.ndarray,
+                          train_sa: np.ndarray, train_sp: np.ndarray) -> np.ndarray:
+        """Returns the templates of every reader's mean training signal, formed as in `reader_metrics`."""
+        sa_flat, sp_flat = sa_rois.reshape(len(sa_rois), -1), sp_rois.reshape(len(sp_rois), -1)
+        s = (self._weights(_mean_weights(train_sp, len(sp_flat))) @ sp_flat
+             - self._weights(_mean_weights(train_sa, len(sa_flat))) @ sa_flat)
+        return self.template(s.reshape((len(train_sa),) + sa_rois.shape[1:]))
+
+    def analytic_metrics(self, signal: np.ndarray, nps: np.ndarray, remove_dc: bool = True) -> Dict[str, float]:
+        """Calculates the NPWE SNR w^T s / sqrt(w^T K w) of the signal's template from the NPS.
+
+        Args:
+            signal: Expected signal (Y, X).
+            nps: Noise power spectrum in FFT layout, see `Observer.analytic_metrics`.
+            remove_dc: Remove the mean of the signal and of the template.
+
+        Returns:
+            Dict[str, float]: AUC and SNR.
+        """
+        signal = np.asarray(signal, dtype=np.float64)
+        if remove_dc:
+            signal = signal - signal.mean()
+        w = np.asarray(self.template(signal), dtype=np.float64)
+        if remove_dc:
+            w = w - w.mean()
+        variance = projection_covariance(w[None], nps)[0, 0]
+        snr = float(np.sum(w * signal) / np.sqrt(variance))
+        return {'auc': auc_from_snr(snr), 'snr': snr}
+
     def calculate_metrics(self, trimg_sa: np.ndarray, trimg_sp: np.ndarray, testimg_sa: np.ndarray, testimg_sp: np.ndarray) -> Dict[str, float]:
         """Calculates NPWE metrics.
 
@@ -399,81 +943,60 @@ class NPWE(Observer):
         Returns:
             Dict[str, float]: AUC and SNR.
         """
-        n_sa, ny, nx = trimg_sa.shape
-        
-        # Eye filter
-        # disp_dx = 54/128 # mm
-        # fi = ...
-        # f_ratio = 1/0.1146
-        
-        disp_dx = 54.0 / 128.0
-        fi = (np.arange(nx) - (nx - 1) / 2) / (nx - 1) / disp_dx
-        fx, fy = np.meshgrid(fi, fi)
-        f_ratio = 1.0 / 0.1146
-        fxy = (fx**2 + fy**2) * f_ratio**2
-        
-        beta = 1.3
-        c = 0.04
-        
-        if self.eye:
-            eyeflt = (fxy**(beta / 2)) * np.exp(-c * fxy)
-        else:
-            eyeflt = np.ones((ny, nx)) / (nx * ny) # MATLAB: ones(nx,ny)/nx/ny
-            # Wait, MATLAB: `ones(nx, ny)/nx/ny`
-            # This scale factor 1/(nx*ny) might be important for normalization?
-            # Or is it an artifact of FFT implementation?
-            # The MATLAB code comments say "equivalent to no filtering by setting 'eyeflt' to ones."
-            # But line 67 says `ones(nx, ny)/nx/ny`.
-            # I will follow MATLAB logic strictly.
-            
         # Training (mean signal)
-        # s_eye = fftshift(fft2(s)) .* eyeflt
         s = np.mean(trimg_sp, axis=0) - np.mean(trimg_sa, axis=0)
-        s_fft = np.fft.fftshift(np.fft.fft2(s))
-        s_eye = s_fft * eyeflt
-        
+        w = self.template(s).ravel()
+
         # Testing
-        # te_sa_eye = fftshift(fft2(test_img)) .* eyeflt
-        # t_sa = real(s_eye(:)' * te_sa_eye(:))
-        # Internal product in freq domain involves conj?
-        # MATLAB `s_eye(:)' * te_sa_eye` is dot product.
-        # `s_eye` is complex. `s_eye(:)'` is conjugate transpose (Hermitian).
-        # So it is sum(conj(s_eye) * te_sa_eye).
-        # This is equivalent to cross-correlation at 0 lag in freq domain if handled correctly.
-        # Or Just inner product.
-        
-        # Let's Vectorize testing
-        # Test images: (N, Y, X)
-        # FFT all
-        
-        # We can optimize: s_eye is constant.
-        # t = Real( Sum( Conj(S_eye) * Test_Eye ) )
-        
-        flattened_s_eye = s_eye.flatten() # 1D array
-        
-        def project(images: np.ndarray) -> np.ndarray:
-            # images: (N, Y, X)
-            n_imgs = images.shape[0]
-            scores = np.zeros(n_imgs)
-            for i in range(n_imgs):
-                tmp = np.fft.fftshift(np.fft.fft2(images[i])) * eyeflt
-                # dot product: s_eye' * tmp
-                # np.vdot(a, b) does conjugate(a) * b?
-                # MATLAB: s_eye(:)' * te_sa_eye
-                # This is conjugate transpose of s_eye
-                # np.vdot(a, b) is sum(conj(a)*b). So correct.
-                # using vdot on flattened arrays
-                val = np.vdot(flattened_s_eye, tmp.flatten())
-                scores[i] = val.real
-            return scores
-
-        t_sa = project(testimg_sa)
-        t_sp = project(testimg_sp)
-        
-        snr = (np.mean(t_sp) - np.mean(t_sa)) / np.sqrt((np.std(t_sp, ddof=1)**2 + np.std(t_sa, ddof=1)**2) / 2)
-        
-        y_true = np.concatenate([np.zeros(len(t_sa)), np.ones(len(t_sp))])
-        y_scores = np.concatenate([t_sa, t_sp])
-        auc = roc_auc_score(y_true, y_scores)
-        
-        return {'auc': auc, 'snr': snr}
+        t_sa = testimg_sa.reshape(testimg_sa.shape[0], -1) @ w
+        t_sp = testimg_sp.reshape(testimg_sp.shape[0], -1) @ w
+
+        return auc_snr(t_sa, t_sp)
+
+    def reader_metrics(self, pct_split: float, seeds: Union[List[int], np.ndarray],
+                       resampling: str = 'split') -> Dict[str, np.ndarray]:
+        """Calculates the metrics of every reader in one batched pass.
+
+        The mean signals of all readers are formed with one matrix product, their templates with
+        one batched FFT, and every image is scored against every template at once.
+
+        Args:
+            pct_split: Percentage of data used for training.
+            seeds: Split seed of each reader.
+            resampling: 'split' or 'bootstrap', see `run_study`.
+
+        Returns:
+            Dict[str, np.ndarray]: 'auc' and 'snr' arrays with one entry per reader.
+        """
+        n_readers = len(seeds)
+        sa_flat = self.signal_absent.reshape(self.signal_absent.shape[0], -1)
+        sp_flat = self.signal_present.reshape(self.signal_present.shape[0], -1)
+        if resampling == 'bootstrap':
+            with stage('splits'):
+                c_sa, c_sp = bootstrap_counts(len(sa_flat), seeds), bootstrap_counts(len(sp_flat), seeds)
+            with stage('template'):
+                s = self._weights(c_sp / len(sp_flat)) @ sp_flat - self._weights(c_sa / len(sa_flat)) @ sa_flat
+                w = self.template(s.reshape((n_readers,) + self.signal_present.shape[1:])).reshape(n_readers, -1)
+            with stage('decision_variables'):
+                t_sa, t_sp = (np.asarray((flat @ w.T).T, dtype=np.float64) for flat in (sa_flat, sp_flat))
+            return auc_snr(t_sa, t_sp, c_sa == 0, c_sp == 0)
+
+        with stage('splits'):
+            tr_sa, te_sa = split_indices(len(sa_flat), pct_split, seeds)
+            tr_sp, te_sp = split_indices(len(sp_flat), pct_split, seeds)
+
+        # Mean signal of every reader (R, Y*X)
+        with stage('template'):
+            s = self._weights(_mean_weights(tr_sp, len(sp_flat))) @ sp_flat - self._weights(_mean_weights(tr_sa, len(sa_flat))) @ sa_flat
+            w = self.template(s.reshape((n_readers,) + self.signal_present.shape[1:])).reshape(n_readers, -1)
+
+        # Score every image with every reader's template, then select each reader's test images
+        with stage('decision_variables'):
+            readers = np.arange(n_readers)[:, None]
+            t_sa = np.asarray((sa_flat @ w.T)[te_sa, readers], dtype=np.float64)
+            t_sp = np.asarray((sp_flat @ w.T)[te_sp, readers], dtype=np.float64)
+        return auc_snr(t_sa, t_sp)
+
+    def _weights(self, weights: np.ndarray) -> np.ndarray:
+        # averaging weights in the compute precision, so the images are not promoted to float64
+        return weights if self.dtype is None else weights.astype(self.dtype)
@@ -1,3 +1,10 @@
-from .LCD import measure_LCD, plot_results
-from .Observers import LG_CHO, DOG_CHO, Gabor_CHO, NPWE
-from .utils import load_dataset, read_mhd, get_demo_truth_masks
+from .LCD import measure_LCD, analytic_LCD, plot_results
+from .search import search_LCD
+from .Observers import LG_CHO, DOG_CHO, Gabor_CHO, NPWE, LG_CHO_SS, LG_CHO_MS, Gabor_CHO_MS, LG_CHO_3D
+from .utils import load_dataset, read_mhd, get_demo_truth_masks, get_truth_labels
+from .layout import PhantomLayout
+from .registry import ObserverFactory, register_observer, available_observers
+from .profiling import Profiler
+from .store import ResultStore
+from .dataserver import DatasetRegistry, DatasetClient
+from .channels import get_channel_bank, channel_cache_info, clear_channel_cache
@@ -0,0 +1,156 @@
+"""
+Persistent on-disk cache of LCD study results.
+
+Results are stored as NPZ files named by a hash of everything that determines them: the image
+data (content hash, or file paths plus sizes and mtimes for memory-mapped MHD series), the
+ground truth, observer parameters, number of readers, split ratio and seeds.
+"""
+from pathlib import Path
+import hashlib
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+from typing import Union, Optional, Any
+
+from .mhd import MHDStack
+
+# bump when a change alters the results computed for identical inputs
+CACHE_VERSION = 1
+
+
+def _feed(h: 'hashlib._Hash', obj: Any) -> None:
+    """Feeds a canonical byte representation of `obj` into hash `h`."""
+    if isinstance(obj, MHDStack):
+        h.update(b'mhd')
+        files = [obj.filename] + [Path(f) for f in obj.header['DataFileList'] if f != 'LOCAL']
+        for f in files:
+            st = os.stat(f)
+            h.update(f"{Path(f).resolve()}:{st.st_size}:{st.st_mtime_ns}".encode())
+        _feed(h, (obj.offset, obj.dtype.str))
+    elif isinstance(obj, np.ndarray):
+        arr = np.ascontiguousarray(obj)
+        h.update(f"nd{arr.dtype.str}{arr.shape}".encode())
+        h.update(arr.view(np.uint8).reshape(-1) if arr.size else b'')
+    elif isinstance(obj, dict):
+        h.update(b'dict')
+        for k in sorted(obj, key=str):
+            _feed(h, k)
+            _feed(h, obj[k])
+    elif isinstance(obj, (list, tuple)):
+        h.update(f"seq{len(obj)}".encode())
+        for v in obj:
+            _feed(h, v)
+    elif isinstance(obj, np.generic):
+        _feed(h, obj.item())
+    elif obj is None or isinstance(obj, (str, int, float, bool, Path)):
+        h.update(f"{type(obj).__name__}:{obj!r}".encode())
+    elif hasattr(obj, 'cache_params'):
+        # Observer instances
+        _feed(h, (type(obj).__module__, type(obj).__qualname__, obj.cache_params()))
+    else:
+        raise TypeError(f"Cannot fingerprint object of type {type(obj).__name__}")
+
+
+def fingerprint(*parts: Any) -> str:
+    """Returns a hex digest identifying `parts` (arrays, MHD stacks, observers, scalars, containers).
+
+    Args:
+        *parts: Objects determining a result.
+
+    Returns:
+        str: 32 character hex digest.
+    """
+    h = hashlib.blake2b(digest_size=16)
+    _feed(h, CACHE_VERSION)
+    for p in parts:
+        _feed(h, p)
+    return h.hexdigest()
+
+
+class ResultCache:
+    """Directory of cached result DataFrames with size-bounded, least-recently-used eviction."""
+
+    def __init__(self, cache_dir: Union[str, Path], max_bytes: Optional[int] = 1 << 30):
+        """Opens (and creates) a cache directory.
+
+        Args:
+            cache_dir: Directory holding the cached results.
+            max_bytes: Total size above which the least recently used entries are removed.
+                None disables eviction.
+        """
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}('{self.cache_dir}', max_bytes={self.max_bytes})"
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.npz"
+
+    def get(self, key: str) -> Optional[pd.DataFrame]:
+        """Returns the cached DataFrame for `key`, or None on a miss."""
+        path = self._path(key)
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                columns = [str(c) for c in data['__columns__']]
+                df = pd.DataFrame({c: data[f"col_{i}"] for i, c in enumerate(columns)})
+        except (FileNotFoundError, KeyError, ValueError, OSError):
+            return None
+        try:
+            os.utime(path)  # mark as recently used
+        except OSError:
+            pass
+        return df
+
+    def put(self, key: str, df: pd.DataFrame) -> None:
+        """Stores `df` under `key` and evicts old entries if the cache is over its size bound."""
+        arrays = {'__columns__': np.array([str(c) for c in df.columns])}
+        for i, c in enumerate(df.columns):
+            col = np.asarray(df[c].to_numpy())
+            # numbers keep their dtype, labels are stored as strings (no pickled objects)
+            arrays[f"col_{i}"] = col if col.dtype.kind in 'biuf' else col.astype(str)
+        fd, tmp = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.savez(f, **arrays)
+            os.replace(tmp, self._path(key))
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        self.evict()
+
+    def evict(self) -> None:
+        """Removes least recently used entries until the cache fits in `max_bytes`."""
+        if self.max_bytes is None:
+            return
+        entries = []
+        for p in self.cache_dir.glob('*.npz'):
+            try:
+                st = p.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, st.st_size, p))
+        total = sum(e[1] for e in entries)
+        for _, size, p in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                p.unlink()
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def clear(self) -> None:
+        """Removes every cached entry."""
+        for p in self.cache_dir.glob('*.npz'):
+            p.unlink()
+
+
+def as_result_cache(cache: Optional[Union[str, Path, ResultCache]]) -> Optional[ResultCache]:
+    """Accepts a ResultCache, a cache directory, or None."""
+    if cache is None or isinstance(cache, ResultCache):
+        return cache
+    return ResultCache(cache)
@@ -0,0 +1,325 @@
+"""
+Channel banks for the channelized Hotelling observers.
+
+Channel matrices only depend on the ROI shape and the observer parameters, so they are built
+once and kept in a bounded LRU cache shared by every observer instance.
+"""
+from collections import OrderedDict, namedtuple
+from threading import Lock
+import numpy as np
+from typing import Union, List, Optional, Tuple, Dict, Any, Callable, Hashable
+
+from .functions import laguerre, laguerre_gaussian_2d
+
+CacheInfo = namedtuple('CacheInfo', ['hits', 'misses', 'maxsize', 'currsize'])
+
+
+class ChannelCache:
+    """Bounded least-recently-used cache of read-only channel matrices."""
+
+    def __init__(self, maxsize: int = 64):
+        """Initializes an empty cache.
+
+        Args:
+            maxsize: Maximum number of channel matrices kept.
+        """
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._store = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key: Hashable, build: Callable[[], np.ndarray]) -> np.ndarray:
+        """Returns the cached matrix for `key`, building and storing it on a miss.
+
+        Args:
+            key: Hashable cache key.
+            build: Zero-argument callable producing the channel matrix.
+
+        Returns:
+            np.ndarray: Read-only, C-contiguous channel matrix (float64 unless `build` returns
+                another floating point type).
+        """
+        with self._lock:
+            if key in self._store:
+                self.hits += 1
+                self._store.move_to_end(key)
+                return self._store[key]
+            self.misses += 1
+
+        ch = np.ascontiguousarray(build())
+        if not np.issubdtype(ch.dtype, np.floating):
+            ch = ch.astype(np.float64)
+        ch.flags.writeable = False
+
+        with self._lock:
+            self._store[key] = ch
+            self._store.move_to_end(key)
+            while len(self._store) > self.maxsize:
+                self._store.popitem(last=False)
+        return ch
+
+    def info(self) -> CacheInfo:
+        """Returns hit/miss counters and the current cache size."""
+        with self._lock:
+            return CacheInfo(self.hits, self.misses, self.maxsize, len(self._store))
+
+    def resize(self, maxsize: int) -> None:
+        """Changes the cache bound, evicting the oldest entries if needed."""
+        with self._lock:
+            self.maxsize = maxsize
+            while len(self._store) > self.maxsize:
+                self._store.popitem(last=False)
+
+    def clear(self) -> None:
+        """Empties the cache and resets the counters."""
+        with self._lock:
+            self._store.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+channel_cache = ChannelCache()
+
+
+def channel_cache_info() -> CacheInfo:
+    """Returns hit/miss counters of the shared channel cache."""
+    return channel_cache.info()
+
+
+def clear_channel_cache() -> None:
+    """Empties the shared channel cache."""
+    channel_cache.clear()
+
+
+def lg_channels(ny: int, nx: int, n_channels: int, channel_width: float) -> np.ndarray:
+    """Builds Laguerre-Gaussian channels centered on the ROI.
+
+    Args:
+        ny: ROI height.
+        nx: ROI width.
+        n_channels: Number of channels.
+        channel_width: Gaussian width parameter.
+
+    Returns:
+        np.ndarray: Channel matrix of shape (ny * nx, n_channels).
+    """
+    # Coordinate system centered
+    xi = np.arange(nx) - (nx - 1) / 2
+    yi = np.arange(ny) - (ny - 1) / 2
+    xxi, yyi = np.meshgrid(xi, yi) # Note: meshgrid default is 'xy' -> xxi corresponds to columns (x), yyi to rows (y)
+    r = np.sqrt(xxi**2 + yyi**2)
+
+    u = laguerre_gaussian_2d(r, n_channels - 1, channel_width)
+    # u shape: (ny, nx, nch)
+    return u.reshape(nx * ny, n_channels)
+
+
+def lg_channels_3d(nz: int, ny: int, nx: int, n_channels: int, channel_width: float, z_scale: float = 1.0) -> np.ndarray:
+    """Builds radially symmetric 3-D Laguerre-Gaussian channels centered on a volume ROI.
+
+    Args:
+        nz: Number of slices.
+        ny: ROI height.
+        nx: ROI width.
+        n_channels: Number of channels.
+        channel_width: Gaussian width parameter (pixels).
+        z_scale: Slice spacing in pixels, e.g. 2.5 for 1.25 mm slices of 0.5 mm pixels.
+
+    Returns:
+        np.ndarray: Channel matrix of shape (nz * ny * nx, n_channels).
+    """
+    zi = (np.arange(nz) - (nz - 1) / 2) * z_scale
+    yi = np.arange(ny) - (ny - 1) / 2
+    xi = np.arange(nx) - (nx - 1) / 2
+    r = np.sqrt(zi[:, None, None]**2 + yi[None, :, None]**2 + xi[None, None, :]**2)
+    return laguerre_gaussian_2d(r, n_channels - 1, channel_width).reshape(nz * ny * nx, n_channels)
+
+
+def z_channels(nz: int, mode: str = 'slices', n_channels: int = 3, width: Optional[float] = None) -> np.ndarray:
+    """Builds channel profiles along z for multi-slice observers.
+
+    Args:
+        nz: Number of slices.
+        mode: 'center' (the central slice, or the mean of the two central ones: single-slice
+            CHO), 'slices' (every slice separately: multi-slice CHO) or 'lg' (`n_channels`
+            even Laguerre-Gauss profiles exp(-pi z^2 / w^2) L_k(2 pi z^2 / w^2)).
+        n_channels: Number of 'lg' profiles.
+        width: Width w of the 'lg' profiles in slices. Default: nz / 2.
+
+    Returns:
+        np.ndarray: Profiles of shape (nz, n_z_channels).
+
+    Raises:
+        ValueError: If the mode is unknown.
+    """
+    if mode == 'center':
+        profile = np.zeros((nz, 1))
+        profile[(nz - 1) // 2:nz // 2 + 1] = 1
+        return profile / profile.sum()
+    if mode == 'slices':
+        return np.eye(nz)
+    if mode == 'lg':
+        width = nz / 2 if width is None else width
+        z2 = np.pi * (np.arange(nz) - (nz - 1) / 2)**2 / width**2
+        return laguerre(2 * z2, n_channels - 1) * np.exp(-z2)[:, None]
+    raise ValueError(f"Unknown z channel mode: {mode}")
+
+
+def dog_channels(ny: int, nx: int, dog_type: str = 'dense') -> np.ndarray:
+    """Builds Difference-of-Gaussian channels.
+
+    Args:
+        ny: ROI height.
+        nx: ROI width.
+        dog_type: 'dense' (10 channels) or 'sparse' (3 channels).
+
+    Returns:
+        np.ndarray: Channel matrix of shape (ny * nx, nch).
+
+    Raises:
+        ValueError: If an unknown DOG type is specified.
+    """
+    fi = (np.arange(nx) - (nx - 1) / 2) / nx
+    fx, fy = np.meshgrid(fi, fi)
+    fxy = fx**2 + fy**2
+
+    if dog_type == 'dense':
+        a0, a, Q, nch = 0.005, 1.4, 1.67, 10
+    elif dog_type == 'sparse':
+        a0, a, Q, nch = 0.015, 2.0, 2.0, 3
+    else:
+        raise ValueError(f"Unknown DOG type: {dog_type}")
+
+    sdog_list = []
+    for i in range(1, nch + 1): # 1 to nch
+        aj = a0 * (a**(i - 1))
+
+        exp1 = np.exp(-fxy / (Q * aj)**2 / 2) # Note: MATLAB (Q*aj)^2/2
+        exp2 = np.exp(-fxy / aj**2 / 2)
+        sdogfreq = exp1 - exp2
+
+        # ifftshift, ifft2, fftshift
+        sdog_spatial = np.fft.fftshift(np.fft.ifft2(np.fft.ifftshift(sdogfreq)))
+        sdog_list.append(sdog_spatial.real) # Should be real
+
+    return np.stack(sdog_list, axis=-1).reshape(nx * ny, nch)
+
+
+def gabor_channels(ny: int, nx: int, nband: int = 4, ntheta: int = 4, phase: Union[float, List[float], Tuple[float, ...]] = 0) -> np.ndarray:
+    """Builds Gabor channels.
+
+    Args:
+        ny: ROI height.
+        nx: ROI width.
+        nband: Number of frequency bands.
+        ntheta: Number of orientations.
+        phase: Phase value or list of phases.
+
+    Returns:
+        np.ndarray: Channel matrix of shape (ny * nx, nband * ntheta * len(phase)).
+    """
+    phases = [phase] if np.isscalar(phase) else list(phase)
+
+    xi = np.arange(nx) - (nx - 1) / 2
+    yi = np.arange(ny) - (ny - 1) / 2
+    xxi, yyi = np.meshgrid(xi, yi)
+    r2 = xxi**2 + yyi**2
+
+    theta_list = np.arange(0, np.pi, np.pi / ntheta)
+    f0 = 1/8.0
+
+    gb_channels = []
+
+    for i in range(nband):
+        f1 = f0 / 2
+        fc = (f0 + f1) / 2
+        wf = f0 - f1
+        ws = 4 * np.log(2) / (np.pi * wf)
+        amp = np.exp(-4 * np.log(2) * r2 / ws**2)
+
+        for theta_val in theta_list:
+            for ph in phases:
+                # cos(2*pi*fc*(x*cos + y*sin) + ph)
+                # MATLAB: xxi*cos + yyi*sin
+                fcos = np.cos(2 * np.pi * fc * (xxi * np.cos(theta_val) + yyi * np.sin(theta_val)) + ph)
+                gb_channels.append(amp * fcos)
+
+        f0 = f1
+
+    ch_stack = np.stack(gb_channels, axis=-1)
+    return ch_stack.reshape(nx * ny, ch_stack.shape[-1])
+
+
+def npwe_filter(ny: int, nx: int, eye: bool = False) -> np.ndarray:
+    """Builds the squared NPWE eye filter in unshifted FFT order.
+
+    Args:
+        ny: ROI height.
+        nx: ROI width.
+        eye: Whether to use the eye filter; otherwise a flat filter of 1/(nx*ny).
+
+    Returns:
+        np.ndarray: Frequency weighting ifftshift(eyeflt)**2 of shape (ny, nx).
+    """
+    disp_dx = 54.0 / 128.0 # mm
+    fi = (np.arange(nx) - (nx - 1) / 2) / (nx - 1) / disp_dx
+    fx, fy = np.meshgrid(fi, fi)
+    f_ratio = 1.0 / 0.1146
+    fxy = (fx**2 + fy**2) * f_ratio**2
+
+    beta = 1.3
+    c = 0.04
+
+    if eye:
+        eyeflt = (fxy**(beta / 2)) * np.exp(-c * fxy)
+    else:
+        # MATLAB: ones(nx,ny)/nx/ny, equivalent to no filtering
+        eyeflt = np.ones((ny, nx)) / (nx * ny)
+    return np.fft.ifftshift(eyeflt)**2
+
+
+CHANNEL_BUILDERS: Dict[str, Callable[..., np.ndarray]] = {
+    'LG': lg_channels,
+    'DOG': dog_channels,
+    'GABOR': gabor_channels,
+    'NPWE': npwe_filter,
+    'LG3D': lg_channels_3d,
+    'Z': z_channels,
+}
+
+
+def _freeze(value: Any) -> Hashable:
+    if isinstance(value, (list, tuple, np.ndarray)):
+        return tuple(_freeze(v) for v in value)
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def get_channel_bank(kind: str, shape: Tuple[int, ...], dtype: Union[str, np.dtype] = np.float64, **params: Any) -> np.ndarray:
+    """Returns the (cached) channel matrix of a channel family for an ROI shape.
+
+    Channels are always built in float64 and then cast, so a float32 bank holds the rounded
+    float64 values.
+
+    Args:
+        kind: Channel family, one of 'LG', 'DOG' or 'GABOR', or 'NPWE' for the NPWE eye filter;
+            'LG3D' for 3-D Laguerre-Gaussian channels or 'Z' for profiles along z.
+        shape: ROI shape (ny, nx), (nz, ny, nx) for 'LG3D' or (nz,) for 'Z'.
+        dtype: Floating point type of the returned matrix, e.g. np.float32.
+        **params: Parameters of the channel builder, e.g. `n_channels` and `channel_width` for 'LG'.
+
+    Returns:
+        np.ndarray: Read-only channel matrix of shape (prod(shape), nch), or (ny, nx) filter for 'NPWE'.
+
+    Raises:
+        ValueError: If the channel family is unknown.
+    """
+    kind = kind.upper()
+    if kind not in CHANNEL_BUILDERS:
+        raise ValueError(f"Unknown channel type: {kind}")
+    shape = tuple(int(n) for n in shape)
+    dtype = np.dtype(dtype)
+    key = (kind,) + shape + (dtype.str, tuple(sorted((k, _freeze(v)) for k, v in params.items())))
+    return channel_cache.get(key, lambda: CHANNEL_BUILDERS[kind](*shape, **params).astype(dtype, copy=False))
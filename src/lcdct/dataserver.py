@@ -0,0 +1,436 @@
+"""
+Shared-memory dataset server.
+
+Evaluations running concurrently on one node often load the same `dose_<N>` datasets, each into
+a private copy. A `DatasetRegistry` loads every (directory, offset) dataset once into
+`multiprocessing.shared_memory` blocks and hands out `DatasetHandle`s: small picklable
+references whose arrays are read-only, zero-copy views of the shared blocks. Handles are
+reference counted; datasets no handle refers to stay loaded for reuse until the registry exceeds
+its memory budget, and are then evicted least recently used first. A daemon also drops the
+references of client processes that died without releasing them.
+
+A registry serves the process that created it and its worker pools. `serve` runs one as a
+daemon that other processes of the node reach with `DatasetClient`:
+
+    $ lcdct-dataserver --max-gb 32
+
+    >>> datasets = DatasetClient()
+    >>> with datasets.acquire('data/fbp/dose_100', offset=1000) as handle:
+    ...     res = measure_LCD(handle.signal_present, handle.signal_absent, ground_truth)
+
+The daemon speaks the pickle-based `multiprocessing.managers` protocol, so anyone holding its
+authkey can run code as the daemon's user. It listens on localhost by default and generates a
+random authkey at startup, written to a file only its user can read (`DEFAULT_AUTHKEY_FILE`,
+or `--authkey-file`) that clients read it from.
+
+Shared memory blocks and the authkey file are private to the daemon's user. To serve analysts
+running as other users, start the daemon with `--group` and an `--authkey-file` the group can
+reach: its members can then read both (the datasets are mapped read-only).
+"""
+from collections import OrderedDict
+from multiprocessing.managers import BaseManager
+from pathlib import Path
+import argparse
+import os
+import secrets
+import signal
+import sys
+import threading
+import numpy as np
+from typing import Union, List, Optional, Any, Tuple, Dict
+
+from .parallel import SharedArray, group_id
+from .utils import load_dataset
+
+DEFAULT_ADDRESS = ('127.0.0.1', 50731)
+DEFAULT_AUTHKEY_FILE = Path('~/.lcdct/dataserver.key')
+
+
+def dataset_key(path: Union[str, Path], offset: float = 0) -> Tuple[str, float]:
+    """Registry key of a dataset: its resolved directory and offset."""
+    return str(Path(path).resolve()), float(offset)
+
+
+class DatasetHandle:
+    """Reference to a dataset held by a `DatasetRegistry`.
+
+    Attributes:
+        key: (directory, offset) of the dataset.
+        signal_present: Shared (N, Y, X) signal present stack, offset subtracted.
+        signal_absent: Shared (N, Y, X) signal absent stack, offset subtracted.
+    """
+
+    def __init__(self, key: Tuple[str, float], signal_present: SharedArray, signal_absent: SharedArray):
+        self.key = key
+        # handles map the registry's blocks independently of its own attachments
+        self.signal_present, self.signal_absent = (SharedArray(a.name, a.shape, a.dtype, a.tracker)
+                                                   for a in (signal_present, signal_absent))
+        self._owner = None
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({self.key[0]!r}, offset={self.key[1]}, shape={self.signal_present.shape})"
+
+    def __getstate__(self):
+        return {'key': self.key, 'signal_present': self.signal_present, 'signal_absent': self.signal_absent}
+
+    def __setstate__(self, state):
+        self.__init__(state['key'], state['signal_present'], state['signal_absent'])
+
+    def __enter__(self) -> 'DatasetHandle':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.release()
+
+    def arrays(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Maps the (signal_present, signal_absent) stacks as read-only arrays."""
+        return self.signal_present.array(), self.signal_absent.array()
+
+    def release(self) -> None:
+        """Drops this reference. The mapped arrays stay valid; later `arrays` calls should not be made."""
+        if self._owner is not None:
+            self._owner.release(self.key)
+            self._owner = None
+
+
+class _Entry:
+    """A loaded dataset and the number of handles referring to it."""
+
+    def __init__(self, signal_present: SharedArray, signal_absent: SharedArray):
+        self.signal_present = signal_present
+        self.signal_absent = signal_absent
+        self.refs = 0
+
+    @property
+    def nbytes(self) -> int:
+        return self.signal_present.nbytes + self.signal_absent.nbytes
+
+    def unlink(self) -> None:
+        self.signal_present.unlink()
+        self.signal_absent.unlink()
+
+
+class DatasetRegistry:
+    """Loads datasets once into shared memory and reference counts the handles to them.
+
+    Thread-safe; loads are serialized.
+    """
+
+    def __init__(self, max_bytes: Optional[int] = None, chunk_size: int = 16,
+                 group: Optional[Union[int, str]] = None):
+        """Creates an empty registry.
+
+        Args:
+            max_bytes: Memory budget of the loaded datasets. Unreferenced datasets are evicted,
+                least recently used first, to stay within it; datasets in use are never evicted,
+                so the budget is exceeded while they are held. Default: unlimited.
+            chunk_size: Number of images decoded at a time while loading.
+            group: Unix group whose members may map the datasets read-only, see `SharedArray.empty`.
+                Default: only the current user.
+        """
+        self.max_bytes = max_bytes
+        self.chunk_size = chunk_size
+        self.group = group
+        self._entries: 'OrderedDict[Tuple[str, float], _Entry]' = OrderedDict()
+        self._lock = threading.RLock()
+
+    def __enter__(self) -> 'DatasetRegistry':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by the loaded datasets."""
+        with self._lock:
+            return sum(e.nbytes for e in self._entries.values())
+
+    def _load(self, key: Tuple[str, float]) -> _Entry:
+        # lazily loaded MHD series are decoded chunk by chunk straight into shared memory
+        stacks = load_dataset(key[0], offset=key[1], lazy=True)
+        self._evict(sum(int(np.prod(stack.shape)) for stack in stacks) * np.dtype(np.float32).itemsize)
+        blocks = []
+        try:
+            for stack in stacks:
+                block = SharedArray.empty(stack.shape, np.float32, group=self.group)
+                blocks.append(block)
+                out = block.array(readonly=False)
+                for start in range(0, len(stack), self.chunk_size):
+                    out[start:start + self.chunk_size] = stack[start:start + self.chunk_size]
+                del out
+                block.close()
+        except BaseException:
+            for block in blocks:
+                block.unlink()
+            raise
+        return _Entry(*blocks)
+
+    def _evict(self, needed: int = 0) -> None:
+        if self.max_bytes is None:
+            return
+        total = self.nbytes
+        for key in [k for k, e in self._entries.items() if e.refs == 0]:
+            if total + needed <= self.max_bytes:
+                break
+            entry = self._entries.pop(key)
+            total -= entry.nbytes
+            entry.unlink()
+
+    def acquire(self, path: Union[str, Path], offset: float = 0) -> DatasetHandle:
+        """Returns a handle to a dataset, loading it on first use.
+
+        Args:
+            path: Dataset directory with `signal_present` and `signal_absent` subdirectories,
+                see `load_dataset`.
+            offset: Value subtracted from the images.
+
+        Returns:
+            DatasetHandle: Reference to release when done, e.g. by using it as a context manager.
+
+        Raises:
+            FileNotFoundError: If the dataset is missing.
+        """
+        key = dataset_key(path, offset)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = self._load(key)
+            self._entries.move_to_end(key)
+            entry.refs += 1
+            handle = DatasetHandle(key, entry.signal_present, entry.signal_absent)
+            handle._owner = self
+            return handle
+
+    def release(self, key: Tuple[str, float]) -> None:
+        """Drops one reference to a dataset, see `DatasetHandle.release`."""
+        with self._lock:
+            entry = self._entries.get(tuple(key))
+            if entry is not None and entry.refs > 0:
+                entry.refs -= 1
+            self._evict()
+
+    def evict(self) -> int:
+        """Frees every dataset no handle refers to and returns their number."""
+        with self._lock:
+            unused = [k for k, e in self._entries.items() if e.refs == 0]
+            for key in unused:
+                self._entries.pop(key).unlink()
+            return len(unused)
+
+    def info(self) -> List[Dict[str, Any]]:
+        """Lists the loaded datasets, least recently used first."""
+        with self._lock:
+            return [{'path': k[0], 'offset': k[1], 'refs': e.refs, 'nbytes': e.nbytes} for k, e in self._entries.items()]
+
+    def close(self) -> None:
+        """Frees every dataset. Arrays already mapped by clients stay valid until they are closed."""
+        with self._lock:
+            while self._entries:
+                self._entries.popitem()[1].unlink()
+
+
+def _process_exists(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass  # a process of another user
+    return True
+
+
+class _DaemonRegistry(DatasetRegistry):
+    """Registry of a daemon, whose references are leases held by client processes.
+
+    A client that exits without releasing its handles, e.g. killed for running out of memory,
+    would otherwise pin its datasets forever: the leases of processes that no longer exist are
+    dropped before every call. Clients attach to the datasets' shared memory, so they run on the
+    daemon's node and their pids can be checked.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._leases: Dict[int, List[Tuple[str, float]]] = {}
+
+    def _reap(self) -> None:
+        for pid in [p for p in self._leases if not _process_exists(p)]:
+            for key in self._leases.pop(pid):
+                super().release(key)
+
+    def acquire(self, path: Union[str, Path], offset: float = 0, pid: Optional[int] = None) -> DatasetHandle:
+        with self._lock:
+            self._reap()
+            handle = super().acquire(path, offset)
+            if pid is not None:
+                self._leases.setdefault(pid, []).append(handle.key)
+            return handle
+
+    def release(self, key: Tuple[str, float], pid: Optional[int] = None) -> None:
+        key = tuple(key)
+        with self._lock:
+            leases = self._leases.get(pid, [])
+            if key in leases:
+                leases.remove(key)
+                if not leases:
+                    del self._leases[pid]
+            elif pid is not None:
+                return  # not held by this client
+            super().release(key)
+            self._reap()
+
+    def evict(self) -> int:
+        with self._lock:
+            self._reap()
+            return super().evict()
+
+    def info(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            self._reap()
+            return super().info()
+
+
+class _ServerManager(BaseManager):
+    pass
+
+
+class _ClientManager(BaseManager):
+    pass
+
+
+_ClientManager.register('registry')
+
+
+class DatasetClient:
+    """Connection to a dataset daemon started with `serve`, with the interface of `DatasetRegistry`."""
+
+    def __init__(self, address: Tuple[str, int] = DEFAULT_ADDRESS, authkey: Optional[bytes] = None,
+                 authkey_file: Optional[Union[str, Path]] = None):
+        """Connects to a running daemon.
+
+        Args:
+            address: (host, port) of the daemon.
+            authkey: Shared secret of the daemon. Default: `LCDCT_DATASERVER_AUTHKEY`, or the
+                contents of `authkey_file`.
+            authkey_file: File the daemon wrote its authkey to. Default: `DEFAULT_AUTHKEY_FILE`.
+
+        Raises:
+            FileNotFoundError: If no authkey is given and the authkey file is missing.
+            ConnectionRefusedError: If no daemon listens at `address`.
+        """
+        manager = _ClientManager(address=tuple(address), authkey=read_authkey(authkey, authkey_file))
+        manager.connect()
+        self._manager = manager
+        self._registry = manager.registry()
+
+    def acquire(self, path: Union[str, Path], offset: float = 0) -> DatasetHandle:
+        """Returns a handle to a dataset loaded by the daemon, see `DatasetRegistry.acquire`."""
+        # resolve here: the daemon may run in another working directory
+        # the reference is leased to this process and dropped by the daemon if it dies
+        handle = self._registry.acquire(dataset_key(path, offset)[0], offset, os.getpid())
+        handle._owner = self
+        return handle
+
+    def release(self, key: Tuple[str, float]) -> None:
+        """Drops one reference to a dataset, see `DatasetHandle.release`."""
+        self._registry.release(key, os.getpid())
+
+    def evict(self) -> int:
+        """Frees every dataset no handle refers to and returns their number."""
+        return self._registry.evict()
+
+    def info(self) -> List[Dict[str, Any]]:
+        """Lists the datasets loaded by the daemon."""
+        return self._registry.info()
+
+
+def read_authkey(authkey: Optional[bytes] = None, authkey_file: Optional[Union[str, Path]] = None) -> bytes:
+    """Returns the authkey of a daemon: `authkey`, `LCDCT_DATASERVER_AUTHKEY` or the contents of `authkey_file`.
+
+    Raises:
+        FileNotFoundError: If neither is set and the authkey file is missing.
+    """
+    if authkey is not None:
+        return authkey
+    env = os.environ.get('LCDCT_DATASERVER_AUTHKEY')
+    if env:
+        return env.encode()
+    path = Path(authkey_file or DEFAULT_AUTHKEY_FILE).expanduser()
+    try:
+        return path.read_bytes().strip()
+    except FileNotFoundError:
+        raise FileNotFoundError(f"No dataserver authkey at {path}; is lcdct-dataserver running?") from None
+
+
+def write_authkey(authkey_file: Optional[Union[str, Path]] = None, group: Optional[Union[int, str]] = None) -> bytes:
+    """Generates a random authkey and writes it to a file only the current user can read.
+
+    Args:
+        authkey_file: Destination, replaced if it exists. Default: `DEFAULT_AUTHKEY_FILE`.
+        group: Unix group that may also read the file (mode 0640).
+
+    Returns:
+        bytes: The authkey.
+    """
+    path = Path(authkey_file or DEFAULT_AUTHKEY_FILE).expanduser()
+    path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+    authkey = secrets.token_hex(32).encode()
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    try:
+        # the mode of open() only applies to new files
+        os.fchmod(fd, 0o600)
+        if group is not None:
+            os.fchown(fd, -1, group_id(group))
+            os.fchmod(fd, 0o640)
+        os.write(fd, authkey + b'\n')
+    finally:
+        os.close(fd)
+    return authkey
+
+
+def serve(address: Tuple[str, int] = DEFAULT_ADDRESS, authkey: Optional[bytes] = None,
+          max_bytes: Optional[int] = None, authkey_file: Optional[Union[str, Path]] = None,
+          group: Optional[Union[int, str]] = None) -> None:
+    """Runs a `DatasetRegistry` daemon until interrupted or terminated, then frees its datasets.
+
+    Args:
+        address: (host, port) to listen on.
+        authkey: Shared secret of the clients. Default: `LCDCT_DATASERVER_AUTHKEY`, or a random
+            key written to `authkey_file`.
+        max_bytes: Memory budget, see `DatasetRegistry`.
+        authkey_file: File a generated authkey is written to, see `write_authkey`.
+        group: Unix group whose members may use the daemon: the datasets and a generated
+            authkey file are made accessible to it. Default: only the daemon's user.
+    """
+    if authkey is None:
+        authkey = os.environ.get('LCDCT_DATASERVER_AUTHKEY', '').encode() or write_authkey(authkey_file, group)
+    registry = _DaemonRegistry(max_bytes, group=group)
+    if threading.current_thread() is threading.main_thread():
+        # free the datasets on `kill` as well as on Ctrl-C
+        signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    _ServerManager.register('registry', callable=lambda: registry)
+    server = _ServerManager(address=tuple(address), authkey=authkey).get_server()
+    try:
+        server.serve_forever()
+    finally:
+        registry.close()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Command line entry point: `lcdct-dataserver [options]`."""
+    parser = argparse.ArgumentParser(description="Serve LCD datasets from shared memory to the evaluations of this node.")
+    parser.add_argument('--host', default=DEFAULT_ADDRESS[0], help="interface to listen on")
+    parser.add_argument('--port', type=int, default=DEFAULT_ADDRESS[1], help="port to listen on")
+    parser.add_argument('--max-gb', type=float, default=None, help="memory budget; unreferenced datasets are evicted to stay within it")
+    parser.add_argument('--authkey-file', default=None,
+                        help=f"file the random authkey of the clients is written to (default: {DEFAULT_AUTHKEY_FILE})")
+    parser.add_argument('--group', default=None,
+                        help="Unix group whose members may use the daemon (with an --authkey-file they can read)")
+    args = parser.parse_args(argv)
+    group = int(args.group) if args.group is not None and args.group.isdigit() else args.group
+    serve((args.host, args.port), max_bytes=None if args.max_gb is None else int(args.max_gb * 2**30),
+          authkey_file=args.authkey_file, group=group)
+
+
+if __name__ == '__main__':
+    main()
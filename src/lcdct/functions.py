@@ -1,67 +1,67 @@
 import numpy as np
-from scipy.special import factorial
-from typing import Union
+from typing import Union, Optional
 
-def laguerre(x: Union[np.ndarray, list], J: int) -> np.ndarray:
+def laguerre(x: Union[np.ndarray, list], J: int, out: Optional[np.ndarray] = None) -> np.ndarray:
     """Calculates the Laguerre polynomials.
 
+    Uses the three-term recurrence
+    (j + 1) L_{j+1}(x) = (2j + 1 - x) L_j(x) - j L_{j-1}(x),
+    which fills all J + 1 columns in J vectorized passes.
+
     Args:
         x: Input values, array-like.
         J: Order of the polynomial.
+        out: Optional float array of shape (len(x), J+1) to write the result into.
 
     Returns:
         np.ndarray: L matrix of shape (len(x), J+1).
     """
-    x = np.asarray(x)
-    L = np.zeros((x.size, J + 1))
-    
-    for j in range(J + 1):
-        combin = factorial(j) / (factorial(np.arange(j + 1)) * factorial(j - np.arange(j + 1)))
-        # Vectorized internal loop
-        # The equation in MATLAB:
-        # L(:,j+1) sum over k=0:j of combin(k+1) * ((-x).^k) / factorial(k)
-        
-        # We can implement this sum:
-        col_j = np.zeros_like(x, dtype=np.float64)
-        for k in range(j + 1):
-             col_j += combin[k] * ((-x)**k) / factorial(k)
-        L[:, j] = col_j # MATLAB is 1-based, we are 0-based index for columns
-        
+    x = np.asarray(x, dtype=np.float64).ravel()
+    if out is None:
+        L = np.empty((x.size, J + 1))
+    else:
+        if out.shape != (x.size, J + 1):
+            raise ValueError(f"out must have shape {(x.size, J + 1)}, got {out.shape}")
+        L = out
+
+    L[:, 0] = 1
+    if J >= 1:
+        np.subtract(1, x, out=L[:, 1])
+    for j in range(1, J):
+        # MATLAB is 1-based, we are 0-based index for columns
+        L[:, j + 1] = ((2 * j + 1 - x) * L[:, j] - j * L[:, j - 1]) / (j + 1)
+
     return L
 
-def laguerre_gaussian_2d(x: Union[np.ndarray, list], J: int, h: float) -> np.ndarray:
+def laguerre_gaussian_2d(x: Union[np.ndarray, list], J: int, h: float, out: Optional[np.ndarray] = None) -> np.ndarray:
     """Calculates the Laguerre-Gaussian function.
 
     Args:
         x: 1d vector of pixel locations (radial distance).
         J: Number of channels (order).
         h: Gaussian width.
+        out: Optional C-contiguous float array of shape x.shape + (J+1,) to write the result into.
 
     Returns:
         np.ndarray: Use Laguerre-Gaussian function values reshaped to input shape + (J+1,).
     """
     x = np.asarray(x)
-    x_flat = x.flatten()
-    
+    final_shape = x.shape + (J + 1,)
+    if out is not None:
+        if out.shape != final_shape or not out.flags.c_contiguous:
+            raise ValueError(f"out must be a C-contiguous array of shape {final_shape}")
+        u = out.reshape(x.size, J + 1)
+    else:
+        u = np.empty((x.size, J + 1))
+
     # MATLAB: L = laguerre(2*pi*x.^2/h^2, J);
     # x argument to laguerre is scaled r^2
-    lag_arg = 2 * np.pi * (x_flat**2) / (h**2)
-    L = laguerre(lag_arg, J)
-    
-    u = np.zeros_like(L)
-    # MATLAB: loop j=0:J ... u(:,j+1) = L(:,j+1) .* exp(-pi*x.^2/h^2)
-    exp_term = np.exp(-np.pi * (x_flat**2) / (h**2))
-    
-    for j in range(J + 1):
-        u[:, j] = L[:, j] * exp_term
-        
-    scale = np.sqrt(2) / h
-    u = u * scale
-    
+    r2 = np.pi * (x.ravel().astype(np.float64)**2) / (h**2)
+    laguerre(2 * r2, J, out=u)
+
+    # MATLAB: u(:,j+1) = L(:,j+1) .* exp(-pi*x.^2/h^2), scaled by sqrt(2)/h
+    u *= (np.sqrt(2) / h * np.exp(-r2))[:, None]
+
     # Reshape back to (shape of x, J+1)
-    # If x was 2D grid (which it usually is before flattening, e.g. meshgrid r),
     # MATLAB: u = reshape(u, [xsize J+1])
-    # xsize is original shape.
-    final_shape = x.shape + (J + 1,)
-    return u.reshape(final_shape)
-
+    return u.reshape(final_shape) if out is None else out
@@ -0,0 +1,168 @@
+"""
+Incremental LCD studies for realizations that arrive over time.
+
+Channelized Hotelling observers only need the channel outputs of every realization, a few
+numbers per image. `IncrementalStudy` keeps them per (recon, dose, insert, observer), takes new
+signal-present/absent slices as they are written, and recomputes AUC/SNR and their reader
+variability from the channel outputs alone. Its state is saved to a single NPZ file so a
+study can be continued by later invocations.
+"""
+from pathlib import Path
+import json
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+from typing import Union, List, Optional, Tuple, Dict
+
+from .Observers import CHO, hotelling_metrics, split_indices
+from .layout import PhantomLayout
+from .registry import get_observer_factory
+
+Key = Tuple[str, int, int, str]  # (recon, dose_level, insert index in layout, observer)
+
+
+class IncrementalStudy:
+    """Channel outputs of every realization seen so far, per (recon, dose, insert, observer)."""
+
+    def __init__(self, ground_truth: Union[np.ndarray, PhantomLayout], observers: Optional[List[str]] = None):
+        """Creates an empty study.
+
+        Args:
+            ground_truth: Ground truth image (Y, X) or its `PhantomLayout`.
+            observers: Registered names of channelized observers (e.g. 'LG_CHO_2D', 'DOG_CHO_2D',
+                'GABOR_CHO_2D'). Default: ['LG_CHO_2D'].
+
+        Raises:
+            ValueError: If an observer is unknown or is not a channelized observer.
+        """
+        observers = [o.upper() for o in (observers or ['LG_CHO_2D'])]
+        self._factories = {name: get_observer_factory(name) for name in observers}
+        for name, factory in self._factories.items():
+            # channel outputs do not determine e.g. the NPWE template, which is trained on the images
+            if not issubclass(factory.observer_cls, CHO):
+                raise ValueError(f"Observer {name} is not a channelized observer and cannot be updated incrementally")
+        self.layout = ground_truth if isinstance(ground_truth, PhantomLayout) else PhantomLayout.from_ground_truth(ground_truth)
+        self.observers = observers
+        self.channel_outputs: Dict[Key, Dict[str, np.ndarray]] = {}
+
+    def __repr__(self) -> str:
+        cells = sorted({k[:2] for k in self.channel_outputs})
+        return f"{self.__class__.__name__}(observers={self.observers}, (recon, dose)={cells})"
+
+    def add(self, signal_present: Optional[np.ndarray] = None, signal_absent: Optional[np.ndarray] = None,
+            recon: str = '', dose_level: int = 0) -> None:
+        """Adds newly available realizations of one (recon, dose) dataset.
+
+        Args:
+            signal_present: New signal-present images (n, Y, X), e.g. a slice of an `MHDStack`.
+            signal_absent: New signal-absent images (n, Y, X).
+            recon: Recon name.
+            dose_level: Dose level.
+        """
+        nx = 2 * self.layout.max_diameter
+        for label, images in (('sp', signal_present), ('sa', signal_absent)):
+            if images is None or len(images) == 0:
+                continue
+            rois = self.layout.extract_rois(images, nx=nx)
+            for i, info in enumerate(self.layout.inserts):
+                for name in self.observers:
+                    obs: CHO = self._factories[name](rois[i], rois[i], info.diameter)
+                    cell = self.channel_outputs.setdefault((recon, int(dose_level), i, name), {})
+                    v = obs.channelize(rois[i])
+                    cell[label] = np.concatenate([cell[label], v]) if label in cell else v
+
+    def counts(self) -> pd.DataFrame:
+        """Returns the number of signal-present/absent realizations per (recon, dose)."""
+        rows = {}
+        for (recon, dose, _, _), cell in self.channel_outputs.items():
+            rows[(recon, dose)] = {'recon': recon, 'dose_level': dose,
+                                   'n_signal_present': len(cell.get('sp', ())),
+                                   'n_signal_absent': len(cell.get('sa', ()))}
+        return pd.DataFrame(list(rows.values()), columns=['recon', 'dose_level', 'n_signal_present', 'n_signal_absent'])
+
+    def results(self, n_reader: int = 10, pct_split: float = 0.5, seed: Optional[int] = None) -> pd.DataFrame:
+        """Per-reader AUC and SNR of every (recon, dose, insert, observer) with enough realizations.
+
+        For a given seed the readers use the same splits as `measure_LCD`, so once all
+        realizations are in the results match a `measure_LCD` call on the complete stacks.
+
+        Args:
+            n_reader: Number of readers (random train/test splits).
+            pct_split: Train/test split ratio.
+            seed: Seed of the reader splits.
+
+        Returns:
+            pd.DataFrame: Columns of `measure_LCD` plus 'recon' and 'dose_level'.
+        """
+        seeds = np.random.default_rng(seed=seed).integers(0, 100000, size=n_reader)
+        results_list = []
+        for (recon, dose, i, name), cell in self.channel_outputs.items():
+            v_sp, v_sa = cell.get('sp'), cell.get('sa')
+            try:
+                tr_sa, te_sa = split_indices(0 if v_sa is None else len(v_sa), pct_split, seeds)
+                tr_sp, te_sp = split_indices(0 if v_sp is None else len(v_sp), pct_split, seeds)
+            except ValueError:
+                continue  # too few realizations so far
+            metrics = hotelling_metrics(v_sa[tr_sa], v_sp[tr_sp], v_sa[te_sa], v_sp[te_sp])
+            info = self.layout.inserts[i]
+            results_list.append(pd.DataFrame({'auc': metrics['auc'],
+                                              'snr': metrics['snr'],
+                                              'observer': self._factories[name].observer_cls.__name__,
+                                              'reader': np.arange(n_reader),
+                                              'insert_HU': info.hu,
+                                              'insert_diameter_pix': 2 * info.diameter,
+                                              'recon': recon,
+                                              'dose_level': dose}))
+        if not results_list:
+            return pd.DataFrame()
+        return pd.concat(results_list, ignore_index=True)
+
+    def summary(self, n_reader: int = 10, pct_split: float = 0.5, seed: Optional[int] = None) -> pd.DataFrame:
+        """Mean and reader standard deviation of AUC and SNR, with the realization counts.
+
+        Args:
+            n_reader: Number of readers (random train/test splits).
+            pct_split: Train/test split ratio.
+            seed: Seed of the reader splits.
+
+        Returns:
+            pd.DataFrame: One row per (recon, dose_level, insert_HU, observer).
+        """
+        res = self.results(n_reader=n_reader, pct_split=pct_split, seed=seed)
+        if res.empty:
+            return res
+        keys = ['recon', 'dose_level', 'insert_HU', 'observer']
+        summary = res.groupby(keys, sort=False).agg(auc_mean=('auc', 'mean'), auc_std=('auc', 'std'),
+                                                   snr_mean=('snr', 'mean'), snr_std=('snr', 'std')).reset_index()
+        return summary.merge(self.counts(), on=['recon', 'dose_level'], how='left')
+
+    def save(self, filename: Union[str, Path]) -> None:
+        """Writes the study state to an NPZ file (atomically replacing an existing one)."""
+        keys = list(self.channel_outputs)
+        meta = {'layout': self.layout.to_dict(), 'observers': self.observers, 'keys': [list(k) for k in keys]}
+        arrays = {'__meta__': np.array(json.dumps(meta))}
+        for j, key in enumerate(keys):
+            for label, v in self.channel_outputs[key].items():
+                arrays[f"{label}_{j}"] = v
+        filename = Path(filename)
+        fd, tmp = tempfile.mkstemp(dir=filename.parent, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.savez(f, **arrays)
+            os.replace(tmp, filename)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+
+    @classmethod
+    def load(cls, filename: Union[str, Path]) -> 'IncrementalStudy':
+        """Reads a study written by `save`."""
+        with np.load(filename, allow_pickle=False) as data:
+            meta = json.loads(str(data['__meta__']))
+            study = cls(PhantomLayout.from_dict(meta['layout']), meta['observers'])
+            for j, key in enumerate(meta['keys']):
+                cell = {label: data[f"{label}_{j}"] for label in ('sp', 'sa') if f"{label}_{j}" in data.files}
+                study.channel_outputs[(key[0], int(key[1]), int(key[2]), key[3])] = cell
+        return study
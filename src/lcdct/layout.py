@@ -0,0 +1,237 @@
+"""
+Phantom layout: the insert geometry derived once from a ground truth image.
+
+Labeling the truth masks is the same for every dose, recon and observer of a sweep, so the
+cleaned masks, centroids, bounding boxes, diameters and modal HU values are computed once and
+reused (and can be saved to JSON next to the dataset).
+"""
+from pathlib import Path
+import json
+import numpy as np
+from scipy.stats import mode
+from skimage.measure import label, regionprops
+from typing import Union, List, Optional, Tuple, Dict, Any, NamedTuple, Sequence
+
+from .utils import get_truth_labels
+
+
+def _pad_indices(idx: np.ndarray, n: int, mode: str) -> np.ndarray:
+    """Maps indices outside [0, n) back into the axis like the corresponding `np.pad` mode."""
+    if mode == 'edge':
+        return np.clip(idx, 0, n - 1)
+    if mode == 'symmetric':
+        m = np.mod(idx, 2 * n)
+        return np.where(m >= n, 2 * n - 1 - m, m)
+    if mode == 'reflect':
+        if n == 1:
+            return np.zeros_like(idx)
+        m = np.mod(idx, 2 * n - 2)
+        return np.where(m >= n, 2 * n - 2 - m, m)
+    raise ValueError(f"Unknown padding mode: {mode}")
+
+
+class InsertInfo(NamedTuple):
+    """Geometry of one insert of the phantom."""
+    index: int  # layer of the truth mask stack
+    hu: float  # modal ground truth value inside the mask
+    centroid: Tuple[float, float]  # (row, col) of the first labeled region
+    bbox: Tuple[int, int, int, int]  # (min_row, min_col, max_row, max_col), max exclusive
+    diameter: int  # max bounding box dimension, see utils.get_insert_radius
+
+
+class PhantomLayout:
+    """Insert masks and geometry of a ground truth image.
+
+    Attributes:
+        shape: (Y, X) shape of the ground truth.
+        truth_masks: Cleaned boolean masks (Y, X, N_inserts), as from `get_demo_truth_masks`.
+        inserts: Geometry of the inserts whose mask is not empty.
+    """
+
+    def __init__(self, truth_masks: np.ndarray, inserts: List[InsertInfo]):
+        """Creates a layout from precomputed masks and geometry; see `from_ground_truth`.
+
+        Args:
+            truth_masks: Boolean masks (Y, X, N_inserts).
+            inserts: Geometry of the non-empty inserts.
+        """
+        self.truth_masks = np.asarray(truth_masks, dtype=bool)
+        self.shape = self.truth_masks.shape[:2]
+        self.inserts = list(inserts)
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(shape={self.shape}, inserts={[i.hu for i in self.inserts]})"
+
+    def __len__(self) -> int:
+        return len(self.inserts)
+
+    @classmethod
+    def from_ground_truth(cls, ground_truth: np.ndarray, tol: int = 1,
+                          hus: Optional[Sequence[float]] = None) -> 'PhantomLayout':
+        """Labels the inserts of a ground truth image.
+
+        Args:
+            ground_truth: Ground truth image (Y, X).
+            tol: Tolerance for HU value matching.
+            hus: Insert HU values. Default: the CCT189 inserts [14, 7, 5, 3], see `get_truth_labels`.
+
+        Returns:
+            PhantomLayout: Layout of the non-empty inserts.
+        """
+        ground_truth = np.asarray(ground_truth)
+        labels, boxes = get_truth_labels(ground_truth, hus=hus, tol=tol)
+
+        inserts = []
+        for i, box in enumerate(boxes):
+            if box is None:
+                continue
+            # the insert's pixels all lie in its bounding box: label its first region there
+            mask = labels[box] == i + 1
+            region = regionprops(label(mask))[0]
+            offset = np.array([sl.start for sl in box])
+
+            # mode of ground_truth(mask)
+            insert_hu_val = mode(ground_truth[box][mask], axis=None).mode
+            if isinstance(insert_hu_val, np.ndarray): # Scipy mode returns array sometimes
+                insert_hu_val = insert_hu_val[0]
+
+            bbox = tuple(int(b) for b in np.array(region.bbox) + np.tile(offset, 2))
+            diameter = max(bbox[2] - bbox[0], bbox[3] - bbox[1])
+            centroid = tuple(float(c) for c in np.array(region.centroid) + offset)
+            inserts.append(InsertInfo(i, float(insert_hu_val), centroid, bbox, diameter))
+        truth_masks = labels[..., None] == np.arange(1, len(boxes) + 1, dtype=labels.dtype)
+        return cls(truth_masks, inserts)
+
+    @property
+    def max_diameter(self) -> int:
+        """Largest insert diameter, used as the common ROI half width in `measure_LCD`."""
+        return max((i.diameter for i in self.inserts), default=0)
+
+    def crop_window(self, insert: Union[int, InsertInfo], nx: Optional[int] = None) -> Tuple[slice, slice]:
+        """Returns the (row, col) slices of the ROI around an insert.
+
+        Matches `get_roi_from_truth_mask`: the ROI is centered on the rounded centroid and is
+        approximately 2 * round(nx / 2) + 1 pixels wide, clipped at the image border.
+
+        Args:
+            insert: Position in `inserts` or an InsertInfo.
+            nx: Full crop width. If None, the insert's bounding box is used.
+
+        Returns:
+            Tuple[slice, slice]: Row and column slices.
+        """
+        info = self.inserts[insert] if isinstance(insert, (int, np.integer)) else insert
+        cy, cx = int(round(info.centroid[0])), int(round(info.centroid[1]))
+        if nx is None:
+            ny = int(round((info.bbox[2] - info.bbox[0]) / 2))
+            nx = int(round((info.bbox[3] - info.bbox[1]) / 2))
+        else:
+            nx = int(round(nx / 2))
+            ny = nx
+        return slice(max(0, cy - ny), cy + ny + 1), slice(max(0, cx - nx), cx + nx + 1)
+
+    def roi(self, img: np.ndarray, insert: Union[int, InsertInfo], nx: Optional[int] = None) -> np.ndarray:
+        """Crops an image or stack (N, Y, X) around an insert, see `crop_window`."""
+        y_slice, x_slice = self.crop_window(insert, nx)
+        if img.ndim == 3:
+            return img[:, y_slice, x_slice]
+        return img[y_slice, x_slice]
+
+    def window_indices(self, insert: Union[int, InsertInfo], nx: int, pad_mode: str = 'edge') -> Tuple[np.ndarray, np.ndarray]:
+        """Returns the row and column indices of a centered (2 * round(nx / 2) + 1)² ROI.
+
+        Unlike `crop_window`, windows reaching past the image border keep their full size:
+        out-of-bounds indices are mapped back into the image according to `pad_mode`.
+
+        Args:
+            insert: Position in `inserts` or an InsertInfo.
+            nx: Full crop width.
+            pad_mode: 'edge' (repeat the border pixel), 'symmetric' or 'reflect', as in `np.pad`.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Row and column indices.
+
+        Raises:
+            ValueError: If the padding mode is unknown.
+        """
+        info = self.inserts[insert] if isinstance(insert, (int, np.integer)) else insert
+        half = int(round(nx / 2))
+        offsets = np.arange(-half, half + 1)
+        return tuple(_pad_indices(int(round(c)) + offsets, n, pad_mode) for c, n in zip(info.centroid, self.shape))
+
+    def extract_rois(self, images: np.ndarray, nx: Optional[int] = None, pad_mode: str = 'edge',
+                     remove_dc: bool = True, dtype: Optional[Union[str, np.dtype]] = None) -> np.ndarray:
+        """Extracts the ROI of every insert from an image stack in one pass.
+
+        Args:
+            images: Image stack (N, Y, X), e.g. an array or a lazily loaded `MHDStack`, or a
+                stack of slabs (N, Z, Y, X) cropped in every slice.
+            nx: Full crop width shared by all inserts. Default: 2 * `max_diameter`, as in `measure_LCD`.
+            pad_mode: Padding of windows reaching past the image border, see `window_indices`.
+            remove_dc: Subtract the mean of every ROI (in place).
+            dtype: Floating point type of the ROIs. Default: the type of `images`, or float64
+                for integer images.
+
+        Returns:
+            np.ndarray: Contiguous ROIs (n_inserts, N, h, w), or (n_inserts, N, Z, h, w) for slabs;
+                `out[i]` can be handed to an observer with `remove_dc=False` without further copies.
+                The DC of a slab ROI is the mean over all its slices.
+        """
+        if nx is None:
+            nx = 2 * self.max_diameter
+        rows, cols = zip(*(self.window_indices(info, nx, pad_mode) for info in self.inserts))
+        rows, cols = np.stack(rows), np.stack(cols)  # (n_inserts, h), (n_inserts, w)
+
+        if dtype is None:
+            dtype = images.dtype if np.issubdtype(images.dtype, np.floating) else np.float64
+        # each insert is gathered straight into its block of the output, casting on the way:
+        # no full-size intermediate in the image layout or type
+        out = np.empty((len(self.inserts),) + tuple(images.shape[:-2]) + (rows.shape[1], cols.shape[1]), dtype=dtype)
+        for i in range(len(self.inserts)):
+            index = (rows[i][:, None], cols[i][None, :])
+            out[i] = images[(slice(None),) * (images.ndim - 2) + index]
+        if remove_dc:
+            out -= out.mean(axis=tuple(range(2, out.ndim)), keepdims=True)
+        return out
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Returns a JSON-serializable representation (masks are stored bit-packed per bounding box)."""
+        masks = []
+        for i in range(self.truth_masks.shape[2]):
+            mask = self.truth_masks[:, :, i]
+            rows, cols = np.nonzero(mask)
+            if rows.size == 0:
+                masks.append(None)
+                continue
+            r0, r1, c0, c1 = int(rows.min()), int(rows.max()) + 1, int(cols.min()), int(cols.max()) + 1
+            masks.append({'bbox': [r0, c0, r1, c1], 'bits': np.packbits(mask[r0:r1, c0:c1]).tobytes().hex()})
+        return {'shape': list(self.shape),
+                'masks': masks,
+                'inserts': [{'index': i.index, 'hu': i.hu, 'centroid': list(i.centroid), 'bbox': list(i.bbox),
+                             'diameter': i.diameter} for i in self.inserts]}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'PhantomLayout':
+        """Rebuilds a layout from `to_dict` output."""
+        ny, nx = data['shape']
+        truth_masks = np.zeros((ny, nx, len(data['masks'])), dtype=bool)
+        for i, m in enumerate(data['masks']):
+            if m is None:
+                continue
+            r0, c0, r1, c1 = m['bbox']
+            bits = np.unpackbits(np.frombuffer(bytes.fromhex(m['bits']), dtype=np.uint8))
+            truth_masks[r0:r1, c0:c1, i] = bits[:(r1 - r0) * (c1 - c0)].reshape(r1 - r0, c1 - c0).astype(bool)
+        inserts = [InsertInfo(d['index'], d['hu'], tuple(d['centroid']), tuple(d['bbox']), d['diameter'])
+                   for d in data['inserts']]
+        return cls(truth_masks, inserts)
+
+    def save(self, filename: Union[str, Path]) -> None:
+        """Writes the layout to a JSON file."""
+        with open(filename, 'w') as f:
+            json.dump(self.to_dict(), f)
+
+    @classmethod
+    def load(cls, filename: Union[str, Path]) -> 'PhantomLayout':
+        """Reads a layout written by `save`."""
+        with open(filename) as f:
+            return cls.from_dict(json.load(f))
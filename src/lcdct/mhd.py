@@ -0,0 +1,219 @@
+"""
+Lazy MetaImage (MHD/RAW) reader.
+
+Parses the MetaImage header directly and maps the raw slice files with `np.memmap`, so a
+stack of realizations is only decoded where it is indexed (e.g. the ROI crops of an LCD study).
+"""
+from pathlib import Path
+import numpy as np
+from typing import Union, List, Tuple, Dict, Any, Optional
+
+MET_TYPES: Dict[str, np.dtype] = {
+    'MET_CHAR': np.dtype(np.int8),
+    'MET_UCHAR': np.dtype(np.uint8),
+    'MET_SHORT': np.dtype(np.int16),
+    'MET_USHORT': np.dtype(np.uint16),
+    'MET_INT': np.dtype(np.int32),
+    'MET_UINT': np.dtype(np.uint32),
+    'MET_LONG': np.dtype(np.int32),
+    'MET_ULONG': np.dtype(np.uint32),
+    'MET_LONG_LONG': np.dtype(np.int64),
+    'MET_ULONG_LONG': np.dtype(np.uint64),
+    'MET_FLOAT': np.dtype(np.float32),
+    'MET_DOUBLE': np.dtype(np.float64),
+}
+
+
+def read_mhd_header(filename: Union[str, Path]) -> Dict[str, Any]:
+    """Parses a MetaImage header.
+
+    Args:
+        filename: Path to the .mhd (or .mha) file.
+
+    Returns:
+        Dict[str, Any]: Header fields as strings, plus 'DataFileList' (list of raw file paths,
+            or ['LOCAL']) and 'HeaderBytes' (byte length of the text header, used for LOCAL data).
+    """
+    filename = Path(filename)
+    header: Dict[str, Any] = {}
+    n_bytes = 0
+    with open(filename, 'rb') as f:
+        for raw_line in f:
+            n_bytes += len(raw_line)
+            line = raw_line.decode('latin-1').strip()
+            if not line or '=' not in line:
+                continue
+            key, value = (s.strip() for s in line.split('=', 1))
+            header[key] = value
+            if key == 'ElementDataFile':
+                if value.upper().startswith('LIST'):
+                    header['DataFileList'] = [filename.parent / l.decode('latin-1').strip()
+                                              for l in f if l.strip()]
+                break
+    header['HeaderBytes'] = n_bytes
+
+    if 'ElementDataFile' not in header:
+        raise ValueError(f"{filename} has no ElementDataFile entry")
+    if 'DataFileList' not in header:
+        header['DataFileList'] = _data_files(filename, header['ElementDataFile'])
+    return header
+
+
+def _data_files(filename: Path, entry: str) -> List[Union[Path, str]]:
+    if entry.upper() == 'LOCAL':
+        return ['LOCAL']
+    parts = entry.split()
+    if '%' in parts[0] and len(parts) >= 4:
+        # pattern min max step [subdimension]
+        pattern, start, stop, step = parts[0], int(parts[1]), int(parts[2]), int(parts[3])
+        return [filename.parent / (pattern % i) for i in range(start, stop + 1, step)]
+    return [filename.parent / entry]
+
+
+class MHDStack:
+    """Lazy, memory-mapped (N, Y, X) view of a MetaImage image series.
+
+    Indexing decodes only the selected pixels, casting them to `dtype` and subtracting `offset`;
+    the raw files are never loaded as a whole. 2-D images are exposed as a single-slice stack.
+    """
+
+    def __init__(self, filename: Union[str, Path], offset: float = 0, dtype: Union[str, np.dtype] = np.float32):
+        """Opens the series described by an MHD header.
+
+        Args:
+            filename: Path to the .mhd/.mha header.
+            offset: Value subtracted from the raw data (e.g. 1000).
+            dtype: Floating point type of the decoded data.
+
+        Raises:
+            ValueError: If the header describes compressed, multi-channel or unsupported data.
+        """
+        self.filename = Path(filename)
+        self.offset = offset
+        self.dtype = np.dtype(dtype)
+        header = read_mhd_header(self.filename)
+        self.header = header
+
+        if header.get('CompressedData', 'False').lower() == 'true':
+            raise ValueError(f"{self.filename}: compressed MetaImage data cannot be memory-mapped")
+        if int(header.get('ElementNumberOfChannels', 1)) != 1:
+            raise ValueError(f"{self.filename}: multi-channel MetaImage data is not supported")
+        element_type = header.get('ElementType', '')
+        if element_type not in MET_TYPES:
+            raise ValueError(f"{self.filename}: unsupported ElementType {element_type}")
+
+        msb = header.get('ElementByteOrderMSB', header.get('BinaryDataByteOrderMSB', 'False')).lower() == 'true'
+        self.raw_dtype = MET_TYPES[element_type].newbyteorder('>' if msb else '<')
+
+        dims = [int(d) for d in header['DimSize'].split()]
+        if len(dims) == 2:
+            dims.append(1)
+        if len(dims) != 3:
+            raise ValueError(f"{self.filename}: only 2-D and 3-D images are supported, got DimSize {dims}")
+        nx, ny, nz = dims
+        self.shape = (nz, ny, nx)
+
+        files = header['DataFileList']
+        if nz % len(files):
+            raise ValueError(f"{self.filename}: {nz} slices cannot be split over {len(files)} data files")
+        per_file = nz // len(files)
+        n_values = per_file * ny * nx
+        header_size = int(header.get('HeaderSize', 0))
+
+        self._maps = []
+        for f in files:
+            if f == 'LOCAL':
+                f, start = self.filename, header['HeaderBytes']
+            elif header_size == -1:
+                # data is at the end of the file
+                start = Path(f).stat().st_size - n_values * self.raw_dtype.itemsize
+            else:
+                start = header_size
+            self._maps.append(np.memmap(f, dtype=self.raw_dtype, mode='r', offset=start, shape=(per_file, ny, nx)))
+        self._per_file = per_file
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}('{self.filename}', shape={self.shape}, offset={self.offset})"
+
+    def __reduce__(self):
+        # reopen the memory maps instead of pickling their contents
+        return (self.__class__, (self.filename, self.offset, self.dtype))
+
+    @property
+    def ndim(self) -> int:
+        return 3
+
+    def __len__(self) -> int:
+        return self.shape[0]
+
+    def raw_slice(self, index: int) -> np.memmap:
+        """Returns the undecoded memory map of slice `index` (Y, X)."""
+        index = range(self.shape[0])[index]
+        return self._maps[index // self._per_file][index % self._per_file]
+
+    def __getitem__(self, key: Any) -> np.ndarray:
+        key, newaxes = self._normalize_key(key)
+        slice_key, window = key[0], key[1:]
+
+        indices = np.arange(self.shape[0])[slice_key]
+        if np.ndim(indices) == 0:
+            out = self._decode(self.raw_slice(int(indices))[window])
+        elif len(indices) == 0:
+            # shape of the window from a zero-stride view: no allocation, no file access
+            shape = np.broadcast_to(np.zeros((), self.dtype), self.shape[1:])[window].shape
+            out = np.empty((0,) + shape, dtype=self.dtype)
+        else:
+            out = self._decode(np.stack([self.raw_slice(int(i))[window] for i in indices]))
+        return out[newaxes] if newaxes is not None else out
+
+    def _normalize_key(self, key: Any) -> Tuple[Tuple[Any, ...], Optional[Tuple[Any, ...]]]:
+        """Expands an Ellipsis to full slices and takes out new axes.
+
+        Returns:
+            Tuple: (key with one entry per axis, index re-inserting the new axes into the result
+                or None).
+        """
+        if not isinstance(key, tuple):
+            key = (key,)
+        n_used = sum(np.ndim(k) if isinstance(k, np.ndarray) and k.dtype == bool else 1
+                     for k in key if k is not Ellipsis and k is not None)
+        if sum(k is Ellipsis for k in key) > 1:
+            raise IndexError("an index can only have a single ellipsis ('...')")
+        if n_used > len(self.shape):
+            raise IndexError(f"too many indices for a {len(self.shape)}-D stack")
+        if not any(k is Ellipsis for k in key):
+            key = key + (Ellipsis,)
+        expanded = []
+        for k in key:
+            expanded.extend([slice(None)] * (len(self.shape) - n_used) if k is Ellipsis else [k])
+        if not any(k is None for k in expanded):
+            return tuple(expanded), None
+        if any(not isinstance(k, (slice, int, np.integer)) for k in expanded if k is not None):
+            raise IndexError("new axes cannot be combined with array indices on an MHDStack")
+        # every slice keeps its axis, integers drop theirs
+        newaxes = tuple(None if k is None else slice(None) for k in expanded if not isinstance(k, (int, np.integer)))
+        return tuple(k for k in expanded if k is not None), newaxes
+
+    def _decode(self, raw: np.ndarray) -> np.ndarray:
+        out = raw.astype(self.dtype)
+        if self.offset:
+            out -= self.offset
+        return out
+
+    def __array__(self, dtype: Optional[np.dtype] = None, copy: Optional[bool] = None) -> np.ndarray:
+        out = self[:]
+        return out if dtype is None else out.astype(dtype, copy=False)
+
+
+def open_mhd(filename: Union[str, Path], offset: float = 0, dtype: Union[str, np.dtype] = np.float32) -> MHDStack:
+    """Opens an MHD/RAW series as a lazy, memory-mapped (N, Y, X) stack.
+
+    Args:
+        filename: Path to the .mhd/.mha header.
+        offset: Value subtracted from the raw data on access.
+        dtype: Floating point type of the decoded data.
+
+    Returns:
+        MHDStack: Lazy view of the series.
+    """
+    return MHDStack(filename, offset=offset, dtype=dtype)
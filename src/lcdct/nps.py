@@ -0,0 +1,94 @@
+"""
+Noise power spectra and the noise statistics of linear observers.
+
+For wide-sense stationary noise n with noise power spectrum NPS(f) = E|DFT(n)(f)|^2 / P over a
+grid of P pixels, the covariance of the projections of the noise onto two templates u_i and u_j
+is (1 / P) sum_f conj(U_i(f)) NPS(f) U_j(f), with U = DFT(u). Channel covariances and template
+variances, and hence observer SNRs, therefore follow from an NPS without image realizations.
+The NPS can be estimated from a handful of noise images (`estimate_nps`) or modelled as a
+function of radial frequency (`radial_nps`).
+"""
+import numpy as np
+from typing import Callable, Optional, Sequence, Union
+
+
+def frequency_grid(shape: Sequence[int]) -> np.ndarray:
+    """Radial spatial frequency (cycles/pixel) of every DFT sample of a grid, in FFT layout."""
+    freqs = np.meshgrid(*(np.fft.fftfreq(n) for n in shape), indexing='ij')
+    return np.sqrt(sum(f ** 2 for f in freqs))
+
+
+def radial_nps(shape: Sequence[int], model: Callable[[np.ndarray], np.ndarray]) -> np.ndarray:
+    """Samples an isotropic NPS model on a grid.
+
+    Args:
+        shape: Grid shape, e.g. the (Y, X) ROI shape.
+        model: NPS as a function of radial frequency in cycles/pixel, e.g. a measured 1-D NPS
+            wrapped in `np.interp`.
+
+    Returns:
+        np.ndarray: NPS of `shape` in FFT layout (zero frequency first).
+    """
+    return np.asarray(model(frequency_grid(shape)), dtype=np.float64)
+
+
+def estimate_nps(images: np.ndarray, mean: Optional[np.ndarray] = None) -> np.ndarray:
+    """Estimates the NPS of an image stack by averaging periodograms.
+
+    Args:
+        images: Images (N, ...) of the same object, e.g. signal-absent ROIs around an insert.
+        mean: Noise-free image, if known. Default: the ensemble mean of the images (scaled by
+            N / (N - 1) to keep the estimate unbiased), or the mean value of a single image.
+
+    Returns:
+        np.ndarray: NPS with the shape of one image, in FFT layout (zero frequency first).
+    """
+    images = np.asarray(images, dtype=np.float64)
+    n = len(images)
+    if mean is not None:
+        noise = images - mean
+    elif n > 1:
+        noise = (images - images.mean(axis=0)) * np.sqrt(n / (n - 1))
+    else:
+        noise = images - images.mean()
+    axes = tuple(range(1, images.ndim))
+    return (np.abs(np.fft.fftn(noise, axes=axes)) ** 2).mean(axis=0) / np.prod(images.shape[1:])
+
+
+def projection_covariance(templates: np.ndarray, nps: np.ndarray) -> np.ndarray:
+    """Covariance of the projections of stationary noise onto a set of templates.
+
+    Args:
+        templates: Templates (k, ...), e.g. the channels of a CHO reshaped to the ROI.
+        nps: NPS in FFT layout on a grid at least as large as one template in every dimension.
+            Templates smaller than the grid are zero-padded, which suppresses the wrap-around of
+            the periodic (circulant) noise model.
+
+    Returns:
+        np.ndarray: Covariance (k, k) of sum(u_i * n) and sum(u_j * n).
+
+    Raises:
+        ValueError: If the NPS grid is smaller than the templates.
+    """
+    templates = np.asarray(templates, dtype=np.float64)
+    nps = np.asarray(nps, dtype=np.float64)
+    if nps.ndim != templates.ndim - 1 or any(g < t for g, t in zip(nps.shape, templates.shape[1:])):
+        raise ValueError(f"NPS of shape {nps.shape} does not cover templates of shape {templates.shape[1:]}")
+    spectra = np.fft.fftn(templates, s=nps.shape, axes=tuple(range(1, templates.ndim))).reshape(len(templates), -1)
+    return ((spectra.conj() * nps.ravel()) @ spectra.T).real / nps.size
+
+
+def blur(signal: np.ndarray, mtf: Union[Callable[[np.ndarray], np.ndarray], np.ndarray]) -> np.ndarray:
+    """Applies a modulation transfer function to a signal.
+
+    Args:
+        signal: Signal image (Y, X) or volume.
+        mtf: MTF as a function of radial frequency in cycles/pixel, or sampled on the signal
+            grid in FFT layout.
+
+    Returns:
+        np.ndarray: Blurred signal.
+    """
+    signal = np.asarray(signal, dtype=np.float64)
+    transfer = mtf(frequency_grid(signal.shape)) if callable(mtf) else np.asarray(mtf)
+    return np.fft.ifftn(np.fft.fftn(signal) * transfer).real
@@ -0,0 +1,208 @@
+"""
+Helpers for running LCD studies on process or thread pools.
+"""
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager
+from multiprocessing import shared_memory
+import mmap
+import os
+import numpy as np
+from typing import Union, Optional, Tuple, Iterator, Any
+
+
+class SharedArray:
+    """Picklable handle to a NumPy array stored in a `multiprocessing.shared_memory` block.
+
+    Only the block name, shape and dtype travel to worker processes; workers map the same
+    memory instead of receiving a pickled copy of the data.
+
+    Attachments are registered with the resource tracker (which unlinks leaked blocks when its
+    processes exit) only in processes sharing the creator's tracker, i.e. the creator and its
+    worker pools. Unrelated processes, e.g. clients of a `dataserver.serve` daemon, attach
+    untracked so their exit does not unlink a block they do not own.
+    """
+
+    def __init__(self, name: str, shape: Tuple[int, ...], dtype: Union[str, np.dtype], tracker: Optional[int] = None):
+        self.name = name
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self.tracker = tracker  # pid of the creator's resource tracker
+        self._shm = None
+
+    def __getstate__(self):
+        return {'name': self.name, 'shape': self.shape, 'dtype': self.dtype.str, 'tracker': self.tracker}
+
+    def __setstate__(self, state):
+        self.__init__(state['name'], state['shape'], state['dtype'], state.get('tracker'))
+
+    @property
+    def nbytes(self) -> int:
+        return int(np.prod(self.shape)) * self.dtype.itemsize
+
+    @classmethod
+    def empty(cls, shape: Tuple[int, ...], dtype: Union[str, np.dtype],
+              group: Optional[Union[int, str]] = None) -> 'SharedArray':
+        """Allocates a new, uninitialized shared memory block owned by the caller.
+
+        Args:
+            shape: Array shape.
+            dtype: Array dtype.
+            group: Unix group (name or id) whose members may map the block read-only (mode 0640,
+                POSIX only). Default: only the caller's user (mode 0600).
+        """
+        dtype = np.dtype(dtype)
+        shm = shared_memory.SharedMemory(create=True, size=max(int(np.prod(shape)) * dtype.itemsize, 1))
+        if group is not None:
+            try:
+                fd = _shm_open(shm.name, os.O_RDONLY)
+                try:
+                    os.fchown(fd, -1, group_id(group))
+                    os.fchmod(fd, 0o640)
+                finally:
+                    os.close(fd)
+            except BaseException:
+                shm.close()
+                shm.unlink()
+                raise
+        handle = cls(shm.name, shape, dtype, _tracker_pid())
+        handle._shm = shm
+        return handle
+
+    @classmethod
+    def create(cls, array: np.ndarray) -> 'SharedArray':
+        """Copies `array` into a new shared memory block owned by the caller."""
+        array = np.asarray(array)
+        handle = cls.empty(array.shape, array.dtype)
+        handle.array(readonly=False)[...] = array
+        return handle
+
+    def array(self, readonly: bool = True) -> np.ndarray:
+        """Maps the shared block as an array (attaching to it if needed).
+
+        Users that may only read the block (see `empty`) map it read-only: its arrays cannot be
+        made writeable.
+        """
+        if self._shm is None:
+            try:
+                self._shm = _attach(self.name, track=self.tracker is None or self.tracker == _tracker_pid())
+            except PermissionError:
+                if not readonly:
+                    raise
+                self._shm = _ReadOnlyBlock(self.name)
+        arr = np.ndarray(self.shape, dtype=self.dtype, buffer=self._shm.buf)
+        arr.flags.writeable = not readonly
+        return arr
+
+    def close(self) -> None:
+        """Detaches this process from the block."""
+        if self._shm is not None:
+            self._shm.close()
+            self._shm = None
+
+    def unlink(self) -> None:
+        """Frees the block; call once from the creating process when all workers are done."""
+        shm = self._shm if self._shm is not None else shared_memory.SharedMemory(name=self.name)
+        shm.close()
+        shm.unlink()
+        self._shm = None
+
+
+def group_id(group: Union[int, str]) -> int:
+    """Id of a Unix group given by name or id.
+
+    Raises:
+        KeyError: If no group has that name.
+    """
+    if isinstance(group, int):
+        return group
+    import grp
+    return grp.getgrnam(group).gr_gid
+
+
+def _tracker_pid() -> Optional[int]:
+    """Pid of this process's resource tracker, shared with its worker pools (None if not started)."""
+    from multiprocessing import resource_tracker
+    return getattr(resource_tracker._resource_tracker, '_pid', None)
+
+
+def _attach(name: str, track: bool = True) -> shared_memory.SharedMemory:
+    """Attaches to an existing block, optionally without registering it with the resource tracker."""
+    if track:
+        return shared_memory.SharedMemory(name=name)
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)  # Python >= 3.13
+    except TypeError:
+        shm = shared_memory.SharedMemory(name=name)
+        if os.name == 'posix':
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(shm._name, 'shared_memory')
+        return shm
+
+
+def _shm_open(name: str, flags: int) -> int:
+    """Opens a new descriptor of a POSIX shared memory block."""
+    import _posixshmem
+    return _posixshmem.shm_open('/' + name, flags, mode=0)
+
+
+class _ReadOnlyBlock:
+    """Read-only mapping of a shared memory block, with the `buf` and `close` of `SharedMemory`."""
+
+    def __init__(self, name: str):
+        fd = _shm_open(name, os.O_RDONLY)
+        try:
+            self._mmap = mmap.mmap(fd, os.fstat(fd).st_size, prot=mmap.PROT_READ)
+        finally:
+            os.close(fd)
+        self.buf = memoryview(self._mmap)
+
+    def close(self) -> None:
+        self.buf.release()
+        self._mmap.close()
+
+
+def as_array(data: Union[np.ndarray, SharedArray, Any]) -> Union[np.ndarray, Any]:
+    """Maps a `SharedArray` as a read-only array; other inputs are returned as is."""
+    return data.array() if isinstance(data, SharedArray) else data
+
+
+def resolve_n_jobs(n_jobs: Optional[int]) -> int:
+    """Converts an `n_jobs` setting (None, positive, or negative joblib-style) to a worker count."""
+    if n_jobs is None:
+        return 1
+    if n_jobs < 0:
+        return max(1, (os.cpu_count() or 1) + 1 + n_jobs)
+    return max(1, n_jobs)
+
+
+EXECUTORS = ('process', 'thread')
+
+
+def check_executor(executor: Union[str, Executor]) -> None:
+    """Raises ValueError unless `executor` is 'process', 'thread' or an `Executor` instance."""
+    if not isinstance(executor, Executor) and executor not in EXECUTORS:
+        raise ValueError(f"Unknown executor: {executor}")
+
+
+@contextmanager
+def get_executor(n_jobs: int, executor: Union[str, Executor] = 'process') -> Iterator[Executor]:
+    """Yields a pool for `n_jobs` workers.
+
+    Args:
+        n_jobs: Number of workers; -1 uses all cores.
+        executor: 'process', 'thread', or an existing `concurrent.futures.Executor`, which is
+            used as is and left running.
+
+    Raises:
+        ValueError: If the executor type is unknown.
+    """
+    check_executor(executor)
+    if isinstance(executor, Executor):
+        yield executor
+        return
+    if executor == 'process':
+        pool = ProcessPoolExecutor(max_workers=resolve_n_jobs(n_jobs))
+    else:
+        pool = ThreadPoolExecutor(max_workers=resolve_n_jobs(n_jobs))
+    with pool:
+        yield pool
@@ -0,0 +1,236 @@
+"""
+Opt-in stage timing and memory instrumentation.
+
+`measure_LCD` and `Observer.run_study` mark their stages (ROI extraction, channel construction,
+channelization, Hotelling template, decision variables, AUC/SNR, ...) with `stage`. Unless a
+`Profiler` is active the marker is a shared no-op context, so the cost of the instrumentation is
+a context variable lookup per stage::
+
+    profiler = Profiler(memory=True)
+    res = measure_LCD(sp, sa, gt, observers=['LG_CHO_2D', 'NPWE_2D'], profiler=profiler)
+    profiler.report()  # wall time, calls and peak bytes per (observer, insert_HU, stage)
+
+Stages run by worker threads or processes of `measure_LCD` are recorded by a profiler local to
+the task and merged into the caller's profiler, so callbacks always run in the calling process.
+
+Memory is traced with `tracemalloc`, which is global to the process: under the thread executor
+(or with profilers active in several threads) a stage's peak includes the allocations of the
+stages running concurrently in other threads, so memory figures are process-wide.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+import json
+import threading
+import time
+import tracemalloc
+import pandas as pd
+from typing import Union, List, Optional, Dict, Any, Callable, Iterable, Iterator, NamedTuple, Tuple
+
+
+class StageRecord(NamedTuple):
+    """One completed stage."""
+    stage: str
+    context: Dict[str, Any]  # e.g. {'observer': 'LG_CHO', 'insert_HU': 14.0}
+    start: float  # wall clock (time.time) at the start of the stage
+    wall_time: float  # seconds
+    peak_bytes: Optional[int]  # peak traced allocation above the start of the stage, None without memory tracing
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Flat representation: the context keys become fields."""
+        return {'stage': self.stage, **self.context, 'start': self.start, 'wall_time': self.wall_time,
+                'peak_bytes': self.peak_bytes}
+
+
+_active: ContextVar[Optional[Tuple['Profiler', Dict[str, Any]]]] = ContextVar('lcdct_profiler', default=None)
+
+
+class _NullStage:
+    def __enter__(self):
+        return None
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+def stage(name: str) -> Any:
+    """Context manager recording stage `name` on the active profiler, a no-op if there is none."""
+    active = _active.get()
+    if active is None:
+        return _NULL_STAGE
+    return active[0]._stage(name, active[1])
+
+
+def active_profiler() -> Optional['Profiler']:
+    """Returns the profiler activated in the current context, if any."""
+    active = _active.get()
+    return None if active is None else active[0]
+
+
+# tracemalloc is process-wide: profilers of all threads share the tracing and its peak
+_tracing_lock = threading.Lock()
+_tracing_users = 0
+_tracing_started = False  # tracing was started by the profilers, not by the application
+_open_frames: List['_Frame'] = []
+
+
+def _start_tracing() -> None:
+    global _tracing_users, _tracing_started
+    with _tracing_lock:
+        if _tracing_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _tracing_started = True
+        _tracing_users += 1
+
+
+def _stop_tracing() -> None:
+    global _tracing_users, _tracing_started
+    with _tracing_lock:
+        _tracing_users -= 1
+        if _tracing_users == 0 and _tracing_started:
+            tracemalloc.stop()
+            _tracing_started = False
+            _open_frames.clear()
+
+
+class _Frame:
+    """Open stage; tracks the traced memory peak across nested and concurrent stages."""
+
+    def __init__(self, profiler: 'Profiler', name: str, context: Dict[str, Any]):
+        self.profiler = profiler
+        self.name = name
+        self.context = context
+
+    def __enter__(self):
+        self.base = None
+        if self.profiler.memory:
+            with _tracing_lock:
+                if tracemalloc.is_tracing():
+                    self.base, peak = tracemalloc.get_traced_memory()
+                    self.max_peak = self.base
+                    # keep the peak of every open stage, in any thread, before it is reset for this one
+                    for frame in _open_frames:
+                        frame.max_peak = max(frame.max_peak, peak)
+                    if hasattr(tracemalloc, 'reset_peak'):  # Python >= 3.9
+                        tracemalloc.reset_peak()
+                    _open_frames.append(self)
+        self.start = time.time()
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        wall_time = time.perf_counter() - self.t0
+        peak_bytes = None
+        if self.base is not None:
+            with _tracing_lock:
+                if self in _open_frames:
+                    _open_frames.remove(self)
+                    peak = max(self.max_peak, tracemalloc.get_traced_memory()[1])
+                    peak_bytes = peak - self.base
+        self.profiler._add(StageRecord(self.name, self.context, self.start, wall_time, peak_bytes))
+        return False
+
+
+class Profiler:
+    """Collects stage records of `measure_LCD` and `Observer.run_study`.
+
+    Attributes:
+        memory: Whether peak allocations are traced with `tracemalloc`.
+        records: Completed stages, in completion order.
+    """
+
+    def __init__(self, memory: bool = False, callbacks: Optional[Iterable[Callable[[StageRecord], None]]] = None):
+        """Creates an empty profiler.
+
+        Args:
+            memory: Trace allocations with `tracemalloc` (started while any profiler is active
+                if it is not running already) and record each stage's peak. Tracing slows
+                allocation-heavy code down noticeably, and threads share one trace, so peaks of
+                concurrently running stages include each other's allocations: with
+                `executor='thread'` memory figures are process-wide.
+            callbacks: Functions called with every `StageRecord` as it is recorded, e.g. to
+                forward stages to an external metrics collector.
+        """
+        self.memory = memory
+        self.callbacks = list(callbacks or [])
+        self.records: List[StageRecord] = []
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(memory={self.memory}, records={len(self.records)})"
+
+    def add_callback(self, callback: Callable[[StageRecord], None]) -> None:
+        """Registers a function called with every new `StageRecord`."""
+        self.callbacks.append(callback)
+
+    @contextmanager
+    def activate(self, **context: Any) -> Iterator['Profiler']:
+        """Makes this profiler record the stages run in the current context.
+
+        Args:
+            **context: Labels attached to the stages recorded inside, e.g. observer='LG_CHO'.
+                They extend (and override) the labels of an enclosing activation.
+        """
+        active = _active.get()
+        if active is not None and active[0] is self:
+            context = {**active[1], **context}
+        if self.memory:
+            _start_tracing()
+        token = _active.set((self, context))
+        try:
+            yield self
+        finally:
+            _active.reset(token)
+            if self.memory:
+                _stop_tracing()
+
+    def _stage(self, name: str, context: Dict[str, Any]) -> _Frame:
+        return _Frame(self, name, context)
+
+    def _add(self, record: StageRecord) -> None:
+        self.records.append(record)
+        for callback in self.callbacks:
+            callback(record)
+
+    def extend(self, records: Iterable[StageRecord]) -> None:
+        """Adds records collected elsewhere (e.g. by a worker process), calling the callbacks."""
+        for record in records:
+            self._add(record)
+
+    def clear(self) -> None:
+        """Drops all records."""
+        self.records = []
+
+    def to_frame(self) -> pd.DataFrame:
+        """Returns one row per recorded stage, with the context labels as columns."""
+        return pd.DataFrame([r.to_dict() for r in self.records])
+
+    def report(self, by: Optional[List[str]] = None) -> pd.DataFrame:
+        """Summarizes the records per stage.
+
+        Args:
+            by: Context labels to group by. Default: all labels seen, e.g. ['observer', 'insert_HU'].
+
+        Returns:
+            pd.DataFrame: Columns `by` + ['stage', 'calls', 'wall_time', 'peak_bytes'] with the
+                number of calls, total seconds and largest peak of every group.
+        """
+        df = self.to_frame()
+        if df.empty:
+            return pd.DataFrame(columns=(by or []) + ['stage', 'calls', 'wall_time', 'peak_bytes'])
+        if by is None:
+            by = [c for c in df.columns if c not in ('stage', 'start', 'wall_time', 'peak_bytes')]
+        return (df.groupby(by + ['stage'], sort=False, dropna=False)
+                  .agg(calls=('wall_time', 'size'), wall_time=('wall_time', 'sum'), peak_bytes=('peak_bytes', 'max'))
+                  .reset_index())
+
+    def to_json(self) -> str:
+        """Returns the records as a JSON trace: {'records': [{stage, labels..., start, wall_time, peak_bytes}]}."""
+        return json.dumps({'records': [r.to_dict() for r in self.records]}, default=str)
+
+    def save(self, filename: Union[str, Path]) -> None:
+        """Writes the JSON trace (see `to_json`) to a file."""
+        with open(filename, 'w') as f:
+            f.write(self.to_json())
@@ -0,0 +1,175 @@
+"""
+Observer registry.
+
+`measure_LCD` builds one observer per (observer, insert) from an `ObserverFactory`. A factory
+declares the observer class, its fixed parameters, how parameters scale with the insert size,
+and whether its channels only depend on the ROI shape and parameters (so `measure_LCD` can build
+them for all inserts before the studies run).
+
+Built-in observers are registered under 'LG_CHO_2D', 'DOG_CHO_2D', 'GABOR_CHO_2D' and 'NPWE_2D',
+and for volumetric (N, Z, Y, X) stacks under 'LG_CHO_SS' (single slice), 'LG_CHO_MS' and
+'GABOR_CHO_MS' (multi-slice) and 'LG_CHO_3D'.
+Other packages register observers with `register_observer`, or through an entry point in the
+'lcdct.observers' group that resolves to an `ObserverFactory`::
+
+    [project.entry-points."lcdct.observers"]
+    MY_CHO_2D = "my_package.observers:my_cho_factory"
+"""
+from importlib.metadata import entry_points
+import warnings
+import numpy as np
+from typing import Union, List, Optional, Dict, Any, Callable, Type
+
+from .Observers import Observer, LG_CHO, DOG_CHO, Gabor_CHO, NPWE, LG_CHO_3D, LG_CHO_MS, LG_CHO_SS, Gabor_CHO_MS
+
+ENTRY_POINT_GROUP = 'lcdct.observers'
+
+
+class ObserverFactory:
+    """Builds the observer of one insert from its ROIs."""
+
+    def __init__(self, name: str, observer_cls: Type[Observer], params: Optional[Dict[str, Any]] = None,
+                 insert_params: Optional[Callable[[float], Dict[str, Any]]] = None,
+                 precompute_channels: bool = False):
+        """Declares an observer.
+
+        Args:
+            name: Registry name, e.g. 'LG_CHO_2D' (case insensitive).
+            observer_cls: Observer class, called as observer_cls(sp_rois, sa_rois, **params,
+                remove_dc=False, dtype=dtype).
+            params: Fixed keyword arguments of `observer_cls`.
+            insert_params: Function of the insert diameter (pixels) returning keyword arguments
+                that scale with the insert, e.g. the LG channel width. Must be picklable (a
+                module-level function) to be used with process pools.
+            precompute_channels: Whether `observer_cls.get_channels` only depends on the ROI
+                shape and the parameters, so channel banks can be built before the images are
+                available.
+        """
+        self.name = name.upper()
+        self.observer_cls = observer_cls
+        self.params = dict(params or {})
+        self.insert_params = insert_params
+        self.precompute_channels = precompute_channels
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}('{self.name}', {self.observer_cls.__name__}, params={self.params})"
+
+    def params_for(self, insert_diameter: float) -> Dict[str, Any]:
+        """Returns the observer keyword arguments for an insert of the given diameter."""
+        params = dict(self.params)
+        if self.insert_params is not None:
+            params.update(self.insert_params(insert_diameter))
+        return params
+
+    def __call__(self, sp_rois: np.ndarray, sa_rois: np.ndarray, insert_diameter: float,
+                 dtype: Optional[Union[str, np.dtype]] = None) -> Observer:
+        """Builds the observer of one insert.
+
+        Args:
+            sp_rois: DC-removed signal-present ROIs (N, h, w), used without copies.
+            sa_rois: DC-removed signal-absent ROIs (N, h, w).
+            insert_diameter: Insert diameter in pixels.
+            dtype: Compute precision, see `Observer`.
+
+        Returns:
+            Observer: The observer.
+        """
+        return self.observer_cls(sp_rois, sa_rois, remove_dc=False, dtype=dtype, **self.params_for(insert_diameter))
+
+    def channels(self, shape: Any, insert_diameter: float,
+                 dtype: Optional[Union[str, np.dtype]] = None) -> Optional[np.ndarray]:
+        """Builds (and caches) the channel matrix for an ROI shape, if the channels can be precomputed.
+
+        Args:
+            shape: ROI shape (h, w), or (Z, h, w) for volumetric observers.
+            insert_diameter: Insert diameter in pixels.
+            dtype: Compute precision, see `Observer`.
+
+        Returns:
+            Optional[np.ndarray]: Channel matrix, or None for observers without precomputable channels.
+        """
+        if not self.precompute_channels:
+            return None
+        observer = self.observer_cls(None, None, remove_dc=False, dtype=dtype, **self.params_for(insert_diameter))
+        return observer.get_channels(*shape)
+
+    def cache_params(self) -> Dict[str, Any]:
+        """Parameters identifying the results of this factory's observers (see `lcdct.cache`)."""
+        insert_params = None if self.insert_params is None else \
+            f"{self.insert_params.__module__}.{self.insert_params.__qualname__}"
+        return {'name': self.name, 'observer_cls': f"{self.observer_cls.__module__}.{self.observer_cls.__qualname__}",
+                'params': self.params, 'insert_params': insert_params}
+
+
+def lg_insert_params(insert_diameter: float) -> Dict[str, Any]:
+    """LG channel width scales with the insert size, as in the MATLAB measure_LCD."""
+    return {'channel_width': 2/3 * insert_diameter}
+
+
+_registry: Dict[str, ObserverFactory] = {}
+_entry_points_loaded = False
+
+
+def register_observer(factory: ObserverFactory, overwrite: bool = False) -> None:
+    """Adds an observer factory to the registry.
+
+    Args:
+        factory: Factory to register under `factory.name`.
+        overwrite: Replace an existing factory of the same name.
+
+    Raises:
+        ValueError: If the name is already registered and `overwrite` is False.
+    """
+    if factory.name in _registry and not overwrite:
+        raise ValueError(f"Observer already registered: {factory.name}")
+    _registry[factory.name] = factory
+
+
+def _load_entry_points() -> None:
+    global _entry_points_loaded
+    if _entry_points_loaded:
+        return
+    _entry_points_loaded = True
+    eps = entry_points()
+    group = eps.select(group=ENTRY_POINT_GROUP) if hasattr(eps, 'select') else eps.get(ENTRY_POINT_GROUP, [])
+    for ep in group:
+        try:
+            factory = ep.load()
+            if not isinstance(factory, ObserverFactory):
+                raise TypeError(f"expected an ObserverFactory, got {type(factory).__name__}")
+            register_observer(factory)
+        except Exception as e:
+            warnings.warn(f"Could not load observer entry point '{ep.name}': {e}")
+
+
+def get_observer_factory(name: str) -> ObserverFactory:
+    """Returns the factory registered under `name` (case insensitive).
+
+    Raises:
+        ValueError: If no observer of that name is registered.
+    """
+    key = name.upper()
+    if key not in _registry:
+        _load_entry_points()
+    if key not in _registry:
+        raise ValueError(f"Unknown observer: {key}")
+    return _registry[key]
+
+
+def available_observers() -> List[str]:
+    """Returns the names of all registered observers, including entry point plugins."""
+    _load_entry_points()
+    return list(_registry)
+
+
+for _factory in [
+    ObserverFactory('LG_CHO_2D', LG_CHO, insert_params=lg_insert_params, precompute_channels=True),
+    ObserverFactory('DOG_CHO_2D', DOG_CHO, precompute_channels=True),
+    ObserverFactory('GABOR_CHO_2D', Gabor_CHO, precompute_channels=True),
+    ObserverFactory('NPWE_2D', NPWE),
+    ObserverFactory('LG_CHO_SS', LG_CHO_SS, insert_params=lg_insert_params),
+    ObserverFactory('LG_CHO_MS', LG_CHO_MS, insert_params=lg_insert_params),
+    ObserverFactory('GABOR_CHO_MS', Gabor_CHO_MS),
+    ObserverFactory('LG_CHO_3D', LG_CHO_3D, insert_params=lg_insert_params, precompute_channels=True),
+]:
+    register_observer(_factory)
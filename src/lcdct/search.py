@@ -0,0 +1,208 @@
+"""
+Location-unknown (search) detection tasks.
+
+`measure_LCD` scores one ROI centered on every insert: the signal location is known. In a
+search task the signal may lie anywhere within a search region around the insert. Each reader's
+template is trained once on location-known ROIs (`Observer.spatial_templates`) and
+cross-correlated with the search windows of the reader's test images in batched FFTs, which
+gives one score map per image. The maximum of the map is the decision variable and its position the reported
+location, from which ROC (maximum statistic), LROC and AFROC figures of merit follow.
+Per-position detectability maps show how detectability falls off around the true location.
+"""
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from scipy.signal import fftconvolve
+from typing import Union, List, Optional, Any, Tuple, Dict
+
+from .LCD import _make_observer
+from .layout import PhantomLayout
+from .metrics import auc, auc_snr, lroc_auc, snr
+from .Observers import split_indices
+from .parallel import as_array
+from .profiling import stage
+from .registry import get_observer_factory
+from .utils import read_mhd
+
+
+def score_maps(images: np.ndarray, templates: np.ndarray, chunk_size: int = 64) -> np.ndarray:
+    """Cross-correlates templates with every image at all positions where they fit.
+
+    The templates are made zero-mean first, which removes the mean of every window just as
+    `remove_dc` does for location-known ROIs: at a position where the window is an observer's
+    ROI, the score is that observer's decision variable.
+
+    Args:
+        images: Image stack (N, Y, X), e.g. search windows from `PhantomLayout.extract_rois`.
+        templates: Template (h, w) or stack of templates (R, h, w), e.g. one per reader.
+        chunk_size: Number of images transformed at a time.
+
+    Returns:
+        np.ndarray: Score maps (N, Y - h + 1, X - w + 1), or (N, R, Y - h + 1, X - w + 1) for a
+            stack of templates; entry [n, (r,) i, j] = sum(t * images[n, i:i + h, j:j + w]).
+    """
+    templates = np.asarray(templates)
+    single = templates.ndim == 2
+    if single:
+        templates = templates[None]
+    templates = templates - templates.mean(axis=(1, 2), keepdims=True)
+    if np.issubdtype(images.dtype, np.floating):
+        templates = templates.astype(images.dtype, copy=False)
+    # convolving with the flipped templates is a cross-correlation
+    kernels = templates[None, :, ::-1, ::-1]
+    maps = [fftconvolve(np.asarray(images[start:start + chunk_size])[:, None], kernels, mode='valid', axes=(2, 3))
+            for start in range(0, len(images), chunk_size)]
+    maps = np.concatenate(maps)
+    return maps[:, 0] if single else maps
+
+
+def max_statistic(maps: np.ndarray, mask: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """Returns the maximum of every score map and its position.
+
+    Args:
+        maps: Score maps (..., H, W).
+        mask: Optional boolean (H, W) search region; positions outside it are ignored.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: Maxima (...) and their (row, col) positions (..., 2).
+    """
+    flat = maps.reshape(maps.shape[:-2] + (-1,))
+    if mask is not None:
+        flat = np.where(np.ravel(mask), flat, -np.inf)
+    idx = flat.argmax(axis=-1)
+    values = np.take_along_axis(flat, idx[..., None], axis=-1)[..., 0]
+    return values, np.stack(np.unravel_index(idx, maps.shape[-2:]), axis=-1)
+
+
+def detectability_map(maps_sa: np.ndarray, maps_sp: np.ndarray) -> np.ndarray:
+    """Detectability index d' of the score at every position.
+
+    Args:
+        maps_sa: Signal-absent score maps (..., n_sa, H, W).
+        maps_sp: Signal-present score maps (..., n_sp, H, W).
+
+    Returns:
+        np.ndarray: d' map (..., H, W), see `metrics.snr`.
+    """
+    return snr(np.moveaxis(maps_sa, -3, -1), np.moveaxis(maps_sp, -3, -1))
+
+
+def _disk(radius: int, center: np.ndarray, r: float) -> np.ndarray:
+    yy, xx = np.mgrid[:2 * radius + 1, :2 * radius + 1]
+    return np.hypot(yy - center[0], xx - center[1]) <= r
+
+
+def search_LCD(signal_present: np.ndarray, signal_absent: np.ndarray, ground_truth: Union[np.ndarray, str, Path, PhantomLayout],
+               observers: Optional[List[Union[str, Any]]] = None, search_radius: Optional[int] = None,
+               localization_radius: Optional[float] = None, n_reader: int = 10, pct_split: float = 0.5,
+               seed_split: Optional[Union[List[int], np.ndarray]] = None, dtype: Optional[Union[str, np.dtype]] = None, chunk_size: int = 64,
+               return_maps: bool = False) -> Union[pd.DataFrame, Tuple[pd.DataFrame, Dict[Tuple[str, float], np.ndarray]]]:
+    """Measures the detectability of every insert in a location-unknown search task.
+
+    For every reader the observer template is trained on location-known ROIs of the training
+    images (the ROIs of `measure_LCD`) and scanned over a disk of `search_radius` pixels around
+    the insert in every test image. The test images are split between readers as in
+    `measure_LCD`, so with `search_radius=0` the results equal its location-known ones.
+
+    Args:
+        signal_present: np.ndarray (N, Y, X) of signal present images.
+        signal_absent: np.ndarray (N, Y, X) of signal absent images.
+        ground_truth: Ground truth image (Y, X), path to an MHD file, or a `PhantomLayout`.
+        observers: Registered names of linear observers (e.g. 'LG_CHO_2D', 'NPWE_2D'),
+            `ObserverFactory` objects or Observer instances. Default: ['LG_CHO_2D'].
+        search_radius: Radius of the search region in pixels. It should not reach other inserts,
+            which are present in the same signal-present images. Default: the largest insert
+            diameter.
+        localization_radius: Distance from the insert center within which a reported location
+            is correct. Default: the insert radius.
+        n_reader: Number of readers (random train/test splits).
+        pct_split: Train/test split ratio.
+        seed_split: List/array of seeds or None, as in `measure_LCD`.
+        dtype: Compute precision of ROIs and score maps, see `measure_LCD`.
+        chunk_size: Number of images transformed at a time.
+        return_maps: Also return the reader-averaged detectability map of every
+            (observer, insert_HU), of shape (2 * search_radius + 1,) * 2 and centered on the
+            rounded insert centroid.
+
+    Returns:
+        pd.DataFrame: One row per (observer, insert, reader) with 'auc' and 'snr' of the maximum
+            statistic, 'lroc' (signal scored above a signal-absent image and localized correctly)
+            and 'afroc' (highest score near the signal above the maximum of a signal-absent
+            image), plus 'observer', 'reader', 'insert_HU', 'insert_diameter_pix' and
+            'search_radius'. With `return_maps`, a (results, maps) tuple.
+
+    Raises:
+        ValueError: If the stacks are not (N, Y, X).
+    """
+    if observers is None:
+        observers = ['LG_CHO_2D']
+    signal_present, signal_absent = as_array(signal_present), as_array(signal_absent)
+    if signal_present.ndim != 3 or signal_absent.ndim != 3:
+        raise ValueError("search_LCD needs 3D (N, Y, X) signal_present and signal_absent stacks")
+    if isinstance(ground_truth, (str, Path)):
+        ground_truth = read_mhd(str(ground_truth))
+    layout = ground_truth if isinstance(ground_truth, PhantomLayout) else PhantomLayout.from_ground_truth(ground_truth)
+    factories = [get_observer_factory(o) if isinstance(o, str) else o for o in observers]
+
+    maps_out: Dict[Tuple[str, float], np.ndarray] = {}
+    if not layout.inserts:
+        return (pd.DataFrame(), maps_out) if return_maps else pd.DataFrame()
+
+    half = layout.max_diameter  # template half width, as the ROIs of measure_LCD
+    radius = layout.max_diameter if search_radius is None else int(round(search_radius))
+    region = _disk(radius, np.array([radius, radius]), radius)
+
+    with stage('extract_rois'):
+        sp_rois = layout.extract_rois(signal_present, nx=2 * half, dtype=dtype)
+        sa_rois = layout.extract_rois(signal_absent, nx=2 * half, dtype=dtype)
+        sp_windows = layout.extract_rois(signal_present, nx=2 * (half + radius), remove_dc=False, dtype=dtype)
+        sa_windows = layout.extract_rois(signal_absent, nx=2 * (half + radius), remove_dc=False, dtype=dtype)
+
+    seeds = np.random.default_rng(seed=seed_split).integers(0, 100000, size=n_reader)
+    with stage('splits'):
+        tr_sa, te_sa = split_indices(sa_rois.shape[1], pct_split, seeds)
+        tr_sp, te_sp = split_indices(sp_rois.shape[1], pct_split, seeds)
+    # dtype of the score maps, see `score_maps`
+    score_dtype = sa_windows.dtype if np.issubdtype(sa_windows.dtype, np.floating) else np.float64
+
+    results_list = []
+    for i, info in enumerate(layout.inserts):
+        # true insert center in map coordinates
+        center = np.array(info.centroid) - np.round(info.centroid) + radius
+        loc_radius = info.diameter / 2 if localization_radius is None else localization_radius
+        near = region & _disk(radius, center, loc_radius)
+        for obs_item in factories:
+            obs = _make_observer(obs_item, sp_rois[i], sa_rois[i], info.diameter, dtype)
+            with stage('template'):
+                templates = obs.spatial_templates(sa_rois[i], sp_rois[i], tr_sa, tr_sp)
+            t_sa, t_sp, t_lesion = (np.empty(idx.shape, score_dtype) for idx in (te_sa, te_sp, te_sp))
+            correct = np.empty(te_sp.shape, dtype=bool)
+            dmap = np.zeros(region.shape) if return_maps else None
+            # one reader at a time: only its test images are scored, against its template only
+            for r in range(n_reader):
+                with stage('score_maps'):
+                    maps_sa = score_maps(sa_windows[i][te_sa[r]], templates[r], chunk_size)
+                    maps_sp = score_maps(sp_windows[i][te_sp[r]], templates[r], chunk_size)
+                with stage('decision_variables'):
+                    t_sa[r], _ = max_statistic(maps_sa, region)
+                    t_sp[r], location = max_statistic(maps_sp, region)
+                    correct[r] = np.hypot(*np.moveaxis(location - center, -1, 0)) <= loc_radius
+                    t_lesion[r], _ = max_statistic(maps_sp, near)
+                if return_maps:
+                    dmap += detectability_map(maps_sa, maps_sp) / n_reader
+            metrics = auc_snr(t_sa, t_sp)
+            name = type(obs).__name__
+            results_list.append(pd.DataFrame({'auc': metrics['auc'],
+                                              'snr': metrics['snr'],
+                                              'lroc': lroc_auc(t_sa, t_sp, correct),
+                                              'afroc': auc(t_sa, t_lesion),
+                                              'observer': name,
+                                              'reader': np.arange(n_reader),
+                                              'insert_HU': info.hu,
+                                              'insert_diameter_pix': 2 * info.diameter,
+                                              'search_radius': radius}))
+            if return_maps:
+                maps_out[(name, info.hu)] = dmap
+
+    results = pd.concat(results_list, ignore_index=True)
+    return (results, maps_out) if return_maps else results
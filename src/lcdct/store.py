@@ -0,0 +1,289 @@
+"""
+Append-only, partitioned store of per-reader LCD results.
+
+Each `ResultStore.append` writes its record batch as new columnar files in a Hive-style
+directory tree partitioned by (recon, dose_level) by default::
+
+    store/
+      _store.json
+      recon=fbp/dose_level=100/part-<id>.parquet
+
+Files are written atomically and never rewritten, so a sweep that dies keeps every batch it
+finished. Files are Parquet when `pyarrow` is installed (also readable with
+`pyarrow.dataset.dataset(path, partitioning='hive')`), otherwise NPZ as in `lcdct.cache`.
+Reading prunes partitions by their directory names and streams one file at a time, so
+filtering and aggregating do not need the whole archive in memory.
+"""
+from pathlib import Path
+from urllib.parse import quote, unquote
+import io
+import json
+import os
+import tempfile
+import uuid
+import numpy as np
+import pandas as pd
+from typing import Union, List, Optional, Dict, Any, Iterator, Sequence
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # optional dependency
+    pa = pq = None
+
+# column -> pandas dtype of a results record
+RESULT_SCHEMA: Dict[str, str] = {
+    'auc': 'float64',
+    'snr': 'float64',
+    'observer': 'str',
+    'reader': 'int64',
+    'insert_HU': 'float64',
+    'insert_diameter_pix': 'int64',
+    'recon': 'str',
+    'dose_level': 'int64',
+}
+STORE_FORMATS = ['parquet', 'npz']
+_META_FILE = '_store.json'
+_EXTENSIONS = {'parquet': '.parquet', 'npz': '.npz'}
+
+
+def _check_format(fmt: str) -> None:
+    if fmt not in STORE_FORMATS:
+        raise ValueError(f"Unknown store format: {fmt}")
+    if fmt == 'parquet' and pq is None:
+        raise ImportError("The 'parquet' store format requires pyarrow (pip install pyarrow)")
+
+
+def _as_list(value: Any) -> List[Any]:
+    return list(value) if isinstance(value, (list, tuple, set, np.ndarray)) else [value]
+
+
+class ResultStore:
+    """Partitioned, append-only dataset of LCD results.
+
+    Attributes:
+        path: Root directory.
+        schema: Column name -> dtype of the stored records.
+        partition_cols: Columns encoded in the directory names.
+        format: 'parquet' or 'npz'.
+    """
+
+    def __init__(self, path: Union[str, Path], partition_cols: Optional[Sequence[str]] = None,
+                 format: Optional[str] = None, schema: Optional[Dict[str, str]] = None):
+        """Opens a store, creating it if the directory holds none.
+
+        The partition columns, format and schema of an existing store are read from its
+        `_store.json` and must not be contradicted by the arguments.
+
+        Args:
+            path: Root directory of the store.
+            partition_cols: Columns partitioning the files. Default: ['recon', 'dose_level'].
+            format: 'parquet' or 'npz'. Default: 'parquet' if pyarrow is installed, else 'npz'.
+            schema: Column name -> dtype. Default: `RESULT_SCHEMA`.
+
+        Raises:
+            ValueError: If the arguments disagree with an existing store or a partition column
+                is not in the schema.
+            ImportError: If the parquet format is requested without pyarrow.
+        """
+        self.path = Path(path)
+        meta_file = self.path / _META_FILE
+        if meta_file.exists():
+            with open(meta_file) as f:
+                meta = json.load(f)
+            for name, value in (('partition_cols', partition_cols), ('format', format), ('schema', schema)):
+                if value is not None and (list(value) if name == 'partition_cols' else value) != meta[name]:
+                    raise ValueError(f"Store at {self.path} has {name}={meta[name]}, got {value}")
+            self.partition_cols, self.format, self.schema = meta['partition_cols'], meta['format'], meta['schema']
+        else:
+            self.schema = dict(schema or RESULT_SCHEMA)
+            self.partition_cols = list(partition_cols if partition_cols is not None else ['recon', 'dose_level'])
+            self.format = format or ('parquet' if pq is not None else 'npz')
+            for c in self.partition_cols:
+                if c not in self.schema:
+                    raise ValueError(f"Partition column {c} is not in the schema")
+            _check_format(self.format)
+            self.path.mkdir(parents=True, exist_ok=True)
+            self._write_atomic(meta_file, json.dumps({'partition_cols': self.partition_cols, 'format': self.format,
+                                                      'schema': self.schema}, indent=1).encode())
+        _check_format(self.format)
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}('{self.path}', partition_cols={self.partition_cols}, format='{self.format}')"
+
+    @property
+    def data_cols(self) -> List[str]:
+        """Columns stored inside the files (all but the partition columns)."""
+        return [c for c in self.schema if c not in self.partition_cols]
+
+    def _coerce(self, df: pd.DataFrame) -> pd.DataFrame:
+        missing = [c for c in self.schema if c not in df.columns]
+        if missing:
+            raise ValueError(f"Results are missing columns {missing}")
+        return pd.DataFrame({c: df[c].to_numpy().astype(dtype) for c, dtype in self.schema.items()})
+
+    def _write_atomic(self, path: Path, data: bytes) -> None:
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+
+    def _write_part(self, directory: Path, df: pd.DataFrame) -> Path:
+        directory.mkdir(parents=True, exist_ok=True)
+        target = directory / f"part-{uuid.uuid4().hex}{_EXTENSIONS[self.format]}"
+        buffer = io.BytesIO()
+        if self.format == 'parquet':
+            pq.write_table(pa.Table.from_pandas(df, preserve_index=False), buffer)
+        else:
+            # labels are stored as strings (no pickled objects), as in `lcdct.cache`
+            np.savez(buffer, **{c: df[c].to_numpy().astype(self.schema[c]) for c in df.columns})
+        self._write_atomic(target, buffer.getvalue())
+        return target
+
+    def append(self, results: pd.DataFrame, **constants: Any) -> List[Path]:
+        """Writes a batch of results as new files, one per partition it touches.
+
+        Args:
+            results: Results with (at least) the schema columns, e.g. from `measure_LCD`.
+            **constants: Values of columns missing from `results`, e.g. recon='fbp', dose_level=100.
+
+        Returns:
+            List[Path]: Files written.
+
+        Raises:
+            ValueError: If a schema column is missing.
+        """
+        if results.empty:
+            return []
+        if constants:
+            results = results.assign(**constants)
+        df = self._coerce(results)
+        if not self.partition_cols:
+            return [self._write_part(self.path, df)]
+        written = []
+        for values, part in df.groupby(self.partition_cols, sort=False):
+            values = values if isinstance(values, tuple) else (values,)
+            directory = self.path.joinpath(*(f"{c}={quote(str(v), safe='')}" for c, v in zip(self.partition_cols, values)))
+            written.append(self._write_part(directory, part[self.data_cols].reset_index(drop=True)))
+        return written
+
+    def partitions(self, filters: Optional[Dict[str, Any]] = None) -> pd.DataFrame:
+        """Lists the partitions (one row of partition column values each) matching `filters`.
+
+        Only directory names are read.
+        """
+        rows = []
+        for directory in self._partition_dirs(filters):
+            rows.append(self._partition_values(directory))
+        return pd.DataFrame(rows, columns=self.partition_cols).astype(
+            {c: self.schema[c] for c in self.partition_cols})
+
+    def _partition_values(self, directory: Path) -> Dict[str, Any]:
+        parts = directory.relative_to(self.path).parts
+        values = {}
+        for c, part in zip(self.partition_cols, parts):
+            values[c] = np.array([unquote(part.split('=', 1)[1])]).astype(self.schema[c])[0]
+        return values
+
+    def _partition_dirs(self, filters: Optional[Dict[str, Any]] = None) -> Iterator[Path]:
+        filters = filters or {}
+        dirs = [self.path]
+        for c in self.partition_cols:
+            allowed = None
+            if c in filters:
+                allowed = {quote(str(np.array([v]).astype(self.schema[c])[0]), safe='') for v in _as_list(filters[c])}
+            dirs = sorted(d / p.name for d in dirs for p in d.iterdir()
+                          if p.is_dir() and p.name.startswith(f"{c}=")
+                          and (allowed is None or p.name.split('=', 1)[1] in allowed))
+        yield from dirs
+
+    def _read_part(self, file: Path, columns: List[str]) -> pd.DataFrame:
+        if self.format == 'parquet':
+            return pq.read_table(file, columns=columns).to_pandas()
+        with np.load(file, allow_pickle=False) as data:
+            return pd.DataFrame({c: data[c] for c in columns})
+
+    def iter_batches(self, filters: Optional[Dict[str, Any]] = None,
+                     columns: Optional[List[str]] = None) -> Iterator[pd.DataFrame]:
+        """Yields the stored batches matching `filters`, one file at a time.
+
+        Args:
+            filters: Column -> value or list of accepted values. Partition columns prune
+                directories before any file is opened; other columns filter rows.
+            columns: Columns to return. Default: all schema columns.
+
+        Yields:
+            pd.DataFrame: Matching rows of one file, typed by the schema.
+        """
+        filters = filters or {}
+        columns = list(columns or self.schema)
+        unknown = [c for c in list(columns) + list(filters) if c not in self.schema]
+        if unknown:
+            raise ValueError(f"Unknown columns: {unknown}")
+        row_filters = {c: _as_list(v) for c, v in filters.items() if c not in self.partition_cols}
+        file_cols = [c for c in self.data_cols if c in columns or c in row_filters]
+        for directory in self._partition_dirs(filters):
+            values = self._partition_values(directory)
+            for file in sorted(directory.glob(f"part-*{_EXTENSIONS[self.format]}")):
+                df = self._read_part(file, file_cols)
+                for c, accepted in row_filters.items():
+                    df = df[df[c].isin(accepted)]
+                if df.empty:
+                    continue
+                for c, v in values.items():
+                    df[c] = np.repeat(np.array([v]).astype(self.schema[c]), len(df))
+                yield df[columns].reset_index(drop=True)
+
+    def read(self, filters: Optional[Dict[str, Any]] = None, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """Loads the results matching `filters` into one DataFrame (see `iter_batches`)."""
+        batches = list(self.iter_batches(filters, columns))
+        if not batches:
+            return pd.DataFrame({c: pd.Series(dtype=self.schema[c]) for c in (columns or self.schema)})
+        return pd.concat(batches, ignore_index=True)
+
+    def aggregate(self, by: Optional[List[str]] = None, metrics: Sequence[str] = ('auc', 'snr'),
+                  filters: Optional[Dict[str, Any]] = None) -> pd.DataFrame:
+        """Mean, reader standard deviation and count of metrics per group, one file at a time.
+
+        Per-file counts, means and sums of squared deviations are merged with the pairwise
+        (Chan) update, so only one file and the per-group partial results are in memory.
+
+        Args:
+            by: Grouping columns. Default: ['recon', 'dose_level', 'insert_HU', 'observer'].
+            metrics: Numeric columns to summarize.
+            filters: See `iter_batches`.
+
+        Returns:
+            pd.DataFrame: `by` columns plus '<metric>_mean', '<metric>_std' and 'n'.
+        """
+        by = list(by or ['recon', 'dose_level', 'insert_HU', 'observer'])
+        metrics = list(metrics)
+        partials = []
+        for df in self.iter_batches(filters, columns=by + metrics):
+            g = df.groupby(by, sort=False)[metrics]
+            part = g.mean().add_suffix('_mean')
+            part = part.join(g.var(ddof=0).mul(g.size(), axis=0).add_suffix('_m2'))
+            part['n'] = g.size()
+            partials.append(part.reset_index())
+        if not partials:
+            return pd.DataFrame(columns=by + [f"{m}_{s}" for m in metrics for s in ('mean', 'std')] + ['n'])
+
+        parts = pd.concat(partials, ignore_index=True)
+        n_total = parts.groupby(by, sort=False)['n'].transform('sum')
+        for m in metrics:
+            parts[f"{m}_sum"] = parts[f"{m}_mean"] * parts['n']
+            mean_total = parts.groupby(by, sort=False)[f"{m}_sum"].transform('sum') / n_total
+            # within-file sums of squares plus the spread of the file means around the total mean
+            parts[f"{m}_m2"] += parts['n'] * (parts[f"{m}_mean"] - mean_total) ** 2
+        grouped = parts.groupby(by, sort=False).sum(numeric_only=True)
+        result = pd.DataFrame(index=grouped.index)
+        for m in metrics:
+            result[f"{m}_mean"] = grouped[f"{m}_sum"] / grouped['n']
+            result[f"{m}_std"] = np.sqrt(grouped[f"{m}_m2"] / (grouped['n'] - 1))
+        result['n'] = grouped['n']
+        return result.reset_index()
@@ -0,0 +1,235 @@
+"""
+Streaming CHO training and testing.
+
+Realizations are consumed in chunks (e.g. slices of a lazily loaded MHD series), projected onto
+the channels and folded into running channel means and covariances, so studies never hold the
+full image stack in memory. Only the channel outputs' sufficient statistics and one decision
+variable per test image are kept.
+
+Reader studies with random splits need every image's channel outputs, not only their running
+statistics: `stream_channel_outputs` reads the ROIs of all inserts chunk by chunk and keeps the
+(N, nch) outputs of each observer, from which `stream_run_study` evaluates the readers exactly as
+`Observer.run_study` does (`measure_LCD(..., chunk_size=...)` runs whole studies this way).
+"""
+from typing import Union, Iterable, Iterator, Optional, Tuple, Dict, List, Sequence
+import numpy as np
+import pandas as pd
+
+from .layout import PhantomLayout
+from .Observers import CHO, RESAMPLING_MODES, channel_reader_metrics, hotelling_template
+from .metrics import auc_snr
+from .profiling import stage
+
+
+class RunningStats:
+    """Running mean and covariance of channel outputs, updated chunk by chunk.
+
+    Chunks are merged with the pairwise Welford/Chan update, which is numerically stable and
+    gives the same result as `np.cov` on the concatenated data.
+    """
+
+    def __init__(self, n_features: int):
+        """Initializes empty statistics.
+
+        Args:
+            n_features: Number of channels.
+        """
+        self.count = 0
+        self.mean = np.zeros(n_features)
+        self.m2 = np.zeros((n_features, n_features))  # sum of outer products of deviations
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(n_features={len(self.mean)}, count={self.count})"
+
+    def update(self, x: np.ndarray) -> None:
+        """Adds a chunk of observations.
+
+        Args:
+            x: Channel outputs (n, n_features).
+        """
+        x = np.asarray(x, dtype=np.float64).reshape(-1, len(self.mean))
+        n_b = x.shape[0]
+        if n_b == 0:
+            return
+        mean_b = x.mean(axis=0)
+        c = x - mean_b
+        self._merge(n_b, mean_b, c.T @ c)
+
+    def merge(self, other: 'RunningStats') -> None:
+        """Adds the observations summarized by another `RunningStats`."""
+        if other.count:
+            self._merge(other.count, other.mean, other.m2)
+
+    def _merge(self, n_b: int, mean_b: np.ndarray, m2_b: np.ndarray) -> None:
+        n_a = self.count
+        n = n_a + n_b
+        delta = mean_b - self.mean
+        self.mean = self.mean + delta * (n_b / n)
+        self.m2 = self.m2 + m2_b + np.outer(delta, delta) * (n_a * n_b / n)
+        self.count = n
+
+    @property
+    def cov(self) -> np.ndarray:
+        """Unbiased covariance (n_features, n_features), as `np.cov(x, rowvar=False)`."""
+        if self.count < 2:
+            raise ValueError("At least two observations are needed for a covariance")
+        return self.m2 / (self.count - 1)
+
+
+def iter_chunks(images: np.ndarray, chunk_size: int = 64,
+                window: Optional[Tuple[slice, slice]] = None) -> Iterator[np.ndarray]:
+    """Yields consecutive chunks of an image stack.
+
+    With a lazily loaded `MHDStack` only the chunk (and only the `window` pixels) is decoded.
+
+    Args:
+        images: Image stack (N, Y, X).
+        chunk_size: Number of images per chunk.
+        window: Optional (row, col) slices, e.g. from `PhantomLayout.crop_window`.
+
+    Yields:
+        np.ndarray: Chunks of shape (<= chunk_size, h, w).
+    """
+    window = window or (slice(None), slice(None))
+    for start in range(0, len(images), chunk_size):
+        yield np.asarray(images[start:start + chunk_size, window[0], window[1]])
+
+
+def _channelize_chunk(chunk: np.ndarray, channels: Union[CHO, np.ndarray], remove_dc: bool) -> np.ndarray:
+    chunk = np.asarray(chunk)
+    if remove_dc:
+        chunk = chunk - chunk.mean(axis=tuple(range(1, chunk.ndim)), keepdims=True)
+    if isinstance(channels, CHO):
+        return channels.channelize(chunk)
+    return chunk.reshape(chunk.shape[0], -1) @ channels
+
+
+def accumulate_channel_stats(chunks: Iterable[np.ndarray], channels: Union[CHO, np.ndarray],
+                             remove_dc: bool = True) -> RunningStats:
+    """Channelizes image chunks and accumulates their running statistics.
+
+    Args:
+        chunks: Iterable of image chunks (n, Y, X).
+        channels: A CHO observer (its `channelize` is used) or a channel matrix (Y * X, nch).
+        remove_dc: Subtract the mean of every image, as `Observer` does.
+
+    Returns:
+        RunningStats: Mean and covariance of the channel outputs.
+    """
+    stats = None
+    for chunk in chunks:
+        v = _channelize_chunk(chunk, channels, remove_dc)
+        if stats is None:
+            stats = RunningStats(v.shape[1])
+        stats.update(v)
+    if stats is None:
+        raise ValueError("No images in stream")
+    return stats
+
+
+def stream_decision_variables(chunks: Iterable[np.ndarray], channels: Union[CHO, np.ndarray],
+                              template: np.ndarray, remove_dc: bool = True) -> np.ndarray:
+    """Applies a channel-space Hotelling template to a stream of image chunks.
+
+    Args:
+        chunks: Iterable of image chunks (n, Y, X).
+        channels: A CHO observer or a channel matrix (Y * X, nch).
+        template: Channel-space template (nch,).
+        remove_dc: Subtract the mean of every image.
+
+    Returns:
+        np.ndarray: One decision variable per image.
+    """
+    t = [_channelize_chunk(chunk, channels, remove_dc) @ template for chunk in chunks]
+    return np.concatenate(t) if t else np.empty(0)
+
+
+def stream_cho_metrics(channels: Union[CHO, np.ndarray],
+                       train_sa: Iterable[np.ndarray], train_sp: Iterable[np.ndarray],
+                       test_sa: Iterable[np.ndarray], test_sp: Iterable[np.ndarray],
+                       remove_dc: bool = True) -> Dict[str, float]:
+    """Trains and tests a CHO from streams of image chunks.
+
+    Gives the same result as `CHO.calculate_metrics` on the concatenated stacks while holding
+    only one chunk at a time.
+
+    Args:
+        channels: A CHO observer (e.g. `LG_CHO`) or a channel matrix (Y * X, nch),
+            e.g. from `get_channel_bank`.
+        train_sa: Training signal-absent chunks.
+        train_sp: Training signal-present chunks.
+        test_sa: Testing signal-absent chunks.
+        test_sp: Testing signal-present chunks.
+        remove_dc: Subtract the mean of every image.
+
+    Returns:
+        Dict[str, float]: AUC and SNR.
+    """
+    sa = accumulate_channel_stats(train_sa, channels, remove_dc)
+    sp = accumulate_channel_stats(train_sp, channels, remove_dc)
+    w_ch = hotelling_template(sa.mean[None], sp.mean[None], sa.cov[None], sp.cov[None])[0]
+
+    t_sa = stream_decision_variables(test_sa, channels, w_ch, remove_dc)
+    t_sp = stream_decision_variables(test_sp, channels, w_ch, remove_dc)
+    return auc_snr(t_sa, t_sp)
+
+
+def stream_channel_outputs(images: np.ndarray, layout: PhantomLayout, observers: Sequence[Sequence[CHO]],
+                           chunk_size: int = 64, nx: Optional[int] = None,
+                           dtype: Optional[Union[str, np.dtype]] = None) -> List[List[np.ndarray]]:
+    """Channelizes the ROIs of every insert, reading the image stack chunk by chunk.
+
+    With a lazily loaded `MHDStack` only `chunk_size` images are decoded at a time, and only the
+    channel outputs are kept.
+
+    Args:
+        images: Image stack (N, Y, X) or slabs (N, Z, Y, X).
+        layout: Inserts whose ROIs are extracted, see `PhantomLayout.extract_rois`.
+        observers: Channelized observers of every insert, `observers[i]` for `layout.inserts[i]`.
+        chunk_size: Number of images read at a time.
+        nx: ROI width, see `PhantomLayout.extract_rois`.
+        dtype: Compute precision of the ROIs.
+
+    Returns:
+        List[List[np.ndarray]]: Channel outputs (N, nch) of insert i for observer j at [i][j].
+    """
+    outputs = [[[] for _ in insert_observers] for insert_observers in observers]
+    for start in range(0, len(images), chunk_size):
+        with stage('extract_rois'):
+            rois = layout.extract_rois(np.asarray(images[start:start + chunk_size]), nx=nx, dtype=dtype)
+        for i, insert_observers in enumerate(observers):
+            for j, obs in enumerate(insert_observers):
+                outputs[i][j].append(np.asarray(obs.channelize(rois[i])))
+    return [[np.concatenate(v) for v in insert_outputs] for insert_outputs in outputs]
+
+
+def stream_run_study(observer: CHO, v_sa: np.ndarray, v_sp: np.ndarray, n_readers: int = 10,
+                     pct_split: float = 0.5, seed: Optional[Union[int, List[int]]] = None,
+                     resampling: str = 'split') -> pd.DataFrame:
+    """Runs the reader study of a CHO from precomputed channel outputs.
+
+    Gives the same result as `observer.run_study` on the images the outputs were computed from.
+
+    Args:
+        observer: The CHO, used for its name only.
+        v_sa: Signal-absent channel outputs (N, nch), e.g. from `stream_channel_outputs`.
+        v_sp: Signal-present channel outputs (N, nch).
+        n_readers: Number of random splits (readers).
+        pct_split: Percentage of data used for training.
+        seed: Seed of the readers' seeds, as in `Observer.run_study`.
+        resampling: 'split' or 'bootstrap', see `Observer.run_study`.
+
+    Returns:
+        pd.DataFrame: Results with cols 'auc', 'snr', 'observer', 'reader'.
+
+    Raises:
+        ValueError: If the resampling mode is unknown.
+    """
+    if resampling not in RESAMPLING_MODES:
+        raise ValueError(f"Unknown resampling mode: {resampling}")
+    seeds = np.random.default_rng(seed=seed).integers(0, 100000, size=n_readers)
+    metrics = channel_reader_metrics(v_sa, v_sp, pct_split, seeds, resampling)
+    return pd.DataFrame({'auc': metrics['auc'],
+                         'snr': metrics['snr'],
+                         'observer': type(observer).__name__,
+                         'reader': np.arange(n_readers)})
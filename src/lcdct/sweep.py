@@ -0,0 +1,246 @@
+"""
+Dose x recon LCD sweeps.
+
+Discovers the `<recon>/dose_<N>/signal_{present,absent}` dataset layout and runs `measure_LCD`
+on every (recon, dose) pair, optionally on a worker pool, streaming results as jobs finish.
+"""
+from concurrent.futures import Executor, FIRST_COMPLETED, wait
+from pathlib import Path
+import argparse
+import sys
+import numpy as np
+import pandas as pd
+from typing import Union, List, Optional, Any, Iterator, Dict, NamedTuple
+
+from .LCD import measure_LCD
+from .cache import ResultCache, as_result_cache
+from .dataserver import DatasetClient, DatasetHandle, DatasetRegistry
+from .parallel import check_executor, get_executor, resolve_n_jobs
+from .layout import PhantomLayout
+from .store import ResultStore
+from .utils import load_dataset, read_mhd
+
+
+class SweepJob(NamedTuple):
+    """One (recon, dose) dataset of a sweep."""
+    recon: str
+    dose_level: int
+    path: Path
+
+
+def discover_sweep(base_directory: Union[str, Path], recon_names: Optional[List[str]] = None) -> List[SweepJob]:
+    """Finds every (recon, dose) dataset below a base directory.
+
+    Args:
+        base_directory: Directory containing one subdirectory per recon.
+        recon_names: Recons to include. Default: every subdirectory holding `dose_*` datasets.
+
+    Returns:
+        List[SweepJob]: Jobs sorted by recon (in `recon_names` order) and dose level.
+
+    Raises:
+        FileNotFoundError: If the base directory or a requested recon is missing.
+    """
+    base = Path(base_directory)
+    if not base.is_dir():
+        raise FileNotFoundError(f"Sweep directory not found: {base}")
+    if recon_names is None:
+        recon_names = sorted(d.name for d in base.iterdir() if d.is_dir() and any(d.glob('dose_*')))
+
+    jobs = []
+    for recon in recon_names:
+        recon_dir = base / recon
+        if not recon_dir.is_dir():
+            raise FileNotFoundError(f"Recon directory not found: {recon_dir}")
+        recon_jobs = []
+        for d_path in recon_dir.glob('dose_*'):
+            try:
+                dose_val = int(d_path.name.split('_')[1])
+            except (IndexError, ValueError):
+                continue
+            if (d_path / 'signal_present').is_dir() and (d_path / 'signal_absent').is_dir():
+                recon_jobs.append(SweepJob(recon, dose_val, d_path))
+        jobs.extend(sorted(recon_jobs, key=lambda j: j.dose_level))
+    return jobs
+
+
+def _load_ground_truth(ground_truth: Union[np.ndarray, str, Path], offset: float) -> np.ndarray:
+    if isinstance(ground_truth, (str, Path)):
+        return read_mhd(str(ground_truth)).astype(np.float32) - offset
+    return ground_truth
+
+
+def run_sweep_job(job: SweepJob, ground_truth: Union[np.ndarray, PhantomLayout], offset: float = 1000,
+                  dataset: Optional[DatasetHandle] = None, **measure_kwargs: Any) -> pd.DataFrame:
+    """Loads one (recon, dose) dataset and measures its LCD.
+
+    Args:
+        job: Dataset to evaluate.
+        ground_truth: Ground truth image (offset already removed) or its `PhantomLayout`.
+        offset: Value subtracted from the images.
+        dataset: Shared memory handle to the job's dataset, used instead of loading it.
+        **measure_kwargs: Passed to `measure_LCD`.
+
+    Returns:
+        pd.DataFrame: `measure_LCD` results with 'recon' and 'dose_level' columns.
+    """
+    if dataset is not None:
+        sp, sa = dataset.signal_present, dataset.signal_absent
+    else:
+        sp, sa = load_dataset(job.path, offset=offset, lazy=True)
+    res = measure_LCD(sp, sa, ground_truth, **measure_kwargs)
+    res['recon'] = job.recon
+    res['dose_level'] = job.dose_level
+    return res
+
+
+def run_sweep(base_directory: Union[str, Path], ground_truth: Optional[Union[np.ndarray, str, Path]] = None,
+              recon_names: Optional[List[str]] = None, observers: Optional[List[Union[str, Any]]] = None,
+              n_reader: int = 10, pct_split: float = 0.5, seed_split: Optional[Union[List[int], np.ndarray]] = None,
+              offset: float = 1000, n_jobs: Optional[int] = 1, executor: Union[str, Executor] = 'process',
+              max_in_flight: Optional[int] = None, cache: Optional[Union[str, Path, ResultCache]] = None,
+              store: Optional[Union[str, Path, ResultStore]] = None,
+              datasets: Optional[Union[DatasetRegistry, DatasetClient]] = None) -> Iterator[pd.DataFrame]:
+    """Runs `measure_LCD` on every (recon, dose) dataset, yielding results as each job finishes.
+
+    Each job loads its own dataset lazily, so at most `max_in_flight` datasets are held in
+    memory at once. With `datasets`, jobs use the shared copies of a dataset registry instead.
+
+    Args:
+        base_directory: Directory with the `<recon>/dose_<N>/signal_{present,absent}` layout.
+        ground_truth: Ground truth MHD path (offset is subtracted) or image (used as is) shared by
+            all recons. Default: each recon's `ground_truth.mhd`.
+        recon_names: Recons to include. Default: all discovered recons.
+        observers: Observers passed to `measure_LCD`.
+        n_reader: Number of readers.
+        pct_split: Train/test split ratio.
+        seed_split: Seed passed to `measure_LCD`.
+        offset: Value subtracted from images (and from ground truth files).
+        n_jobs: Number of (recon, dose) jobs run concurrently; -1 uses all cores.
+        executor: 'process', 'thread', or an existing `concurrent.futures.Executor`.
+        max_in_flight: Maximum number of submitted but unfinished jobs. Default: `n_jobs`.
+        cache: Optional `ResultCache` or cache directory passed to `measure_LCD`, so rerunning a
+            sweep only computes the (recon, dose) datasets whose inputs changed.
+        store: Optional `ResultStore` or store directory. The results of every job are appended
+            as soon as it finishes, before they are yielded, so an interrupted sweep keeps the
+            finished jobs.
+        datasets: Optional `lcdct.dataserver` registry or daemon client. Every job acquires its
+            dataset from it (loading it once for all sweeps sharing the registry) and releases
+            it when done.
+
+    Yields:
+        pd.DataFrame: Results of one (recon, dose) job, with 'recon' and 'dose_level' columns.
+
+    Raises:
+        FileNotFoundError: If a recon has no ground truth and none is given.
+    """
+    check_executor(executor)
+    jobs = discover_sweep(base_directory, recon_names)
+    if store is not None and not isinstance(store, ResultStore):
+        store = ResultStore(store)
+
+    # inserts are labeled once per ground truth and shared by every dose of a recon
+    shared_truth = None if ground_truth is None else PhantomLayout.from_ground_truth(_load_ground_truth(ground_truth, offset))
+    truths: Dict[str, PhantomLayout] = {}
+    for recon in dict.fromkeys(j.recon for j in jobs):
+        if shared_truth is not None:
+            truths[recon] = shared_truth
+            continue
+        gt_file = Path(base_directory) / recon / 'ground_truth.mhd'
+        if not gt_file.exists():
+            raise FileNotFoundError(f"Ground truth not found at {gt_file}")
+        truths[recon] = PhantomLayout.from_ground_truth(_load_ground_truth(gt_file, offset))
+
+    measure_kwargs = dict(observers=observers, n_reader=n_reader, pct_split=pct_split, seed_split=seed_split,
+                          cache=as_result_cache(cache))
+
+    if resolve_n_jobs(n_jobs) == 1 and not isinstance(executor, Executor):
+        for job in jobs:
+            handle = None if datasets is None else datasets.acquire(job.path, offset)
+            try:
+                res = run_sweep_job(job, truths[job.recon], offset, handle, **measure_kwargs)
+            finally:
+                if handle is not None:
+                    handle.release()
+            if store is not None:
+                store.append(res)
+            yield res
+        return
+
+    max_in_flight = max_in_flight or resolve_n_jobs(n_jobs)
+    pending = iter(jobs)
+    # handles are acquired here and travel to the workers, which map the shared blocks
+    handles: Dict[Any, Optional[DatasetHandle]] = {}
+    with get_executor(n_jobs, executor) as pool:
+        in_flight = set()
+        try:
+            while True:
+                for job in pending:
+                    handle = None if datasets is None else datasets.acquire(job.path, offset)
+                    future = pool.submit(run_sweep_job, job, truths[job.recon], offset, handle, **measure_kwargs)
+                    handles[future] = handle
+                    in_flight.add(future)
+                    if len(in_flight) >= max_in_flight:
+                        break
+                if not in_flight:
+                    break
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    handle = handles.pop(future)
+                    if handle is not None:
+                        handle.release()
+                    res = future.result()
+                    if store is not None:
+                        store.append(res)
+                    yield res
+        finally:
+            for handle in handles.values():
+                if handle is not None:
+                    handle.release()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Command line entry point: `lcdct-sweep BASE_DIRECTORY [options]`."""
+    parser = argparse.ArgumentParser(description="Run an LCD dose x recon sweep over <recon>/dose_<N> datasets.")
+    parser.add_argument('base_directory', help="directory containing one subdirectory per recon")
+    parser.add_argument('--recons', nargs='+', default=None, help="recons to include (default: all)")
+    parser.add_argument('--ground-truth', default=None, help="ground truth MHD shared by all recons")
+    parser.add_argument('--observers', nargs='+', default=['LG_CHO_2D'], help="observer names")
+    parser.add_argument('--n-reader', type=int, default=10, help="number of readers")
+    parser.add_argument('--pct-split', type=float, default=0.5, help="train/test split ratio")
+    parser.add_argument('--seed', type=int, default=None, help="split seed")
+    parser.add_argument('--offset', type=float, default=1000, help="value subtracted from images")
+    parser.add_argument('--n-jobs', type=int, default=1, help="concurrent (recon, dose) jobs, -1 for all cores")
+    parser.add_argument('--max-in-flight', type=int, default=None, help="maximum datasets in memory")
+    parser.add_argument('--cache-dir', default=None, help="directory of cached results (requires --seed)")
+    parser.add_argument('--output', '-o', default='lcd_sweep_results.csv', help="CSV file the results are written to as each job finishes")
+    parser.add_argument('--overwrite', action='store_true', help="replace an existing output file")
+    parser.add_argument('--store', default=None,
+                        help="partitioned results store directory the results are also appended to")
+    parser.add_argument('--dataserver', default=None, metavar='HOST:PORT',
+                        help="use the shared datasets of a running lcdct-dataserver")
+    parser.add_argument('--authkey-file', default=None, help="authkey file of the lcdct-dataserver")
+    args = parser.parse_args(argv)
+
+    output = Path(args.output)
+    if output.exists():
+        if not args.overwrite:
+            parser.error(f"{output} exists; pass --overwrite to replace it")
+        output.unlink()
+    datasets = None
+    if args.dataserver is not None:
+        host, port = args.dataserver.rsplit(':', 1)
+        datasets = DatasetClient((host, int(port)), authkey_file=args.authkey_file)
+    for res in run_sweep(args.base_directory, ground_truth=args.ground_truth, recon_names=args.recons,
+                         observers=args.observers, n_reader=args.n_reader, pct_split=args.pct_split,
+                         seed_split=args.seed, offset=args.offset, n_jobs=args.n_jobs,
+                         max_in_flight=args.max_in_flight, cache=args.cache_dir, store=args.store,
+                         datasets=datasets):
+        if res.empty:
+            continue
+        res.to_csv(output, mode='a', header=not output.exists(), index=False)
+        print(f"{res['recon'].iloc[0]} dose {res['dose_level'].iloc[0]}: mean AUC {res['auc'].mean():.3f}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,12 +1,15 @@
 from pathlib import Path
+import json
 import numpy as np
 import SimpleITK as sitk
 from skimage.measure import label, regionprops
-from skimage.transform import hough_circle, hough_circle_peaks
+from skimage.transform import hough_circle
 from skimage.feature import canny
 from skimage.draw import disk
-from scipy.ndimage import median_filter
-from typing import Tuple, Union, Optional
+from scipy.ndimage import find_objects, maximum_filter, median_filter, uniform_filter
+from typing import Tuple, Union, Optional, Sequence, List
+
+from .mhd import MHDStack
 
 def read_mhd(filename: Union[str, Path]) -> np.ndarray:
     """
@@ -85,61 +88,198 @@ def get_roi_from_truth_mask(truth_mask: np.ndarray, img: np.ndarray, nx: Optiona
     else:
         return img[y_slice, x_slice]
 
-from skimage.transform import hough_circle, hough_circle_peaks
-from skimage.feature import canny
-from skimage.draw import disk
 import pandas as pd
 
-def find_insert_centers(image: np.ndarray, smoothing_window_size: int = 11, search_range: Tuple[int, int] = (7, 22)) -> np.ndarray:
+# insert HU values of the CCT189 (MITA LCD) phantom
+DEMO_INSERT_HUS = (14, 7, 5, 3)
+
+
+def _parabolic_peak(values: np.ndarray, index: Tuple[int, ...]) -> np.ndarray:
+    """Sub-pixel position of a maximum from a parabola through it and its neighbors along each axis."""
+    position = np.asarray(index, dtype=float)
+    for axis, i in enumerate(index):
+        if 0 < i < values.shape[axis] - 1:
+            lo, hi = list(index), list(index)
+            lo[axis] -= 1
+            hi[axis] += 1
+            a, b, c = values[tuple(lo)], values[tuple(index)], values[tuple(hi)]
+            curvature = a - 2 * b + c
+            if curvature < 0:
+                position[axis] += np.clip(0.5 * (a - c) / curvature, -0.5, 0.5)
+    return position
+
+
+def _coarse_insert_candidates(image: np.ndarray, radii: np.ndarray, n_inserts: int,
+                              factor: int) -> List[Tuple[float, float, float]]:
+    """Locates bright disks with a center-surround box filter on a block-averaged image.
+
+    For every radius the image is filtered with a box of the disk's area minus a box three times
+    wider, scaled by the box width so responses of different sizes compare as signal-to-noise
+    ratios. The strongest local maxima whose disks lie inside the image and do not overlap are
+    kept.
+
+    Returns:
+        List[Tuple[float, float, float]]: Up to `n_inserts` (row, col, radius) in full resolution
+            pixels, strongest first.
+    """
+    ny, nx = (s // factor * factor for s in image.shape)
+    small = image[:ny, :nx].reshape(ny // factor, factor, nx // factor, factor).mean(axis=(1, 3))
+
+    # odd box widths with the area of the disks, and the mean radius mapped to each width
+    widths = 2 * (radii * np.sqrt(np.pi) / (2 * factor)).astype(int) + 1
+    sizes = np.unique(widths)
+    size_radii = np.array([radii[widths == s].mean() for s in sizes])
+    responses = np.stack([(uniform_filter(small, s) - uniform_filter(small, 3 * s)) * s for s in sizes])
+    best = responses.max(axis=0)
+    best_size = responses.argmax(axis=0)
+
+    peaks = np.argwhere((best == maximum_filter(best, size=3)) & (best > 0))
+    peaks = peaks[np.argsort(-best[tuple(peaks.T)], kind='stable')]
+    candidates: List[Tuple[float, float, float]] = []
+    for peak in peaks:
+        peak = tuple(peak)
+        radius = size_radii[best_size[peak]]
+        cy, cx = (_parabolic_peak(best, peak) + 0.5) * factor - 0.5
+        inside = radius <= cy <= image.shape[0] - 1 - radius and radius <= cx <= image.shape[1] - 1 - radius
+        if inside and all(np.hypot(cy - y, cx - x) > radius + r for y, x, r in candidates):
+            candidates.append((cy, cx, radius))
+            if len(candidates) == n_inserts:
+                break
+    return candidates
+
+
+def _refine_insert(image: np.ndarray, candidate: Tuple[float, float, float], radii: np.ndarray,
+                   smoothing_window_size: int, sigma: float = 3,
+                   min_score: float = 0.3) -> Tuple[float, float, float]:
+    """Fits a circle around a coarse candidate with a Hough transform of a local crop.
+
+    The crop is median filtered, edge detected and searched for circles centered within half the
+    candidate's radius and with radii within a factor 1.5 of it; the accumulator maximum is
+    refined to sub-pixel (row, col, radius). If
+    less than `min_score` of the best circle is covered by edges (too noisy), the candidate is
+    returned unchanged.
+    """
+    cy, cx, r0 = candidate
+    radii = radii[(radii >= r0 / 1.5) & (radii <= r0 * 1.5)]
+    w = max(int(smoothing_window_size), 1)
+    edge_margin = int(np.ceil(3 * sigma)) + 1
+    half = int(radii[-1]) + edge_margin + 1
+    outer = half + w // 2
+    y0, x0 = max(int(round(cy)) - outer, 0), max(int(round(cx)) - outer, 0)
+    crop = image[y0:int(round(cy)) + outer + 1, x0:int(round(cx)) + outer + 1]
+    smooth = median_filter(crop, size=w) if w > 1 else crop
+    lo, hi = smooth.min(), smooth.max()
+    if hi <= lo:
+        return candidate
+    edges = canny((smooth - lo) / (hi - lo), sigma=sigma)
+    # edges along the crop border come from the cut, not from the insert
+    edges[:edge_margin] = edges[-edge_margin:] = False
+    edges[:, :edge_margin] = edges[:, -edge_margin:] = False
+
+    accumulator = hough_circle(edges, radii)
+    yy, xx = np.ogrid[:crop.shape[0], :crop.shape[1]]
+    accumulator[:, np.hypot(yy + y0 - cy, xx + x0 - cx) > r0 / 2] = 0
+    peak = np.unravel_index(np.argmax(accumulator), accumulator.shape)
+    if accumulator[peak] < min_score:
+        return candidate
+    ri, y, x = _parabolic_peak(accumulator, peak)
+    # canny marks the outermost pixels of the insert, half a pixel inside its boundary
+    radius = np.interp(ri, np.arange(len(radii)), radii) + 0.5
+    return y + y0, x + x0, radius
+
+
+def detect_inserts(image: np.ndarray, smoothing_window_size: int = 11, search_range: Tuple[int, int] = (7, 22),
+                   n_inserts: int = len(DEMO_INSERT_HUS)) -> List[Tuple[float, float, float]]:
+    """Locates circular inserts in a low noise signal image (e.g. the mean of signal present minus
+    signal absent repeat scans).
+
+    A center-surround filter on a block-averaged copy of the image finds one coarse candidate per
+    insert; a Hough circle transform then only runs on median filtered crops around the
+    candidates, and its maximum is refined to sub-pixel precision.
+
+    Args:
+        image: 2D image with bright inserts on a flat background.
+        smoothing_window_size: Median filter width applied before edge detection. Larger values
+            help in noisy images but blur inserts smaller than the window.
+        search_range: (min_radius, max_radius) of the inserts in pixels.
+        n_inserts: Number of inserts to locate.
+
+    Returns:
+        List[Tuple[float, float, float]]: (row, col, radius) of the inserts found, sorted by radius.
+    """
+    image = np.asarray(image, dtype=np.float64)
+    radii = np.arange(search_range[0], search_range[1] + 1)
+    factor = max(int(search_range[0]) // 2, 1)
+    candidates = _coarse_insert_candidates(image, radii, n_inserts, factor)
+    sigma = float(np.clip(search_range[0] / 2, 1, 3))
+    circles = [_refine_insert(image, c, radii, smoothing_window_size, sigma=sigma) for c in candidates]
+    return sorted(circles, key=lambda c: c[2])
+
+
+def find_insert_centers(image: np.ndarray, smoothing_window_size: int = 11, search_range: Tuple[int, int] = (7, 22),
+                        hus: Optional[Sequence[float]] = None) -> np.ndarray:
     """Finds circular inserts in the image and creates a ground truth mask.
 
     Args:
-        image: 2D numpy array (signal present image).
-        smoothing_window_size: Size of smoothing window (unused in current implementation).
+        image: 2D numpy array (mean signal present minus signal absent image).
+        smoothing_window_size: Median filter width applied before edge detection.
         search_range: Tuple of (min_radius, max_radius) for circle detection.
+        hus: Insert HU values, assigned to the detected circles from the smallest to the largest.
+            Default: `DEMO_INSERT_HUS` (14, 7, 5, 3).
 
     Returns:
         np.ndarray: Mask with assigned HU values for detected inserts.
     """
-    # Normalize image for processing
-    img_norm = (image - image.min()) / (image.max() - image.min())
-    
-    # Edge detection
-    edges = canny(img_norm, sigma=3)
-    
-    # Hough circle transform
-    hough_radii = np.arange(search_range[0], search_range[1], 2) # check every 2 pixels
-    hough_res = hough_circle(edges, hough_radii)
-    
-    # Select the most prominent circles
-    # We expect 4 inserts usually.
-    accums, cx, cy, radii = hough_circle_peaks(hough_res, hough_radii, total_num_peaks=4, min_xdistance=20, min_ydistance=20)
-    
-    # Create mask
-    mask = np.zeros_like(image, dtype=np.float32)
-    
-    # Known HU values sorted by radius size (smallest to largest)
-    known_HUs = [14, 7, 5, 3] 
-    
-    # Sort found circles by radius
-    circles = sorted(zip(cx, cy, radii), key=lambda x: x[2])
-    
-    # Use as many HUs as we have circles, or trunc
-    current_HUs = known_HUs[:len(circles)]
-    
-    for (cx_i, cy_i, r_i), hu in zip(circles, current_HUs):
-        rr, cc = disk((cy_i, cx_i), r_i, shape=image.shape)
+    hus = DEMO_INSERT_HUS if hus is None else hus
+    circles = detect_inserts(image, smoothing_window_size, search_range, n_inserts=len(hus))
+    return _draw_inserts(np.shape(image), circles, hus)
+
+
+def _draw_inserts(shape: Tuple[int, ...], circles: Sequence[Sequence[float]], hus: Sequence[float]) -> np.ndarray:
+    mask = np.zeros(shape, dtype=np.float32)
+    for (cy, cx, r), hu in zip(circles, hus):
+        rr, cc = disk((cy, cx), r, shape=shape)
         mask[rr, cc] = hu
-        
     return mask
 
-def approximate_groundtruth(base_directory: Union[str, Path], ground_truth_filename: str = 'ground_truth.mhd', offset: int = 1000) -> np.ndarray:
+
+def _mean_image(images: np.ndarray, chunk_size: int) -> np.ndarray:
+    """Mean over the first axis, accumulated chunk by chunk (lazy stacks are decoded per chunk)."""
+    total = np.zeros(images.shape[1:], dtype=np.float64)
+    for start in range(0, len(images), chunk_size):
+        total += np.asarray(images[start:start + chunk_size]).sum(axis=0, dtype=np.float64)
+    return total / len(images)
+
+
+def _file_stats(directory: Path) -> List[List[Union[str, int]]]:
+    return [[f.name, f.stat().st_size, f.stat().st_mtime_ns] for f in sorted(directory.iterdir()) if f.is_file()]
+
+
+def approximate_groundtruth(base_directory: Union[str, Path], ground_truth_filename: str = 'ground_truth.mhd',
+                            offset: int = 1000, smoothing_window_size: int = 11,
+                            search_range: Tuple[int, int] = (7, 22), hus: Optional[Sequence[float]] = None,
+                            cache: bool = True, chunk_size: int = 64) -> np.ndarray:
     """Estimates ground truth from repeat scans.
 
+    The signal present and signal absent stacks of `base_directory/dose_100` are averaged chunk by
+    chunk from memory-mapped files, and the inserts of their difference are located with
+    `detect_inserts`.
+
+    With `cache`, the estimate is written to `ground_truth_filename` (relative to
+    `base_directory`, with `offset` added as in the MATLAB toolbox) together with a
+    `<name>.json` sidecar recording the circles, the parameters and the sizes and modification
+    times of the source files. Later calls return the saved estimate while the sidecar matches.
+    An existing ground truth without sidecar is never overwritten.
+
     Args:
-        base_directory: Base directory containing 'signal_present' and 'signal_absent' subdirectories.
-        ground_truth_filename: Filename of the ground truth file (unused in logic, refers to source structure).
+        base_directory: Base directory containing 'dose_100/signal_present' and 'dose_100/signal_absent'.
+        ground_truth_filename: Filename of the estimated ground truth written with `cache`.
         offset: HU offset to subtract.
+        smoothing_window_size: Median filter width, see `detect_inserts`.
+        search_range: (min_radius, max_radius) of the inserts in pixels.
+        hus: Insert HU values from the smallest to the largest insert. Default: `DEMO_INSERT_HUS`.
+        cache: Reuse and save the estimate next to the dataset.
+        chunk_size: Number of images decoded at a time.
 
     Returns:
         np.ndarray: Estimated ground truth mask.
@@ -147,44 +287,119 @@ def approximate_groundtruth(base_directory: Union[str, Path], ground_truth_filen
     base_dir = Path(base_directory)
     sp_dir = base_dir / 'dose_100' / 'signal_present'
     sa_dir = base_dir / 'dose_100' / 'signal_absent'
-    
-    sp_path = sp_dir / 'signal_present.mhd'
-    sa_path = sa_dir / 'signal_absent.mhd'
-    
-    # Read images
-    sp_img = read_mhd(sp_path).astype(np.float32) - offset
-    sa_img = read_mhd(sa_path).astype(np.float32) - offset
-    
-    low_noise_signal = np.mean(sp_img, axis=0) - np.mean(sa_img, axis=0)
-    
-    return find_insert_centers(low_noise_signal)
+    hus = DEMO_INSERT_HUS if hus is None else hus
+
+    gt_path = base_dir / ground_truth_filename
+    sidecar = gt_path.with_suffix('.json')
+    key = {'offset': offset, 'smoothing_window_size': smoothing_window_size,
+           'search_range': [int(r) for r in search_range], 'hus': [float(h) for h in hus],
+           'signal_present': _file_stats(sp_dir), 'signal_absent': _file_stats(sa_dir)}
+    if cache and gt_path.exists() and sidecar.exists():
+        with open(sidecar) as f:
+            saved = json.load(f)
+        if saved.get('key') == key:
+            return read_mhd(gt_path).astype(np.float32) - offset
+
+    sp, sa = load_dataset(base_dir / 'dose_100', offset=offset, lazy=True)
+    low_noise_signal = _mean_image(sp, chunk_size) - _mean_image(sa, chunk_size)
+    circles = detect_inserts(low_noise_signal, smoothing_window_size, search_range, n_inserts=len(hus))
+    ground_truth = _draw_inserts(low_noise_signal.shape, circles, hus)
 
-def get_demo_truth_masks(xtrue: np.ndarray, tol: int = 1) -> np.ndarray:
+    if cache and (sidecar.exists() or not gt_path.exists()):
+        try:
+            write_mhd(gt_path, ground_truth + offset)
+            with open(sidecar, 'w') as f:
+                json.dump({'key': key, 'circles': [{'row': y, 'col': x, 'radius': r, 'HU': hu}
+                                                   for (y, x, r), hu in zip(circles, hus)]}, f, indent=1)
+        except OSError:
+            pass  # read-only dataset
+    return ground_truth
+
+
+
+def _majority_filter(labels: np.ndarray) -> np.ndarray:
+    """3x3 (3^ndim) majority filter of a label image.
+
+    A pixel keeps label k if more than half of its neighborhood has label k, which equals a
+    separate 3x3 median filter of every binary mask ``labels == k`` (scipy 'reflect' borders).
+    Only pixels inside the bounding box of label k can hold a k majority, so the neighborhood
+    counts of every label are box sums over its bounding box (plus a one pixel margin): memory
+    and time scale with the insert volumes, not with the image or the number of labels.
+    """
+    n_neighbors = 3 ** labels.ndim
+    out = np.zeros_like(labels)
+    for k, box in enumerate(find_objects(labels), start=1):
+        if box is None:
+            continue
+        # the box grown by the neighborhood margin, mirrored where it meets the image border
+        grown = tuple(slice(max(sl.start - 1, 0), min(sl.stop + 1, n)) for sl, n in zip(box, labels.shape))
+        counts = np.pad(labels[grown] == k, 1, mode='symmetric').astype(np.uint8)
+        for axis in range(labels.ndim):
+            n = counts.shape[axis]
+            counts = counts.take(range(0, n - 2), axis) + counts.take(range(1, n - 1), axis) + counts.take(range(2, n), axis)
+        inner = tuple(slice(sl.start - g.start, sl.stop - g.start) for sl, g in zip(box, grown))
+        out[box][counts[inner] > n_neighbors // 2] = k
+    return out
+
+
+def get_truth_labels(xtrue: np.ndarray, hus: Optional[Sequence[float]] = None,
+                     tol: float = 1) -> Tuple[np.ndarray, List[Optional[Tuple[slice, ...]]]]:
+    """Labels the inserts of a ground truth image in one pass.
+
+    Every pixel gets the (1-based) index of the nearest insert HU value within `tol`, or 0; the
+    label image is then cleaned with one 3x3 majority filter (the median filter of the MATLAB
+    `get_demo_truth_masks`, applied to all inserts together).
+
+    Args:
+        xtrue: Ground truth image (Y, X) or volume (Z, Y, X).
+        hus: Insert HU values. Default: `DEMO_INSERT_HUS`, the CCT189 inserts.
+        tol: Tolerance for HU value matching.
+
+    Returns:
+        Tuple[np.ndarray, List[Optional[Tuple[slice, ...]]]]: Label image (same shape as `xtrue`,
+            label i + 1 is insert `hus[i]`) and the bounding box slices of every insert (None
+            for inserts that are not present).
+    """
+    hus = np.asarray(DEMO_INSERT_HUS if hus is None else hus, dtype=np.float64)
+    xtrue = np.asarray(xtrue)
+    dtype = np.min_scalar_type(len(hus))
+    labels = np.zeros(xtrue.shape, dtype=dtype)
+    if len(hus):
+        # nearest insert HU of the pixels in range of any insert, by binary search in the sorted values
+        order = np.argsort(hus, kind='stable')
+        sorted_hus = hus[order]
+        x = xtrue.ravel()
+        cand = np.flatnonzero((x > sorted_hus[0] - tol) & (x < sorted_hus[-1] + tol))
+        xc = x[cand]
+        right = np.clip(np.searchsorted(sorted_hus, xc), 0, len(hus) - 1)
+        left = np.clip(right - 1, 0, len(hus) - 1)
+        idx = np.where(np.abs(xc - sorted_hus[left]) <= np.abs(sorted_hus[right] - xc), left, right)
+        within = np.abs(xc - sorted_hus[idx]) < tol
+        labels.ravel()[cand[within]] = order[idx[within]] + 1
+        labels = _majority_filter(labels)
+    boxes = find_objects(labels, max_label=len(hus))
+    return labels, boxes
+
+
+def get_demo_truth_masks(xtrue: np.ndarray, tol: int = 1, hus: Optional[Sequence[float]] = None) -> np.ndarray:
     """Generates truth masks for known HU values [14, 7, 5, 3].
 
+    Dense wrapper of `get_truth_labels`; prefer the label image and bounding boxes for large or
+    3-D ground truths.
+
     Args:
         xtrue: Ground truth image.
         tol: Tolerance for HU value matching.
+        hus: Insert HU values. Default: `DEMO_INSERT_HUS`.
 
     Returns:
         np.ndarray: Stacked boolean masks (Y, X, N_inserts).
     """
-    roi_HUs = [14, 7, 5, 3]
-    truth_masks = []
-    
-    for hu in roi_HUs:
-        # abs diff < tol
-        mask = np.abs(xtrue - hu) < tol
-        # Median filter to clean up (parroting MATLAB medfilt2 default kernel 3x3)
-        mask = median_filter(mask, size=3)
-        truth_masks.append(mask)
-        
-    if not truth_masks:
-        return np.zeros(xtrue.shape + (0,), dtype=bool)
-        
-    return np.stack(truth_masks, axis=-1)
+    labels, _ = get_truth_labels(xtrue, hus=hus, tol=tol)
+    n_inserts = len(DEMO_INSERT_HUS if hus is None else hus)
+    return labels[..., None] == np.arange(1, n_inserts + 1, dtype=labels.dtype)
 
-def load_dataset(base_dir: Union[str, Path], offset: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+def load_dataset(base_dir: Union[str, Path], offset: int = 0, lazy: bool = False) -> Tuple[np.ndarray, np.ndarray]:
     """Loads signal present and signal absent images from a directory.
 
     Expected structure:
@@ -194,6 +409,9 @@ def load_dataset(base_dir: Union[str, Path], offset: int = 0) -> Tuple[np.ndarra
     Args:
         base_dir: Path to the dataset directory.
         offset: Value to subtract from image data (e.g. 1000).
+        lazy: If True, MHD series are returned as memory-mapped `MHDStack` views that only
+            decode (and subtract the offset from) the pixels that are indexed, e.g. ROI crops.
+            Datasets without an uncompressed MHD header are loaded eagerly.
 
     Returns:
         Tuple[np.ndarray, np.ndarray]: Tuple of (signal_present_array, signal_absent_array).
@@ -209,16 +427,29 @@ def load_dataset(base_dir: Union[str, Path], offset: int = 0) -> Tuple[np.ndarra
     if not sp_dir.exists() or not sa_dir.exists():
         raise FileNotFoundError(f"Directory structure not found in {base_dir}")
         
-    def load_imgs(d, name_hint):
+    def find_mhd(d, name_hint):
         # Try mhd first
         mhd_file = d / f"{name_hint}.mhd"
         if mhd_file.exists():
-            return read_mhd(mhd_file)
-        
+            return mhd_file
+
         # Try finding *any* mhd
-        mhds = list(d.glob("*.mhd"))
-        if mhds:
-            return read_mhd(mhds[0])
+        mhds = sorted(d.glob("*.mhd"))
+        return mhds[0] if mhds else None
+
+    def load_lazy(d, name_hint):
+        mhd_file = find_mhd(d, name_hint)
+        if mhd_file is not None:
+            try:
+                return MHDStack(mhd_file, offset=offset)
+            except ValueError:
+                pass
+        return load_imgs(d, name_hint).astype(np.float32) - offset
+
+    def load_imgs(d, name_hint):
+        mhd_file = find_mhd(d, name_hint)
+        if mhd_file is not None:
+            return read_mhd(mhd_file)
             
         # Fallback to loading all files (sorted)
         # Assuming simple image files if no mhd
@@ -242,8 +473,12 @@ def load_dataset(base_dir: Union[str, Path], offset: int = 0) -> Tuple[np.ndarra
         # Stack
         return np.stack(imgs, axis=0).squeeze() # Adjust dims if needed
 
-    sp_arr = load_imgs(sp_dir, 'signal_present').astype(np.float32) - offset
-    sa_arr = load_imgs(sa_dir, 'signal_absent').astype(np.float32) - offset
+    if lazy:
+        sp_arr = load_lazy(sp_dir, 'signal_present')
+        sa_arr = load_lazy(sa_dir, 'signal_absent')
+    else:
+        sp_arr = load_imgs(sp_dir, 'signal_present').astype(np.float32) - offset
+        sa_arr = load_imgs(sa_dir, 'signal_absent').astype(np.float32) - offset
     
     # Ensure 3D (N, Y, X)
     if sp_arr.ndim == 2:
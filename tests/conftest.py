@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+from skimage.draw import disk
+
+
+def phantom(n=30, size=64, inserts=None, noise=10.0, seed=0, nz=None, signal_scale=1.0, shared_noise=False):
+    """Generates disk inserts in Gaussian noise.
+
+    Args:
+        n: Number of signal-present and of signal-absent images.
+        size: Image width in pixels.
+        inserts: Sequence of (HU, (row, col) center, radius) of the inserts, defaults to a single 14 HU disk of
+            radius 5 at the image center.
+        noise: Standard deviation of the noise.
+        seed: Seed of the `np.random.RandomState` drawing the noise.
+        nz: Number of slices for (n, nz, size, size) slabs, None for (n, size, size) images.
+        signal_scale: Factor applied to the ground truth before adding it to the signal-present images.
+        shared_noise: If True the signal-present images are the signal-absent images plus the inserts.
+
+    Returns:
+        (sp, sa, ground_truth)
+    """
+    if inserts is None:
+        inserts = [(14, (size // 2, size // 2), 5)]
+    rng = np.random.RandomState(seed)
+    ground_truth = np.zeros((size, size))
+    for hu, center, radius in inserts:
+        rr, cc = disk(center, radius, shape=(size, size))
+        ground_truth[rr, cc] = hu
+    shape = (n, size, size) if nz is None else (n, nz, size, size)
+    sa = rng.normal(0, noise, shape)
+    sp = sa.copy() if shared_noise else rng.normal(0, noise, shape)
+    sp += signal_scale * ground_truth
+    return sp, sa, ground_truth
+
+
+@pytest.fixture
+def make_phantom():
+    """The `phantom` generator, for tests that need several phantoms."""
+    return phantom
+
+
+@pytest.fixture
+def phantom_data(request):
+    """(sp, sa, ground_truth) from `phantom`.
+
+    The keyword arguments come from the test module's `PHANTOM` dict, updated by an indirect parametrization of
+    the fixture.
+    """
+    kwargs = dict(getattr(request.module, 'PHANTOM', {}))
+    kwargs.update(getattr(request, 'param', {}))
+    return phantom(**kwargs)
@@ -0,0 +1,60 @@
+from pathlib import Path
+import pytest
+import numpy as np
+import pandas as pd
+from lcdct.LCD import measure_LCD
+from lcdct.Observers import LG_CHO
+from lcdct.cache import ResultCache, fingerprint
+from lcdct.utils import load_dataset, read_mhd
+
+DATA_DIR = Path(__file__).parent.parent / 'data' / 'small_dataset' / 'fbp'
+
+
+def _fail(*args, **kwargs):
+    raise AssertionError("result should come from the cache")
+
+
+def test_run_study_cache(tmp_path, monkeypatch):
+    rng = np.random.default_rng(0)
+    obs = LG_CHO(rng.normal(size=(20, 15, 15)), rng.normal(size=(20, 15, 15)), channel_width=4)
+
+    first = obs.run_study(n_readers=3, seed=2, cache=tmp_path)
+    monkeypatch.setattr(LG_CHO, 'reader_metrics', _fail)
+    second = obs.run_study(n_readers=3, seed=2, cache=tmp_path)
+    pd.testing.assert_frame_equal(first, second)
+
+    # changed observer parameters miss the cache
+    obs.channel_width = 5
+    with pytest.raises(AssertionError, match="from the cache"):
+        obs.run_study(n_readers=3, seed=2, cache=tmp_path)
+
+
+def test_measure_lcd_cache_with_lazy_stacks(tmp_path, monkeypatch):
+    sp, sa = load_dataset(DATA_DIR / 'dose_100', offset=1000, lazy=True)
+    gt = read_mhd(DATA_DIR / 'ground_truth.mhd').astype(np.float32) - 1000
+    cache = ResultCache(tmp_path)
+
+    first = measure_LCD(sp, sa, gt, n_reader=2, seed_split=1, cache=cache)
+    monkeypatch.setattr(LG_CHO, 'reader_metrics', _fail)
+    second = measure_LCD(sp, sa, gt, n_reader=2, seed_split=1, cache=cache)
+    pd.testing.assert_frame_equal(first, second)
+
+
+def test_fingerprint_content():
+    a = np.arange(10.0)
+    assert fingerprint(a, 'x', 3) == fingerprint(a.copy(), 'x', 3)
+    assert fingerprint(a, 'x', 3) != fingerprint(a + 1, 'x', 3)
+    assert fingerprint(a) != fingerprint(a.astype(np.float32))
+
+
+def test_cache_eviction(tmp_path):
+    cache = ResultCache(tmp_path, max_bytes=None)
+    df = pd.DataFrame({'auc': np.linspace(0, 1, 50), 'observer': 'LG_CHO'})
+    cache.put('a', df)
+    size = (tmp_path / 'a.npz').stat().st_size
+
+    cache.max_bytes = int(2.5 * size)
+    for key in ['b', 'c']:
+        cache.put(key, df)
+    assert cache.get('a') is None
+    assert cache.get('c') is not None
@@ -0,0 +1,46 @@
+import pytest
+import numpy as np
+from lcdct.channels import ChannelCache, get_channel_bank, lg_channels, channel_cache_info, clear_channel_cache
+from lcdct.Observers import LG_CHO
+
+
+def test_channel_bank_is_cached_and_read_only():
+    clear_channel_cache()
+    ch1 = get_channel_bank('LG', (21, 21), n_channels=5, channel_width=4.0)
+    ch2 = get_channel_bank('lg', (21, 21), n_channels=5, channel_width=4.0)
+
+    assert ch1 is ch2
+    assert ch1.flags.c_contiguous
+    assert not ch1.flags.writeable
+    assert np.array_equal(ch1, lg_channels(21, 21, n_channels=5, channel_width=4.0))
+
+    info = channel_cache_info()
+    assert info.hits == 1
+    assert info.misses == 1
+
+
+def test_observers_share_channel_bank():
+    clear_channel_cache()
+    sp = np.random.randn(4, 15, 15)
+    sa = np.random.randn(4, 15, 15)
+    ch_a = LG_CHO(sp, sa, channel_width=3).get_channels(15, 15)
+    ch_b = LG_CHO(sa, sp, channel_width=3).get_channels(15, 15)
+    assert ch_a is ch_b
+    assert channel_cache_info().currsize == 1
+
+
+def test_channel_cache_lru_eviction():
+    cache = ChannelCache(maxsize=2)
+    for key in ['a', 'b', 'a', 'c']:
+        cache.get(key, lambda: np.zeros(3))
+    info = cache.info()
+    assert info.currsize == 2
+    assert (info.hits, info.misses) == (1, 3)
+    # 'b' was least recently used and has been evicted
+    cache.get('b', lambda: np.zeros(3))
+    assert cache.info().misses == 4
+
+
+def test_unknown_channel_type():
+    with pytest.raises(ValueError, match="Unknown channel type"):
+        get_channel_bank('FOO', (8, 8))
@@ -0,0 +1,160 @@
+import multiprocessing
+import os
+import signal
+import socket
+import stat
+import time
+from multiprocessing import AuthenticationError
+from pathlib import Path
+import numpy as np
+import pandas as pd
+import pytest
+from lcdct.dataserver import DatasetClient, DatasetRegistry, read_authkey, serve, write_authkey
+from lcdct.LCD import measure_LCD
+from lcdct.parallel import _ReadOnlyBlock
+from lcdct.sweep import run_sweep
+from lcdct.utils import load_dataset, read_mhd
+
+DATA_DIR = Path(__file__).parent.parent / 'data' / 'small_dataset'
+DOSE_100 = DATA_DIR / 'fbp' / 'dose_100'
+
+
+def test_registry_shares_and_evicts():
+    with DatasetRegistry() as registry:
+        a = registry.acquire(DOSE_100, offset=1000)
+        b = registry.acquire(str(DOSE_100) + '/', offset=1000)
+        assert a.signal_present.name == b.signal_present.name
+        sp, sa = a.arrays()
+        ref_sp, ref_sa = load_dataset(DOSE_100, offset=1000)
+        np.testing.assert_array_equal(sp, ref_sp)
+        np.testing.assert_array_equal(sa, ref_sa)
+        with pytest.raises(ValueError):
+            sp[0, 0, 0] = 0
+        assert registry.info()[0]['refs'] == 2
+        a.release()
+        a.release()
+        assert registry.info()[0]['refs'] == 1
+        b.release()
+        assert registry.evict() == 1 and registry.info() == []
+
+        # a budget of one dataset evicts the least recently used unreferenced one
+        with registry.acquire(DOSE_100, offset=1000) as handle:
+            registry.max_bytes = handle.signal_present.nbytes * 2
+        with registry.acquire(DATA_DIR / 'fbp' / 'dose_055', offset=1000):
+            assert [Path(d['path']).name for d in registry.info()] == ['dose_055']
+        # datasets in use are kept over budget
+        held = registry.acquire(DOSE_100, offset=1000)
+        with registry.acquire(DATA_DIR / 'fbp' / 'dose_010', offset=1000):
+            assert len(registry.info()) == 2
+        held.release()
+
+
+@pytest.mark.skipif(not Path('/dev/shm').is_dir(), reason="POSIX shared memory in /dev/shm")
+def test_registry_blocks_are_private_or_group_shared(tmp_path):
+    with DatasetRegistry() as registry, registry.acquire(DOSE_100, offset=1000) as handle:
+        assert stat.S_IMODE(os.stat('/dev/shm/' + handle.signal_present.name).st_mode) == 0o600
+    with DatasetRegistry(group=os.getgid()) as registry, registry.acquire(DOSE_100, offset=1000) as handle:
+        info = os.stat('/dev/shm/' + handle.signal_absent.name)
+        assert stat.S_IMODE(info.st_mode) == 0o640 and info.st_gid == os.getgid()
+        # users of the group map the block read-only, for good
+        block = _ReadOnlyBlock(handle.signal_absent.name)
+        arr = np.ndarray(handle.signal_absent.shape, handle.signal_absent.dtype, buffer=block.buf)
+        np.testing.assert_array_equal(arr, handle.arrays()[1])
+        with pytest.raises(ValueError):
+            arr.flags.writeable = True
+        del arr
+        block.close()
+    assert write_authkey(tmp_path / 'key', group=os.getgid()) == read_authkey(authkey_file=tmp_path / 'key')
+    assert stat.S_IMODE(os.stat(tmp_path / 'key').st_mode) == 0o640
+
+
+def test_measure_lcd_and_sweep_accept_handles():
+    gt = read_mhd(DATA_DIR / 'fbp' / 'ground_truth.mhd').astype(np.float32) - 1000
+    sp, sa = load_dataset(DOSE_100, offset=1000)
+    expected = measure_LCD(sp, sa, gt, n_reader=2, seed_split=[0])
+    with DatasetRegistry() as registry, registry.acquire(DOSE_100, offset=1000) as handle:
+        pd.testing.assert_frame_equal(measure_LCD(handle.signal_present, handle.signal_absent, gt, n_reader=2,
+                                                  seed_split=[0]), expected)
+
+    kwargs = dict(recon_names=['fbp'], n_reader=2, seed_split=0)
+    keys = ['recon', 'dose_level', 'insert_HU', 'reader']
+    serial = pd.concat(run_sweep(DATA_DIR, **kwargs)).sort_values(keys).reset_index(drop=True)
+    with DatasetRegistry() as registry:
+        shared = pd.concat(run_sweep(DATA_DIR, datasets=registry, n_jobs=2, executor='thread', **kwargs))
+        assert [d['refs'] for d in registry.info()] == [0, 0, 0]
+    pd.testing.assert_frame_equal(shared.sort_values(keys).reset_index(drop=True), serial)
+
+
+@pytest.fixture
+def daemon(tmp_path):
+    """Address and authkey file of a daemon running in another process."""
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        address = s.getsockname()
+    authkey_file = tmp_path / 'dataserver.key'
+    server = multiprocessing.get_context('spawn').Process(target=serve, args=(address,),
+                                                          kwargs={'authkey_file': authkey_file}, daemon=True)
+    server.start()
+    try:
+        for _ in range(100):
+            if authkey_file.exists():
+                break
+            time.sleep(0.1)
+        yield address, authkey_file
+    finally:
+        server.terminate()
+        server.join()
+
+
+def _connect(address, authkey_file):
+    for _ in range(100):
+        try:
+            return DatasetClient(address, authkey_file=authkey_file)
+        except (ConnectionRefusedError, FileNotFoundError):
+            time.sleep(0.1)
+
+
+def _client_sum(address, authkey_file):
+    with DatasetClient(address, authkey_file=authkey_file).acquire(DOSE_100, offset=1000) as handle:
+        return float(handle.arrays()[0].sum())
+
+
+def test_daemon_serves_other_processes(daemon):
+    address, authkey_file = daemon
+    client = _connect(address, authkey_file)
+    assert stat.S_IMODE(os.stat(authkey_file).st_mode) == 0o600
+    with pytest.raises(AuthenticationError):
+        DatasetClient(address, authkey=b'lcdct')
+
+    expected = float(load_dataset(DOSE_100, offset=1000)[0].sum())
+    # a client process exiting must not unlink the daemon's blocks
+    with multiprocessing.get_context('spawn').Pool(1) as pool:
+        assert pool.apply(_client_sum, (address, authkey_file)) == pytest.approx(expected)
+    with client.acquire(DOSE_100, offset=1000) as handle:
+        assert float(handle.arrays()[0].sum()) == pytest.approx(expected)
+    assert client.info()[0]['refs'] == 0
+
+
+def _hold(address, authkey_file):
+    DatasetClient(address, authkey_file=authkey_file).acquire(DOSE_100, offset=1000)
+    time.sleep(60)
+
+
+def test_daemon_drops_references_of_dead_clients(daemon):
+    client = _connect(*daemon)
+    holder = multiprocessing.get_context('spawn').Process(target=_hold, args=daemon, daemon=True)
+    holder.start()
+    try:
+        for _ in range(200):
+            if [d['refs'] for d in client.info()] == [1]:
+                break
+            time.sleep(0.1)
+        handle = client.acquire(DOSE_100, offset=1000)
+        assert client.info()[0]['refs'] == 2
+    finally:
+        os.kill(holder.pid, signal.SIGKILL)
+        holder.join()
+    assert client.info()[0]['refs'] == 1
+    handle.release()
+    handle.release()
+    assert client.info()[0]['refs'] == 0 and client.evict() == 1
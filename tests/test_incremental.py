@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+import pytest
+from lcdct.LCD import measure_LCD
+from lcdct.incremental import IncrementalStudy
+
+
+PHANTOM = dict(n=40, seed=7, inserts=[(14, (20, 20), 5), (5, (44, 40), 5)])
+
+
+def test_incremental_matches_measure_lcd(phantom_data, tmp_path):
+    sp, sa, gt = phantom_data
+    observers = ['LG_CHO_2D', 'DOG_CHO_2D']
+    study = IncrementalStudy(gt, observers)
+    study.add(sp[:15], sa[:10], recon='fbp', dose_level=100)
+    assert study.counts()[['n_signal_present', 'n_signal_absent']].values.tolist() == [[15, 10]]
+
+    # state survives a save/load cycle between batches
+    study.save(tmp_path / 'study.npz')
+    study = IncrementalStudy.load(tmp_path / 'study.npz')
+    study.add(sp[15:], sa[10:], recon='fbp', dose_level=100)
+
+    res = study.results(n_reader=4, seed=2)
+    expected = measure_LCD(sp, sa, gt, observers=observers, n_reader=4, seed_split=2)
+    cols = ['observer', 'reader', 'insert_HU']
+    res, expected = (df.sort_values(cols).reset_index(drop=True) for df in (res, expected))
+    pd.testing.assert_frame_equal(res[expected.columns], expected, check_dtype=False)
+
+    summary = study.summary(n_reader=4, seed=2)
+    assert len(summary) == 4
+    assert (summary['n_signal_present'] == 40).all()
+    assert (summary['auc_std'] >= 0).all()
+
+
+def test_incremental_rejects_npwe(phantom_data):
+    with pytest.raises(ValueError, match="NPWE_2D"):
+        IncrementalStudy(phantom_data[2], ['NPWE_2D'])
+
+
+def test_incremental_skips_cells_with_too_few_realizations(phantom_data):
+    sp, sa, gt = phantom_data
+    study = IncrementalStudy(gt)
+    study.add(sp[:1], sa[:1])
+    assert study.results(n_reader=2, seed=0).empty
@@ -0,0 +1,106 @@
+from pathlib import Path
+import pytest
+import numpy as np
+import pandas as pd
+from lcdct.LCD import measure_LCD
+from lcdct.layout import PhantomLayout
+from lcdct.mhd import MHDStack
+from lcdct.utils import get_demo_truth_masks, get_insert_radius, get_roi_from_truth_mask, read_mhd
+
+DATA_DIR = Path(__file__).parent.parent / 'data' / 'small_dataset' / 'fbp'
+
+
+PHANTOM = dict(n=20, size=96, inserts=[(14, (30, 30), 6), (7, (66, 66), 8), (3, (4, 70), 5)], seed=1,
+               shared_noise=True)
+
+
+def test_layout_matches_utils(phantom_data):
+    gt = phantom_data[2]
+    layout = PhantomLayout.from_ground_truth(gt)
+    masks = get_demo_truth_masks(gt)
+    imgs = np.random.default_rng(0).normal(size=(3, 96, 96))
+
+    assert np.array_equal(layout.truth_masks, masks)
+    assert [i.hu for i in layout.inserts] == [14, 7, 3]
+    for info in layout.inserts:
+        mask = masks[:, :, info.index]
+        assert info.diameter == get_insert_radius(mask)
+        # the insert at the top edge is clipped exactly like get_roi_from_truth_mask
+        for nx in [None, 2 * layout.max_diameter]:
+            assert np.array_equal(layout.roi(imgs, info, nx=nx), get_roi_from_truth_mask(mask, imgs, nx=nx))
+
+
+def test_layout_custom_hus(phantom_data):
+    gt = phantom_data[2] * 10  # inserts at 140, 70 and 30 HU
+    layout = PhantomLayout.from_ground_truth(gt, hus=[30, 140, 70])
+    assert sorted(i.hu for i in layout.inserts) == [30, 70, 140]
+    assert layout.truth_masks.shape[2] == 3
+    default = PhantomLayout.from_ground_truth(phantom_data[2])
+    assert sorted(i.centroid for i in layout.inserts) == sorted(i.centroid for i in default.inserts)
+
+
+def test_layout_roundtrip(phantom_data, tmp_path):
+    layout = PhantomLayout.from_ground_truth(phantom_data[2])
+    path = tmp_path / 'layout.json'
+    layout.save(path)
+    loaded = PhantomLayout.load(path)
+
+    assert np.array_equal(loaded.truth_masks, layout.truth_masks)
+    assert loaded.inserts == layout.inserts
+    assert loaded.to_dict() == layout.to_dict()
+
+
+def test_measure_lcd_accepts_layout(phantom_data):
+    sp, sa, gt = phantom_data
+
+    from_image = measure_LCD(sp, sa, gt, n_reader=2, seed_split=5)
+    from_layout = measure_LCD(sp, sa, PhantomLayout.from_ground_truth(gt), n_reader=2, seed_split=5)
+    pd.testing.assert_frame_equal(from_image, from_layout)
+
+
+@pytest.mark.parametrize("pad_mode", ['edge', 'symmetric', 'reflect'])
+def test_extract_rois_pads_edge_inserts(phantom_data, pad_mode):
+    gt = phantom_data[2]
+    layout = PhantomLayout.from_ground_truth(gt)
+    imgs = np.random.default_rng(2).normal(size=(4, 96, 96)).astype(np.float32)
+    nx = 2 * layout.max_diameter
+    half = nx // 2
+
+    rois = layout.extract_rois(imgs, nx=nx, pad_mode=pad_mode)
+    assert rois.shape == (3, 4, nx + 1, nx + 1)
+    assert rois.dtype == np.float32 and rois.flags.c_contiguous
+    assert np.allclose(rois.mean(axis=(2, 3)), 0, atol=1e-5)
+
+    padded = np.pad(imgs, ((0, 0), (half, half), (half, half)), mode=pad_mode)
+    for roi, info in zip(rois, layout.inserts):
+        cy, cx = (int(round(c)) + half for c in info.centroid)
+        expected = padded[:, cy - half:cy + half + 1, cx - half:cx + half + 1]
+        assert np.allclose(roi, expected - expected.mean(axis=(1, 2), keepdims=True), atol=1e-5)
+
+
+def test_extract_rois_from_lazy_stack():
+    gt = read_mhd(DATA_DIR / 'ground_truth.mhd').astype(np.float32) - 1000
+    layout = PhantomLayout.from_ground_truth(gt)
+    mhd_file = DATA_DIR / 'dose_100' / 'signal_present' / 'signal_present.mhd'
+    stack = MHDStack(mhd_file, offset=1000)
+
+    lazy = layout.extract_rois(stack, remove_dc=False)
+    eager = layout.extract_rois(np.asarray(stack), remove_dc=False)
+    assert np.array_equal(lazy, eager)
+    for roi, info in zip(eager, layout.inserts):
+        assert np.array_equal(roi, layout.roi(np.asarray(stack), info, nx=2 * layout.max_diameter))
+
+
+def test_extract_rois_allocates_only_the_output(phantom_data):
+    import tracemalloc
+    layout = PhantomLayout.from_ground_truth(phantom_data[2])
+    images = np.random.default_rng(0).integers(0, 100, (200, 96, 96)).astype(np.int16)
+    tracemalloc.start()
+    try:
+        rois = layout.extract_rois(images, remove_dc=False, dtype=np.float32)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    assert rois.dtype == np.float32
+    # one insert's worth of gathered pixels on top of the output
+    assert peak < 1.5 * rois.nbytes
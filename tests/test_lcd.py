@@ -1,8 +1,9 @@
 import numpy as np
-from lcdct.functions import laguerre
+import pytest
+from lcdct.functions import laguerre, laguerre_gaussian_2d
 from lcdct.LCD import measure_LCD
 from lcdct.Observers import LG_CHO, DOG_CHO, Gabor_CHO
-from lcdct.utils import get_demo_truth_masks
+from lcdct.utils import get_demo_truth_masks, get_truth_labels
 
 def test_laguerre():
     # Laguerre L_0(x) = 1
@@ -14,6 +15,22 @@ def test_laguerre():
     # Col 1: L1
     assert np.allclose(L[:, 1], 1 - x)
 
+def test_laguerre_high_order():
+    # Recurrence matches scipy's reference evaluation at orders used by LG channel studies
+    from scipy.special import eval_laguerre
+    x = np.linspace(0, 30, 101)
+    L = laguerre(x, 20)
+    ref = np.stack([eval_laguerre(j, x) for j in range(21)], axis=1)
+    assert np.allclose(L, ref, rtol=1e-10, atol=1e-10 * np.abs(ref).max())
+
+def test_laguerre_gaussian_2d_out_buffer():
+    r = np.random.rand(6, 7) * 10
+    expected = laguerre_gaussian_2d(r, 4, 3.0)
+    out = np.empty((6, 7, 5))
+    res = laguerre_gaussian_2d(r, 4, 3.0, out=out)
+    assert res is out
+    assert np.allclose(out, expected)
+
 def test_measure_lcd_synthetic():
     # Create synthetic data
     # 10 images, 32x32
@@ -67,3 +84,65 @@ def test_get_demo_truth_masks():
     assert masks[:,:,0].sum() > 0 # 14 is first index
     assert masks[:,:,1].sum() == 0
 
+@pytest.mark.parametrize("shape", [(48, 40), (6, 16, 16)])
+def test_truth_labels_match_per_insert_median_filter(shape):
+    from scipy.ndimage import median_filter
+    rng = np.random.default_rng(3)
+    # blocky inserts plus isolated noise pixels for the majority filter to remove
+    gt = np.kron(rng.choice([0, 3, 5, 7, 14], size=tuple(n // 2 for n in shape)), np.ones((2,) * len(shape)))
+    gt += rng.normal(0, 0.4, shape)
+    expected = np.stack([median_filter(np.abs(gt - hu) < 1, size=3) for hu in [14, 7, 5, 3]], axis=-1)
+    assert expected.sum() > 0
+    np.testing.assert_array_equal(get_demo_truth_masks(gt), expected)
+
+
+def test_truth_labels_custom_hus_and_boxes():
+    gt = np.zeros((40, 40))
+    gt[5:10, 8:12] = 40
+    gt[20:30, 22:25] = -35
+    labels, boxes = get_truth_labels(gt, hus=[-35, 20, 40], tol=2)
+    assert labels.dtype == np.uint8
+    assert set(np.unique(labels)) == {0, 1, 3}
+    assert boxes[0] == (slice(20, 30), slice(22, 25))
+    assert boxes[1] is None
+    assert boxes[2] == (slice(5, 10), slice(8, 12))
+
+
+INSERTS = [(14, (50, 110), 8), (7, (50, 50), 10), (5, (110, 50), 12), (3, (110, 110), 15)]
+
+
+def test_find_insert_centers_subpixel(make_phantom):
+    from lcdct.utils import detect_inserts, find_insert_centers
+    centers = [(50.5, 110), (50, 49.5), (110.3, 50), (110, 110)]
+    _, sa, gt = make_phantom(n=1, size=160, inserts=[(hu, c, r) for (hu, _, r), c in zip(INSERTS, centers)], noise=1)
+    image = gt + sa[0]
+    circles = detect_inserts(image)
+    assert len(circles) == 4
+    for (y, x, r), (cy, cx), radius in zip(circles, centers, (8, 10, 12, 15)):
+        assert abs(y - cy) < 0.75 and abs(x - cx) < 0.75
+        assert abs(r - radius) < 1.5
+    mask = find_insert_centers(image, hus=[1, 2, 3, 4])
+    assert mask[50, 110] == 1 and mask[110, 110] == 4 and mask[0, 0] == 0
+
+
+def test_approximate_groundtruth_streams_and_caches(make_phantom, tmp_path):
+    import SimpleITK as sitk
+    from lcdct.utils import approximate_groundtruth
+    gt = make_phantom(n=0, size=160, inserts=INSERTS)[2]
+    rng = np.random.default_rng(1)
+    for name, signal in [('signal_present', gt), ('signal_absent', 0)]:
+        d = tmp_path / 'dose_100' / name
+        d.mkdir(parents=True)
+        stack = 1000 + signal + rng.normal(0, 5, (12,) + gt.shape)
+        sitk.WriteImage(sitk.GetImageFromArray(np.round(stack).astype(np.int16)), str(d / f'{name}.mhd'))
+
+    est = approximate_groundtruth(tmp_path, chunk_size=5)
+    for hu in (14, 7, 5, 3):
+        assert abs(np.sum(est == hu) - np.sum(gt == hu)) < 0.15 * np.sum(gt == hu)
+    assert (tmp_path / 'ground_truth.mhd').exists() and (tmp_path / 'ground_truth.json').exists()
+
+    # while the sidecar matches, the saved estimate is returned as is
+    sitk.WriteImage(sitk.GetImageFromArray(np.full(gt.shape, 1001, np.int16)), str(tmp_path / 'ground_truth.mhd'))
+    np.testing.assert_array_equal(approximate_groundtruth(tmp_path), 1)
+    # a different parameter recomputes and overwrites it
+    np.testing.assert_array_equal(np.unique(approximate_groundtruth(tmp_path, hus=[4, 3, 2, 1])), [0, 1, 2, 3, 4])
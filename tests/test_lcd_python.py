@@ -1,40 +1,18 @@
+import warnings
 import pytest
 import numpy as np
 import pandas as pd
-from skimage.draw import disk
 from lcdct.LCD import measure_LCD
 from lcdct.Observers import LG_CHO, DOG_CHO, Gabor_CHO, NPWE
 
-# --- Fixtures ---
-
-@pytest.fixture
-def synthetic_data():
-    """Generates synthetic signal-present and signal-absent images."""
-    np.random.seed(42)
-    n_images = 50
-    size = 64
-    insert_r = 5
-    insert_val = 14  # Must match one of [14, 7, 5, 3] in get_demo_truth_masks
-
-    # Signal Absent: Gaussian Noise
-    sa = np.random.normal(0, 10, (n_images, size, size))
-
-    # Signal Present: Noise + Insert
-    sp = sa.copy()
-    rr, cc = disk((size//2, size//2), insert_r, shape=(size, size))
-    sp[:, rr, cc] += insert_val
-
-    # Ground Truth: Single insert at center
-    ground_truth = np.zeros((size, size))
-    ground_truth[rr, cc] = insert_val
-
-    return sp, sa, ground_truth
+# Insert value must match one of [14, 7, 5, 3] in get_demo_truth_masks
+PHANTOM = dict(n=50, seed=42, shared_noise=True)
 
 # --- Tests ---
 
-def test_measure_lcd_basic(synthetic_data):
+def test_measure_lcd_basic(phantom_data):
     """Test basic functionality with LG_CHO_2D."""
-    sp, sa, gt = synthetic_data
+    sp, sa, gt = phantom_data
 
     res = measure_LCD(sp, sa, gt, observers=['LG_CHO_2D'], n_reader=2, pct_split=0.5)
 
@@ -47,9 +25,9 @@ def test_measure_lcd_basic(synthetic_data):
     # Observer class names are used: LG_CHO, DOG_CHO, Gabor_CHO, NPWE
     assert 'LG_CHO' in res['observer'].values
 
-def test_all_observers_strings(synthetic_data):
+def test_all_observers_strings(phantom_data):
     """Test all observer types passed as strings."""
-    sp, sa, gt = synthetic_data
+    sp, sa, gt = phantom_data
     observers = ['LG_CHO_2D', 'DOG_CHO_2D', 'GABOR_CHO_2D', 'NPWE_2D']
 
     res = measure_LCD(sp, sa, gt, observers=observers, n_reader=2)
@@ -63,9 +41,9 @@ def test_all_observers_strings(synthetic_data):
     for expected in expected_types:
         assert expected in unique_observers
 
-def test_observer_objects(synthetic_data):
+def test_observer_objects(phantom_data):
     """Test passing observer objects directly."""
-    sp, sa, gt = synthetic_data
+    sp, sa, gt = phantom_data
     # For this test, we create "dummy" objects
     dummy_sp = np.zeros((1, 10, 10))
     dummy_sa = np.zeros((1, 10, 10))
@@ -92,9 +70,9 @@ def test_input_validation():
     with pytest.raises(ValueError, match="must be 3D"):
         measure_LCD(sp, sa, gt)
 
-def test_no_inserts(synthetic_data):
+def test_no_inserts(phantom_data):
     """Test behavior when no inserts are found in ground truth."""
-    sp, sa, _ = synthetic_data
+    sp, sa, _ = phantom_data
     gt = np.zeros_like(sp[0]) # Empty ground truth
 
     res = measure_LCD(sp, sa, gt)
@@ -102,7 +80,159 @@ def test_no_inserts(synthetic_data):
     assert isinstance(res, pd.DataFrame)
     assert res.empty
 
-def test_invalid_observer_name(synthetic_data):
-    sp, sa, gt = synthetic_data
+def test_invalid_observer_name(phantom_data):
+    sp, sa, gt = phantom_data
     with pytest.raises(ValueError, match="Unknown observer"):
         measure_LCD(sp, sa, gt, observers=['INVALID_NAME'])
+
+def test_invalid_executor_with_one_job(phantom_data):
+    sp, sa, gt = phantom_data
+    with pytest.raises(ValueError, match="Unknown executor"):
+        measure_LCD(sp, sa, gt, n_jobs=1, executor='proces')
+
+def test_split_indices_match_train_test_split():
+    """Batched split indices select the same images as sklearn's train_test_split."""
+    from sklearn.model_selection import train_test_split
+    from lcdct.Observers import split_indices
+
+    seeds = [0, 7, 12345]
+    train_idx, test_idx = split_indices(25, 0.5, seeds)
+    for reader, seed in enumerate(seeds):
+        train, test = train_test_split(np.arange(25), train_size=0.5, shuffle=True, random_state=seed)
+        assert np.array_equal(train_idx[reader], train)
+        assert np.array_equal(test_idx[reader], test)
+
+@pytest.mark.parametrize("observer_cls, kwargs", [
+    (LG_CHO, {'channel_width': 4}),
+    (DOG_CHO, {'type': 'sparse'}),
+    (Gabor_CHO, {}),
+    (NPWE, {'eye': True}),
+])
+def test_batched_readers_match_per_reader_study(phantom_data, observer_cls, kwargs):
+    """The batched multi-reader engine reproduces one calculate_metrics call per reader."""
+    sp, sa, _ = phantom_data
+    obs = observer_cls(sp[:, 20:44, 20:44], sa[:, 20:44, 20:44], **kwargs)
+
+    res = obs.run_study(n_readers=5, pct_split=0.5, seed=1)
+
+    seed_split = np.random.default_rng(seed=1).integers(0, 100000, size=5)
+    for reader, seed in enumerate(seed_split):
+        sa_train, sa_test, sp_train, sp_test = obs.get_splits(pct_split=0.5, seed=seed)
+        expected = obs.perform_study(sa_train, sp_train, sa_test, sp_test)
+        assert res['auc'][reader] == pytest.approx(expected['auc'])
+        assert res['snr'][reader] == pytest.approx(expected['snr'])
+
+    assert list(res.columns) == ['auc', 'snr', 'observer', 'reader']
+    assert list(res['reader']) == list(range(5))
+
+@pytest.mark.parametrize("executor", ['thread', 'process'])
+def test_parallel_matches_serial(phantom_data, executor):
+    """Parallel (observer, insert) studies give the same results as the serial path."""
+    sp, sa, gt = phantom_data
+    observers = ['LG_CHO_2D', 'NPWE_2D']
+
+    serial = measure_LCD(sp, sa, gt, observers=observers, n_reader=3, seed_split=4)
+    parallel = measure_LCD(sp, sa, gt, observers=observers, n_reader=3, seed_split=4, n_jobs=2, executor=executor)
+
+    pd.testing.assert_frame_equal(serial, parallel)
+
+def test_insert_hu_per_insert(make_phantom):
+    """Each insert is reported with its own HU value."""
+    sp, sa, gt = make_phantom(n=20, size=96, inserts=[(14, (30, 30), 6), (3, (66, 66), 6)], shared_noise=True)
+
+    res = measure_LCD(sp, sa, gt, n_reader=2)
+    assert sorted(res['insert_HU'].unique()) == [3, 14]
+
+@pytest.mark.parametrize("eye", [False, True])
+def test_npwe_template_matches_frequency_domain_product(eye):
+    """The folded spatial template scores images like the MATLAB frequency-domain inner product."""
+    from lcdct.channels import get_channel_bank
+    rng = np.random.default_rng(3)
+    signal = rng.normal(size=(21, 21))
+    images = rng.normal(size=(4, 21, 21))
+    obs = NPWE(images, images, eye=eye)
+
+    eyeflt = np.sqrt(np.fft.fftshift(get_channel_bank('NPWE', (21, 21), eye=eye)))
+    s_eye = np.fft.fftshift(np.fft.fft2(signal)) * eyeflt
+    expected = [np.vdot(s_eye, np.fft.fftshift(np.fft.fft2(img)) * eyeflt).real for img in images]
+
+    scores = images.reshape(4, -1) @ obs.template(signal).ravel()
+    assert np.allclose(scores, expected)
+
+@pytest.mark.parametrize("observer_cls,kwargs", [
+    (LG_CHO, {'channel_width': 5}),
+    (Gabor_CHO, {}),
+    (NPWE, {'eye': True}),
+])
+# independent signal-absent noise so the two classes do not share realizations
+@pytest.mark.parametrize('phantom_data', [dict(shared_noise=False)], indirect=True)
+def test_bootstrap_readers_match_per_reader_resamples(phantom_data, observer_cls, kwargs):
+    """Closed-form bootstrap readers equal training on each resample and testing out of bag."""
+    from lcdct.Observers import bootstrap_counts
+    sp, sa, gt = phantom_data
+    obs = observer_cls(sp[:, 20:45, 20:45], sa[:, 20:45, 20:45], **kwargs)
+    seeds = [11, 12, 13]
+    batched = obs.reader_metrics(0.5, seeds, resampling='bootstrap')
+
+    c_sa, c_sp = bootstrap_counts(len(obs.signal_absent), seeds), bootstrap_counts(len(obs.signal_present), seeds)
+    for r in range(len(seeds)):
+        ref = obs.calculate_metrics(np.repeat(obs.signal_absent, c_sa[r], axis=0),
+                                    np.repeat(obs.signal_present, c_sp[r], axis=0),
+                                    obs.signal_absent[c_sa[r] == 0], obs.signal_present[c_sp[r] == 0])
+        assert batched['auc'][r] == pytest.approx(ref['auc'])
+        assert batched['snr'][r] == pytest.approx(ref['snr'], rel=1e-6)
+
+def test_bootstrap_resampling_in_measure_lcd(phantom_data):
+    sp, sa, gt = phantom_data
+    res = measure_LCD(sp, sa, gt, observers=['LG_CHO_2D', 'NPWE_2D'], n_reader=50, seed_split=1, resampling='bootstrap')
+    assert len(res) == 100
+    assert res['auc'].between(0, 1).all()
+    with pytest.raises(ValueError, match="resampling"):
+        measure_LCD(sp, sa, gt, resampling='jackknife')
+
+@pytest.mark.parametrize('phantom_data', [dict(shared_noise=False)], indirect=True)
+def test_bootstrap_with_few_images_keeps_two_out_of_bag(phantom_data):
+    from lcdct.Observers import bootstrap_counts
+    counts = bootstrap_counts(4, range(200))
+    assert ((counts == 0).sum(axis=1) == 2).all() and (counts.sum(axis=1) == 4).all()
+    with pytest.raises(ValueError, match="at least 4 images"):
+        bootstrap_counts(3, [0])
+
+    sp, sa, gt = phantom_data
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        res = measure_LCD(sp[:4], sa[:4], gt, observers=['LG_CHO_2D', 'NPWE_2D'], n_reader=50, seed_split=1,
+                          resampling='bootstrap')
+    assert np.isfinite(res[['auc', 'snr']].to_numpy()).all()
+
+def test_float32_compute_matches_float64(make_phantom):
+    """Documented float32 tolerance: AUC within 1e-3, SNR within 0.5 % of the float64 results."""
+    inserts = zip([14, 7, 5, 3], [(25, 25), (25, 70), (70, 25), (70, 70)], [8, 6, 5, 4])
+    sp, sa, gt = make_phantom(n=80, size=96, inserts=inserts, seed=8)
+    # same float32 input data, only the compute precision differs
+    sp, sa = sp.astype(np.float32), sa.astype(np.float32)
+    observers = ['LG_CHO_2D', 'DOG_CHO_2D', 'GABOR_CHO_2D', 'NPWE_2D']
+
+    res64 = measure_LCD(sp, sa, gt, observers=observers, n_reader=5, seed_split=3, dtype='float64')
+    res32 = measure_LCD(sp, sa, gt, observers=observers, n_reader=5, seed_split=3, dtype='float32')
+
+    np.testing.assert_allclose(res32['auc'], res64['auc'], atol=1e-3)
+    np.testing.assert_allclose(res32['snr'], res64['snr'], rtol=5e-3)
+
+def test_float32_observer_keeps_precision(phantom_data):
+    sp, sa, gt = phantom_data
+    obs = LG_CHO(sp, sa, channel_width=5, dtype='float32')
+    assert obs.signal_present.dtype == np.float32
+    assert obs.get_channels(64, 64).dtype == np.float32
+    assert obs.channelize(obs.signal_present).dtype == np.float32
+
+def test_hotelling_solve_matches_pinv_for_rank_deficient_channels():
+    from lcdct.Observers import hotelling_template
+    rng = np.random.default_rng(4)
+    v = rng.normal(size=(2, 3, 40, 5))
+    # the last channel repeats the first up to rounding, so the covariances are numerically singular
+    v[..., 4] = v[..., 0] + 1e-13 * rng.normal(size=v.shape[:-1])
+    v[:, 2, :, 4] = rng.normal(size=(2, 40))  # one well-conditioned reader
+    cov = np.stack([np.stack([np.cov(r, rowvar=False) for r in cls]) for cls in v])
+    args = (v[0].mean(axis=1), v[1].mean(axis=1), cov[0], cov[1])
+    np.testing.assert_allclose(hotelling_template(*args, solver='solve'), hotelling_template(*args), rtol=1e-6)
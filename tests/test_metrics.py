@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+from sklearn.metrics import roc_auc_score
+from lcdct.metrics import auc, snr, auc_snr
+
+
+def _sklearn_auc(t_sa, t_sp):
+    y_true = np.concatenate([np.zeros(len(t_sa)), np.ones(len(t_sp))])
+    return roc_auc_score(y_true, np.concatenate([t_sa, t_sp]))
+
+
+@pytest.mark.parametrize("ties", [False, True])
+def test_auc_matches_sklearn(ties):
+    rng = np.random.default_rng(0)
+    t_sa = rng.normal(size=(20, 37))
+    t_sp = rng.normal(0.7, size=(20, 41))
+    if ties:
+        t_sa, t_sp = np.round(t_sa), np.round(t_sp)
+
+    res = auc(t_sa, t_sp)
+    assert res.shape == (20,)
+    for reader in range(20):
+        assert res[reader] == pytest.approx(_sklearn_auc(t_sa[reader], t_sp[reader]), abs=1e-12)
+    assert auc(t_sa[0], t_sp[0]) == pytest.approx(res[0])
+
+
+def test_auc_extremes():
+    assert auc([0, 1, 2], [3, 4]) == 1.0
+    assert auc([3, 4], [0, 1, 2]) == 0.0
+    assert auc([1, 1], [1, 1, 1]) == 0.5
+
+
+def test_snr_rows():
+    rng = np.random.default_rng(1)
+    t_sa = rng.normal(size=(5, 30))
+    t_sp = rng.normal(1, size=(5, 30))
+    res = auc_snr(t_sa, t_sp)
+    expected = [(np.mean(b) - np.mean(a)) / np.sqrt((np.std(b, ddof=1)**2 + np.std(a, ddof=1)**2) / 2)
+                for a, b in zip(t_sa, t_sp)]
+    assert np.allclose(res['snr'], expected)
+    assert isinstance(snr(t_sa[0], t_sp[0]), float)
+
+
+def test_masked_metrics_match_subsets():
+    rng = np.random.default_rng(5)
+    t_sa = np.round(rng.normal(size=(4, 30)), 1)
+    t_sp = np.round(rng.normal(0.7, size=(4, 25)), 1)
+    mask_sa = rng.random((4, 30)) < 0.6
+    mask_sp = rng.random((4, 25)) < 0.6
+
+    res_auc = auc(t_sa, t_sp, mask_sa, mask_sp)
+    res_snr = snr(t_sa, t_sp, mask_sa, mask_sp)
+    for r in range(4):
+        a, b = t_sa[r][mask_sa[r]], t_sp[r][mask_sp[r]]
+        assert res_auc[r] == pytest.approx(roc_auc_score(np.r_[np.zeros(len(a)), np.ones(len(b))], np.r_[a, b]))
+        assert res_snr[r] == pytest.approx(snr(a, b))
@@ -0,0 +1,70 @@
+import pickle
+from pathlib import Path
+import numpy as np
+import SimpleITK as sitk
+from lcdct.LCD import measure_LCD
+from lcdct.mhd import MHDStack, read_mhd_header
+from lcdct.utils import load_dataset, read_mhd, get_roi_from_truth_mask, get_demo_truth_masks
+
+DATA_DIR = Path(__file__).parent.parent / 'data' / 'small_dataset' / 'fbp'
+
+
+def test_header_expands_slice_pattern():
+    header = read_mhd_header(DATA_DIR / 'dose_100' / 'signal_present' / 'signal_present.mhd')
+    assert header['ElementType'] == 'MET_SHORT'
+    assert len(header['DataFileList']) == 10
+    assert header['DataFileList'][0].name == 'signal_present_001.raw'
+
+
+def test_lazy_stack_matches_simpleitk():
+    mhd_file = DATA_DIR / 'dose_100' / 'signal_present' / 'signal_present.mhd'
+    expected = read_mhd(mhd_file).astype(np.float32) - 1000
+    stack = MHDStack(mhd_file, offset=1000)
+
+    assert stack.shape == expected.shape
+    assert np.array_equal(np.asarray(stack), expected)
+    assert np.array_equal(stack[3], expected[3])
+    assert np.array_equal(stack[2:7:2, 100:120, 30:40], expected[2:7:2, 100:120, 30:40])
+    assert stack[:, 10:20, 10:20].dtype == np.float32
+
+    restored = pickle.loads(pickle.dumps(stack))
+    assert np.array_equal(restored[5], expected[5])
+
+
+def test_lazy_stack_indexing_reads_only_the_selection(monkeypatch):
+    mhd_file = DATA_DIR / 'dose_100' / 'signal_present' / 'signal_present.mhd'
+    stack = MHDStack(mhd_file, offset=1000)
+    expected = np.asarray(stack)
+    decoded = []
+    decode = stack._decode
+    monkeypatch.setattr(stack, '_decode', lambda raw: decoded.append(raw.size) or decode(raw))
+    for key in [np.s_[..., 3:9, 2], np.s_[2, ...], np.s_[None, 1:3, 5], np.s_[1:4, ..., 7, None],
+                np.s_[:, np.arange(4)[:, None], np.arange(3)[None]]]:
+        np.testing.assert_array_equal(stack[key], expected[key])
+    assert sum(decoded) < expected.size / 2
+    monkeypatch.setattr(stack, 'raw_slice', None)  # empty selections do not read the files
+    for key in [np.s_[3:3], np.s_[[], 2:5, 1], np.s_[5:2, ..., None]]:
+        assert stack[key].shape == expected[key].shape
+
+
+def test_lazy_2d_and_local_data(tmp_path):
+    img = (np.arange(12 * 9, dtype=np.int16).reshape(12, 9) - 40)
+    sitk.WriteImage(sitk.GetImageFromArray(img), str(tmp_path / 'img.mha'))
+    stack = MHDStack(tmp_path / 'img.mha', offset=5)
+    assert stack.shape == (1, 12, 9)
+    assert np.array_equal(stack[0], img - 5)
+
+
+def test_lazy_dataset_roi_extraction_and_lcd():
+    sp, sa = load_dataset(DATA_DIR / 'dose_100', offset=1000)
+    sp_lazy, sa_lazy = load_dataset(DATA_DIR / 'dose_100', offset=1000, lazy=True)
+    assert isinstance(sp_lazy, MHDStack)
+
+    gt = read_mhd(DATA_DIR / 'ground_truth.mhd').astype(np.float32) - 1000
+    mask = get_demo_truth_masks(gt)[:, :, 0]
+    assert np.array_equal(get_roi_from_truth_mask(mask, sp_lazy, nx=20), get_roi_from_truth_mask(mask, sp, nx=20))
+
+    eager = measure_LCD(sp, sa, gt, n_reader=3, seed_split=0)
+    lazy = measure_LCD(sp_lazy, sa_lazy, gt, n_reader=3, seed_split=0)
+    assert np.allclose(eager['auc'], lazy['auc'])
+    assert np.allclose(eager['snr'], lazy['snr'])
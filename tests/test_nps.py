@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+from scipy.ndimage import gaussian_filter
+from lcdct.LCD import analytic_LCD, measure_LCD
+from lcdct.layout import PhantomLayout
+from lcdct.nps import estimate_nps, projection_covariance
+from lcdct.registry import get_observer_factory
+
+
+PHANTOM = dict(n=6, noise=3, seed=2, inserts=[(5.0, (32, 32), 5)])
+
+
+def test_estimate_nps_of_white_noise():
+    rng = np.random.default_rng(0)
+    images = 100 + rng.normal(0, 2, (6, 48, 48))
+    assert estimate_nps(images).mean() == pytest.approx(4, rel=0.05)
+    assert estimate_nps(images[:1]).mean() == pytest.approx(4, rel=0.1)
+    assert estimate_nps(images, mean=100).shape == (48, 48)
+
+
+def test_projection_covariance_matches_circulant_covariance():
+    rng = np.random.default_rng(1)
+    # noise = circular convolution of white noise with a kernel: covariance C C^T, NPS |K(f)|^2
+    kernel = np.zeros((8, 8))
+    kernel[:3, :3] = rng.normal(size=(3, 3))
+    shifts = [np.roll(np.roll(kernel, i, 0), j, 1).ravel() for i in range(8) for j in range(8)]
+    c = np.stack(shifts, axis=1)
+    templates = rng.normal(size=(3, 5, 5))
+    padded = np.zeros((3, 8, 8))
+    padded[:, :5, :5] = templates
+    u = padded.reshape(3, -1)
+    expected = u @ c @ c.T @ u.T
+    np.testing.assert_allclose(projection_covariance(templates, np.abs(np.fft.fft2(kernel)) ** 2), expected, atol=1e-10)
+    with pytest.raises(ValueError):
+        projection_covariance(templates, np.ones((4, 8)))
+
+
+def test_analytic_lg_cho_white_noise(phantom_data):
+    _, sa, gt = phantom_data
+    layout = PhantomLayout.from_ground_truth(gt)
+    info = layout.inserts[0]
+    nx = 2 * layout.max_diameter
+    obs = get_observer_factory('LG_CHO_2D')(np.empty((0, nx + 1, nx + 1)), np.empty((0, nx + 1, nx + 1)), info.diameter, None)
+    u = obs.get_channels(nx + 1, nx + 1).T
+    u = u - u.mean(axis=1, keepdims=True)
+    rows, cols = layout.window_indices(info, nx)
+    v = u @ (5 * layout.truth_masks[rows[:, None], cols[None, :], info.index]).ravel()
+    expected = np.sqrt(v @ np.linalg.solve(9 * u @ u.T, v))
+
+    res = analytic_LCD(None, gt, nps=lambda f: np.full(f.shape, 9.0))
+    assert res['snr'][0] == pytest.approx(expected)
+    assert res['auc'][0] > 0.5 and list(res['observer']) == ['LG_CHO']
+
+    assert analytic_LCD(sa, gt)['snr'][0] == pytest.approx(expected, rel=0.1)
+
+
+def test_analytic_npwe_matches_realizations(phantom_data):
+    rng = np.random.default_rng(3)
+    gt = phantom_data[2]
+
+    def noise(n):
+        return np.stack([gaussian_filter(rng.normal(0, 20, gt.shape), 1.5, mode='wrap') for _ in range(n)])
+
+    sa, sp = noise(300), noise(300) + gt
+    empirical = measure_LCD(sp, sa, gt, observers=['NPWE_2D'], n_reader=5, seed_split=[0])
+    analytic = analytic_LCD(sa[:10], gt, observers=['NPWE_2D', 'LG_CHO_2D'])
+    assert analytic['snr'][0] == pytest.approx(empirical['snr'].mean(), rel=0.15)
+    assert analytic['snr'][1] > analytic['snr'][0]
+
+    with pytest.raises(ValueError):
+        analytic_LCD(None, gt)
@@ -0,0 +1,85 @@
+import json
+import threading
+import tracemalloc
+import numpy as np
+import pandas as pd
+import pytest
+from lcdct.LCD import measure_LCD
+from lcdct.Observers import LG_CHO
+from lcdct.profiling import Profiler, active_profiler, stage
+
+
+PHANTOM = dict(seed=5, inserts=[(14, (20, 20), 5), (5, (44, 40), 5)])
+
+
+def test_stage_is_noop_without_profiler():
+    assert active_profiler() is None
+    with stage('anything') as s:
+        assert s is None
+
+
+@pytest.mark.parametrize("n_jobs,executor", [(1, 'process'), (2, 'thread'), (2, 'process')])
+def test_measure_lcd_stage_report(phantom_data, n_jobs, executor):
+    sp, sa, gt = phantom_data
+    seen = []
+    profiler = Profiler(callbacks=[seen.append])
+    res = measure_LCD(sp, sa, gt, observers=['LG_CHO_2D', 'NPWE_2D'], n_reader=3, seed_split=1,
+                      n_jobs=n_jobs, executor=executor, profiler=profiler)
+    expected = measure_LCD(sp, sa, gt, observers=['LG_CHO_2D', 'NPWE_2D'], n_reader=3, seed_split=1)
+    pd.testing.assert_frame_equal(res, expected)
+    assert len(seen) == len(profiler.records)
+
+    report = profiler.report()
+    stages = set(report['stage'])
+    assert {'layout', 'extract_rois', 'channels', 'run_study', 'channelize', 'template',
+            'decision_variables', 'auc_snr'} <= stages
+    # every study is labeled with its observer and insert
+    studies = report[report['stage'] == 'run_study']
+    assert set(zip(studies['observer'], studies['insert_HU'])) == {(o, hu) for o in ('LG_CHO', 'NPWE')
+                                                                    for hu in (14.0, 5.0)}
+    assert (studies['calls'] == 1).all()
+    channelize = report[report['stage'] == 'channelize']
+    assert set(channelize['observer']) == {'LG_CHO'}
+    assert (channelize['calls'] == 2).all()  # signal-absent and signal-present stacks
+    assert report['peak_bytes'].isna().all()
+
+    trace = json.loads(profiler.to_json())['records']
+    assert len(trace) == len(profiler.records)
+    assert active_profiler() is None
+
+
+def test_run_study_memory_profile():
+    rng = np.random.default_rng(0)
+    sp, sa = rng.normal(size=(2, 40, 21, 21))
+    profiler = Profiler(memory=True)
+    LG_CHO(sp, sa, channel_width=4).run_study(n_readers=4, seed=0, profiler=profiler)
+    report = profiler.report().set_index('stage')
+    assert (report['observer'] == 'LG_CHO').all()
+    # the study's peak includes the peaks of its stages
+    assert report.loc['run_study', 'peak_bytes'] >= report.loc['channelize', 'peak_bytes'] > 0
+    assert report.loc['run_study', 'wall_time'] >= report.loc['template', 'wall_time']
+
+
+def test_concurrent_memory_profilers_share_tracing():
+    outer, inner = Profiler(memory=True), Profiler(memory=True)
+    entered, finished = threading.Event(), threading.Event()
+
+    def sibling():
+        with inner.activate(), stage('sibling'):
+            entered.set()
+            finished.wait(10)
+
+    with outer.activate(), stage('outer'):
+        big = np.ones(2_000_000)
+        del big
+        thread = threading.Thread(target=sibling)
+        thread.start()
+        entered.wait(10)
+        finished.set()
+        thread.join()
+        # the sibling's activation ended while this one is still running
+        assert tracemalloc.is_tracing()
+    assert not tracemalloc.is_tracing()
+    # its stage entered (resetting the traced peak) after the 16 MB array was freed
+    assert outer.records[0].peak_bytes >= 16_000_000
+    assert inner.records[0].peak_bytes is not None
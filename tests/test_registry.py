@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+import pytest
+from lcdct import registry
+from lcdct.LCD import measure_LCD
+from lcdct.Observers import LG_CHO
+from lcdct.channels import channel_cache_info, clear_channel_cache
+from lcdct.registry import ObserverFactory, available_observers, get_observer_factory, register_observer
+
+
+PHANTOM = dict(seed=3)
+
+
+def wide_lg_params(insert_diameter):
+    return {'channel_width': insert_diameter}
+
+
+@pytest.fixture
+def custom_factory():
+    factory = ObserverFactory('WIDE_LG_CHO_2D', LG_CHO, params={'n_channels': 4},
+                              insert_params=wide_lg_params, precompute_channels=True)
+    register_observer(factory)
+    yield factory
+    registry._registry.pop(factory.name)
+
+
+def test_builtin_observers_registered():
+    assert {'LG_CHO_2D', 'DOG_CHO_2D', 'GABOR_CHO_2D', 'NPWE_2D'} <= set(available_observers())
+    assert get_observer_factory('lg_cho_2d').observer_cls is LG_CHO
+    with pytest.raises(ValueError, match="Unknown observer"):
+        get_observer_factory('NOT_AN_OBSERVER')
+
+
+def test_duplicate_registration(custom_factory):
+    with pytest.raises(ValueError, match="already registered"):
+        register_observer(ObserverFactory('wide_lg_cho_2d', LG_CHO))
+    assert get_observer_factory('WIDE_LG_CHO_2D') is custom_factory
+
+
+def test_custom_observer_in_measure_lcd(phantom_data, custom_factory):
+    sp, sa, gt = phantom_data
+    by_name = measure_LCD(sp, sa, gt, observers=['WIDE_LG_CHO_2D'], n_reader=3, seed_split=1)
+    by_factory = measure_LCD(sp, sa, gt, observers=[custom_factory], n_reader=3, seed_split=1)
+    pd.testing.assert_frame_equal(by_name, by_factory)
+    assert (by_name['observer'] == 'LG_CHO').all()
+    assert by_name['snr'].notna().all()
+
+
+def test_builtin_factory_matches_name(phantom_data):
+    sp, sa, gt = phantom_data
+    by_name = measure_LCD(sp, sa, gt, observers=['LG_CHO_2D', 'NPWE_2D'], n_reader=3, seed_split=4)
+    by_factory = measure_LCD(sp, sa, gt, observers=[get_observer_factory('LG_CHO_2D'), get_observer_factory('NPWE_2D')],
+                             n_reader=3, seed_split=4)
+    pd.testing.assert_frame_equal(by_name, by_factory)
+
+
+def test_channels_built_before_studies(phantom_data):
+    sp, sa, gt = phantom_data
+    clear_channel_cache()
+    measure_LCD(sp, sa, gt, observers=['LG_CHO_2D', 'DOG_CHO_2D'], n_reader=2, seed_split=0)
+    info = channel_cache_info()
+    # one bank per (observer, insert), built up front and reused by the studies
+    assert info.misses == 2
+    assert info.hits >= 2
@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+from lcdct.LCD import measure_LCD
+from lcdct.metrics import auc, lroc_auc
+from lcdct.Observers import LG_CHO, NPWE, split_indices
+from lcdct.search import score_maps, max_statistic, search_LCD
+
+
+PHANTOM = dict(n=60, noise=1, signal_scale=1.5 / 14)
+
+
+def test_score_maps_match_window_dot_products():
+    rng = np.random.default_rng(0)
+    images = rng.normal(size=(5, 20, 18))
+    templates = rng.normal(size=(3, 7, 5))
+    maps = score_maps(images, templates, chunk_size=2)
+    assert maps.shape == (5, 3, 14, 14)
+    for n, r, i, j in [(0, 0, 0, 0), (4, 2, 13, 13), (2, 1, 6, 9)]:
+        window = images[n, i:i + 7, j:j + 5]
+        np.testing.assert_allclose(maps[n, r, i, j], np.sum(templates[r] * (window - window.mean())), atol=1e-10)
+    np.testing.assert_allclose(score_maps(images, templates[1]), maps[:, 1], atol=1e-10)
+
+
+@pytest.mark.parametrize('observer,kwargs', [(LG_CHO, {'channel_width': 5}), (NPWE, {})])
+@pytest.mark.parametrize('phantom_data', [dict(n=30, size=21)], indirect=True)
+def test_spatial_templates_match_per_reader_training(phantom_data, observer, kwargs):
+    sp, sa, _ = phantom_data
+    obs = observer(sp, sa, **kwargs)
+    tr_sa, _ = split_indices(30, 0.5, [3, 4, 5])
+    tr_sp, _ = split_indices(30, 0.5, [6, 7, 8])
+    expected = np.stack([obs.spatial_template(sa[a], sp[b]) for a, b in zip(tr_sa, tr_sp)])
+    np.testing.assert_allclose(obs.spatial_templates(sa, sp, tr_sa, tr_sp), expected, rtol=1e-6, atol=1e-10)
+
+
+def test_lroc_and_max_statistic():
+    rng = np.random.default_rng(1)
+    t_sa, t_sp = rng.normal(size=(4, 30)), rng.normal(1, 1, size=(4, 40))
+    np.testing.assert_allclose(lroc_auc(t_sa, t_sp, np.ones_like(t_sp, dtype=bool)), auc(t_sa, t_sp))
+    correct = rng.random(t_sp.shape) < 0.5
+    assert np.all(lroc_auc(t_sa, t_sp, correct) <= auc(t_sa, t_sp))
+    assert lroc_auc(t_sa[0], t_sp[0], np.zeros(40, dtype=bool)) == 0
+
+    maps = rng.normal(size=(2, 3, 5, 5))
+    mask = np.zeros((5, 5), dtype=bool)
+    mask[1:4, 1:4] = True
+    values, positions = max_statistic(maps, mask)
+    np.testing.assert_array_equal(values, maps[:, :, 1:4, 1:4].max(axis=(-2, -1)))
+    assert np.all((positions >= 1) & (positions <= 3))
+
+
+@pytest.mark.parametrize("observer", ['LG_CHO_2D', 'NPWE_2D'])
+def test_search_radius_zero_is_location_known(phantom_data, observer):
+    sp, sa, gt = phantom_data
+    known = measure_LCD(sp, sa, gt, observers=[observer], n_reader=3, seed_split=[7])
+    search = search_LCD(sp, sa, gt, observers=[observer], search_radius=0, n_reader=3, seed_split=[7])
+    np.testing.assert_allclose(search['auc'], known['auc'], atol=1e-9)
+    np.testing.assert_allclose(search['lroc'], search['auc'])
+
+
+@pytest.mark.parametrize('phantom_data', [dict(signal_scale=0.8 / 14)], indirect=True)
+def test_search_lcd_is_harder_and_peaks_at_insert(phantom_data):
+    sp, sa, gt = phantom_data
+    known = search_LCD(sp, sa, gt, search_radius=0, n_reader=4, seed_split=[3])
+    res, maps = search_LCD(sp, sa, gt, search_radius=10, n_reader=4, seed_split=[3], return_maps=True)
+    assert len(res) == 4 and set(res.columns) >= {'auc', 'snr', 'lroc', 'afroc', 'observer', 'reader', 'insert_HU'}
+    assert res['auc'].mean() < known['auc'].mean()
+    assert np.all(res['lroc'] <= res['auc'] + 1e-12)
+    d_map = maps[('LG_CHO', 14.0)]
+    assert d_map.shape == (21, 21)
+    assert np.unravel_index(d_map.argmax(), d_map.shape) == (10, 10)
+
+    with pytest.raises(ValueError):
+        search_LCD(sp[:, None], sa[:, None], gt)
@@ -0,0 +1,74 @@
+from pathlib import Path
+import numpy as np
+import pandas as pd
+import pytest
+from lcdct.store import ResultStore
+from lcdct.sweep import run_sweep
+
+DATA_DIR = Path(__file__).parent.parent / 'data' / 'small_dataset'
+
+
+def make_results(recon, dose, n_reader=5, seed=0):
+    rng = np.random.default_rng(seed)
+    rows = [{'auc': rng.uniform(0.5, 1), 'snr': rng.uniform(0, 3), 'observer': obs, 'reader': r,
+             'insert_HU': hu, 'insert_diameter_pix': 2 * d}
+            for obs in ('LG_CHO', 'NPWE') for hu, d in ((14, 4), (3, 14)) for r in range(n_reader)]
+    return pd.DataFrame(rows).assign(recon=recon, dose_level=dose)
+
+
+def test_append_read_and_filter(tmp_path):
+    store = ResultStore(tmp_path / 'store', format='npz')
+    batches = [make_results(recon, dose, seed=i) for i, (recon, dose) in
+               enumerate([('fbp', 10), ('fbp', 100), ('DL/denoised', 10), ('fbp', 10)])]
+    for b in batches:
+        store.append(b)
+
+    # reopening keeps the store layout
+    store = ResultStore(tmp_path / 'store')
+    assert store.format == 'npz'
+    expected = pd.concat(batches, ignore_index=True)
+    keys = ['recon', 'dose_level', 'observer', 'insert_HU', 'reader', 'auc']
+    res = store.read()
+    assert len(res) == len(expected)
+    pd.testing.assert_frame_equal(res.sort_values(keys).reset_index(drop=True),
+                                  expected[res.columns].sort_values(keys).reset_index(drop=True), check_dtype=False)
+    assert res['dose_level'].dtype == np.int64
+
+    assert sorted(map(tuple, store.partitions().values.tolist())) == [('DL/denoised', 10), ('fbp', 10), ('fbp', 100)]
+    sub = store.read(filters={'recon': 'fbp', 'dose_level': [10], 'observer': 'NPWE'}, columns=['auc', 'reader'])
+    assert list(sub.columns) == ['auc', 'reader']
+    assert len(sub) == 2 * 2 * 5
+
+    with pytest.raises(ValueError, match="has format"):
+        ResultStore(tmp_path / 'store', format='parquet')
+
+
+def test_lazy_aggregate_matches_pandas(tmp_path):
+    store = ResultStore(tmp_path / 'store', format='npz')
+    batches = [make_results('fbp', dose, seed=i) for i, dose in enumerate([10, 10, 55, 100])]
+    for b in batches:
+        store.append(b)
+    keys = ['recon', 'dose_level', 'insert_HU', 'observer']
+    agg = store.aggregate().sort_values(keys).reset_index(drop=True)
+    expected = (pd.concat(batches).groupby(keys)
+                .agg(auc_mean=('auc', 'mean'), auc_std=('auc', 'std'), snr_mean=('snr', 'mean'),
+                     snr_std=('snr', 'std'), n=('auc', 'size')).reset_index())
+    pd.testing.assert_frame_equal(agg, expected, check_dtype=False)
+
+
+def test_sweep_appends_to_store(tmp_path):
+    kwargs = dict(recon_names=['fbp'], n_reader=2, seed_split=0)
+    results = pd.concat(list(run_sweep(DATA_DIR, store=tmp_path / 'store', **kwargs)), ignore_index=True)
+    stored = ResultStore(tmp_path / 'store').read()
+    keys = ['dose_level', 'insert_HU', 'reader']
+    pd.testing.assert_frame_equal(stored.sort_values(keys).reset_index(drop=True),
+                                  results[stored.columns].sort_values(keys).reset_index(drop=True), check_dtype=False)
+
+
+def test_parquet_format(tmp_path):
+    pytest.importorskip('pyarrow')
+    store = ResultStore(tmp_path / 'store', format='parquet')
+    batch = make_results('fbp', 100)
+    store.append(batch)
+    assert all(p.suffix == '.parquet' for p in (tmp_path / 'store').rglob('part-*'))
+    pd.testing.assert_frame_equal(store.read(filters={'dose_level': 100})[batch.columns], batch, check_dtype=False)
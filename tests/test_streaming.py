@@ -0,0 +1,76 @@
+from pathlib import Path
+import numpy as np
+import pandas as pd
+import pytest
+from lcdct.LCD import measure_LCD
+from lcdct.Observers import LG_CHO, DOG_CHO
+from lcdct.channels import get_channel_bank
+from lcdct.layout import PhantomLayout
+from lcdct.mhd import MHDStack
+from lcdct.streaming import RunningStats, iter_chunks, stream_cho_metrics
+from lcdct.utils import read_mhd
+
+DATA_DIR = Path(__file__).parent.parent / 'data' / 'small_dataset' / 'fbp'
+
+
+def test_running_stats_match_numpy():
+    x = np.random.default_rng(0).normal(loc=3, size=(103, 5))
+    stats = RunningStats(5)
+    for start in range(0, 103, 17):
+        stats.update(x[start:start + 17])
+    assert stats.count == 103
+    assert np.allclose(stats.mean, x.mean(axis=0))
+    assert np.allclose(stats.cov, np.cov(x, rowvar=False))
+
+    a, b = RunningStats(5), RunningStats(5)
+    a.update(x[:40])
+    b.update(x[40:])
+    a.merge(b)
+    assert np.allclose(a.cov, np.cov(x, rowvar=False))
+
+
+@pytest.mark.parametrize("observer_cls,kwargs", [(LG_CHO, {'channel_width': 4}), (DOG_CHO, {'type': 'sparse'})])
+def test_streaming_matches_in_memory(observer_cls, kwargs):
+    rng = np.random.default_rng(1)
+    sa = rng.normal(size=(60, 21, 21))
+    sp = rng.normal(size=(60, 21, 21))
+    sp[:, 8:13, 8:13] += 0.5
+    obs = observer_cls(sp, sa, **kwargs)
+    expected = obs.calculate_metrics(obs.signal_absent[:30], obs.signal_present[:30],
+                                      obs.signal_absent[30:], obs.signal_present[30:])
+
+    res = stream_cho_metrics(obs, iter_chunks(sa[:30], 7), iter_chunks(sp[:30], 7),
+                             iter_chunks(sa[30:], 7), iter_chunks(sp[30:], 7))
+    assert res['auc'] == pytest.approx(expected['auc'])
+    assert res['snr'] == pytest.approx(expected['snr'])
+
+
+def test_streaming_from_lazy_mhd():
+    gt = read_mhd(DATA_DIR / 'ground_truth.mhd').astype(np.float32) - 1000
+    layout = PhantomLayout.from_ground_truth(gt)
+    window = layout.crop_window(0, nx=2 * layout.max_diameter)
+    sp = MHDStack(DATA_DIR / 'dose_100' / 'signal_present' / 'signal_present.mhd', offset=1000)
+    sa = MHDStack(DATA_DIR / 'dose_100' / 'signal_absent' / 'signal_absent.mhd', offset=1000)
+    ny, nx = sp[:1, window[0], window[1]].shape[1:]
+    channels = get_channel_bank('LG', (ny, nx), n_channels=3, channel_width=2 / 3 * layout.inserts[0].diameter)
+
+    # train and test on all 10 realizations, in chunks that do not divide the stack evenly
+    res = stream_cho_metrics(channels, iter_chunks(sa, 3, window), iter_chunks(sp, 3, window),
+                             iter_chunks(sa, 4, window), iter_chunks(sp, 4, window))
+    obs = LG_CHO(sp[:, window[0], window[1]], sa[:, window[0], window[1]], n_channels=3,
+                 channel_width=2 / 3 * layout.inserts[0].diameter)
+    expected = obs.calculate_metrics(obs.signal_absent, obs.signal_present, obs.signal_absent, obs.signal_present)
+    assert res['auc'] == pytest.approx(expected['auc'])
+    assert res['snr'] == pytest.approx(expected['snr'], rel=1e-5)
+
+
+@pytest.mark.parametrize('resampling', ['split', 'bootstrap'])
+def test_measure_lcd_streams_lazy_stacks(resampling):
+    gt = read_mhd(DATA_DIR / 'ground_truth.mhd').astype(np.float32) - 1000
+    sp = MHDStack(DATA_DIR / 'dose_100' / 'signal_present' / 'signal_present.mhd', offset=1000)
+    sa = MHDStack(DATA_DIR / 'dose_100' / 'signal_absent' / 'signal_absent.mhd', offset=1000)
+    kwargs = dict(observers=['LG_CHO_2D', 'DOG_CHO_2D'], n_reader=4, seed_split=[1, 2], resampling=resampling)
+    expected = measure_LCD(np.asarray(sp[:]), np.asarray(sa[:]), gt, **kwargs)
+    pd.testing.assert_frame_equal(measure_LCD(sp, sa, gt, chunk_size=3, **kwargs), expected)
+    with pytest.raises(ValueError, match="NPWE"):
+        measure_LCD(sp, sa, gt, observers=['NPWE_2D'], chunk_size=3)
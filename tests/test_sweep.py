@@ -0,0 +1,41 @@
+from pathlib import Path
+import pandas as pd
+import pytest
+from lcdct.sweep import discover_sweep, run_sweep, main
+
+DATA_DIR = Path(__file__).parent.parent / 'data' / 'small_dataset'
+
+
+def test_discover_sweep():
+    jobs = discover_sweep(DATA_DIR, recon_names=['fbp', 'DL_denoised'])
+    assert [(j.recon, j.dose_level) for j in jobs] == [
+        ('fbp', 10), ('fbp', 55), ('fbp', 100),
+        ('DL_denoised', 10), ('DL_denoised', 55), ('DL_denoised', 100)]
+    assert sorted({j.recon for j in discover_sweep(DATA_DIR)}) == ['DL_denoised', 'fbp']
+
+
+def test_parallel_sweep_matches_serial():
+    kwargs = dict(recon_names=['fbp', 'DL_denoised'], n_reader=2, seed_split=0)
+    serial = pd.concat(list(run_sweep(DATA_DIR, **kwargs)), ignore_index=True)
+    parallel = pd.concat(list(run_sweep(DATA_DIR, n_jobs=2, executor='thread', max_in_flight=2, **kwargs)),
+                         ignore_index=True)
+
+    keys = ['recon', 'dose_level', 'insert_HU', 'reader']
+    assert len(serial) == 6 * 4 * 2
+    pd.testing.assert_frame_equal(serial.sort_values(keys).reset_index(drop=True),
+                                  parallel.sort_values(keys).reset_index(drop=True))
+
+
+def test_sweep_cli(tmp_path):
+    output = tmp_path / 'sweep.csv'
+    main([str(DATA_DIR), '--recons', 'fbp', '--n-reader', '2', '--seed', '1', '-o', str(output)])
+    res = pd.read_csv(output)
+    assert set(res['dose_level']) == {10, 55, 100}
+    assert set(res['recon']) == {'fbp'}
+
+    # an existing output is only replaced on request
+    with pytest.raises(SystemExit):
+        main([str(DATA_DIR), '--recons', 'fbp', '--n-reader', '2', '--seed', '1', '-o', str(output)])
+    pd.testing.assert_frame_equal(pd.read_csv(output), res)
+    main([str(DATA_DIR), '--recons', 'fbp', '--n-reader', '2', '--seed', '1', '-o', str(output), '--overwrite'])
+    pd.testing.assert_frame_equal(pd.read_csv(output), res)